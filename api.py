@@ -0,0 +1,249 @@
+"""
+Headless HTTP API for property lookup, analysis and portfolio metrics.
+
+    uvicorn api:app --host 0.0.0.0 --port 8000
+    python api.py --port 8000
+
+Endpoints (JSON):
+    GET  /health                  breaker and offline status
+    GET  /v1/lookup?address=...   projected property record
+    POST /v1/analyze              {"address": ...} or {"property": {...}}
+    POST /v1/analyze/batch        {"addresses": [...], "max_fetches": N}; ?stream=true for NDJSON
+    POST /v1/portfolio/metrics    {"properties": [{...}, ...]}
+
+The service imports the same core as the Streamlit app (see utils/ui.py), so
+lookups go through the one SQLite response cache, the pooled RentCast client,
+the rate limiter, circuit breaker and request coalescing. The core is
+synchronous; it runs on a bounded thread pool so the event loop never blocks.
+
+API_TOKEN is required: the service refuses to start without it, and every
+/v1 request needs "Authorization: Bearer <token>". Like cache_cli.py, lookups
+made here are not charged to any user's query limit. Instead, every uncached
+lookup draws one call from a shared daily upstream budget (API_DAILY_FETCHES),
+and API_MAX_FETCHES caps how many one batch may draw.
+"""
+import argparse
+import asyncio
+import hmac
+import os
+import threading
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Dict, List, Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from utils.api_cache import get_api_cache
+from utils.bulk_lookup import MAX_BATCH_SIZE, BulkRow, dedupe_addresses, iter_bulk_lookup, lookup_with_quota
+from utils.errors import AppError, ConfigError, QuotaExceededError, ServiceError
+from utils.offline import is_offline
+from utils.property_analysis import analyze_property, calculate_portfolio_metrics
+from utils.property_record import PropertyRecord
+from utils.rentcast_api import get_breaker_stats
+from utils.serialization import dumps_bytes
+
+# ------------------------
+# Service Configuration
+# ------------------------
+API_TOKEN = os.environ.get("API_TOKEN", "")
+API_WORKERS = int(os.environ.get("API_WORKERS", "16"))                # threads for blocking core calls
+API_MAX_FETCHES = int(os.environ.get("API_MAX_FETCHES", "100"))        # upstream calls per batch
+API_DAILY_FETCHES = int(os.environ.get("API_DAILY_FETCHES", "1000"))   # upstream calls per day, all endpoints
+API_BATCH_CONCURRENCY = int(os.environ.get("API_BATCH_CONCURRENCY", "10"))
+
+_BUDGET_NAMESPACE = "api_fetch_budget"
+
+# Row status -> HTTP status for single-address endpoints
+ROW_STATUS_CODES = {"not_found": 404, "error": 502, "over_quota": 429}
+
+# The core is synchronous (requests + SQLite); it runs on this bounded pool so
+# the event loop only ever awaits. Upstream concurrency is still governed by
+# the shared rate limiter and coalescing, exactly as for UI sessions.
+_executor = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="api")
+
+
+async def run_blocking(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+class JSONBytesResponse(JSONResponse):
+    """JSON encoded through utils/serialization.py (orjson when installed)"""
+
+    def render(self, content) -> bytes:
+        return dumps_bytes(content)
+
+
+# ------------------------
+# Upstream Budget
+# ------------------------
+# Nobody's quota pays for lookups made here, so the service has its own daily
+# allowance of upstream calls. It is a counter in the response cache, like the
+# market prefetcher's budget, so worker processes on one host share it.
+def fetches_used_today() -> int:
+    return get_api_cache().counter(_BUDGET_NAMESPACE, date.today().isoformat())
+
+
+class DailyFetches:
+    """Up to ``cap`` upstream calls for one request, each claimed from today's
+    budget only when an uncached address needs it (see lookup_with_quota)"""
+
+    def __init__(self, cap: int):
+        self.cap = cap
+        self.day = date.today().isoformat()
+        self.taken = 0
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.taken >= self.cap:
+                return False
+            self.taken += 1
+        # Check and spend in one update, so processes cannot overspend together
+        if get_api_cache().increment(_BUDGET_NAMESPACE, self.day, 1, limit=API_DAILY_FETCHES):
+            return True
+        with self._lock:
+            self.taken -= 1
+        return False
+
+    def give_back(self, units: int = 1):
+        with self._lock:
+            self.taken -= units
+        get_api_cache().increment(_BUDGET_NAMESPACE, self.day, -units)
+
+
+def lookup_within_budget(address: str) -> BulkRow:
+    """A single lookup that only goes upstream while today's budget lasts"""
+    row = lookup_with_quota(address, DailyFetches(1))
+    if row.status == "over_quota":
+        row.error = "Daily upstream budget for the API is spent"
+    return row
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not API_TOKEN:
+        raise ConfigError("Set API_TOKEN before starting the API; every /v1 request must carry it.")
+    yield
+    _executor.shutdown(wait=False)
+    get_api_cache().flush()
+
+
+app = FastAPI(title="Real Estate Intelligence API", default_response_class=JSONBytesResponse, lifespan=lifespan)
+
+
+def require_token(authorization: Optional[str] = Header(default=None)):
+    if not API_TOKEN:
+        # Fail closed if the app was mounted without going through lifespan
+        raise HTTPException(status_code=503, detail="API_TOKEN is not configured")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token, API_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid or missing API token")
+
+
+@app.exception_handler(AppError)
+async def _app_error(request: Request, error: AppError):
+    if isinstance(error, ConfigError):
+        status = 500
+    elif isinstance(error, QuotaExceededError):
+        status = 429
+    elif isinstance(error, ServiceError):
+        status = error.status_code if error.status_code == 404 else 502
+    else:
+        status = 400
+    return JSONBytesResponse({"detail": str(error)}, status_code=status)
+
+
+# ------------------------
+# Request Bodies
+# ------------------------
+class AnalyzeRequest(BaseModel):
+    address: Optional[str] = None
+    property: Optional[Dict] = Field(default=None, description="RentCast payload or stored record")
+
+
+class BatchRequest(BaseModel):
+    addresses: List[str]
+    max_fetches: Optional[int] = Field(default=None, ge=0, description="uncached addresses sent upstream")
+
+
+class PortfolioRequest(BaseModel):
+    properties: List[Dict]
+
+
+def _row_response(row: BulkRow) -> Dict:
+    """The row's JSON, or an HTTP error for failed single-address lookups"""
+    if row.status in ROW_STATUS_CODES:
+        raise HTTPException(status_code=ROW_STATUS_CODES[row.status], detail=row.error or row.status)
+    return row.to_dict()
+
+
+# ------------------------
+# Endpoints
+# ------------------------
+@app.get("/health")
+async def health():
+    return {"status": "ok", "offline": is_offline(), "breaker": get_breaker_stats()}
+
+
+@app.get("/v1/lookup", dependencies=[Depends(require_token)])
+async def lookup(address: str = Query(..., min_length=3)):
+    row = _row_response(await run_blocking(lookup_within_budget, address))
+    row.pop("analysis", None)
+    return row
+
+
+@app.post("/v1/analyze", dependencies=[Depends(require_token)])
+async def analyze(body: AnalyzeRequest):
+    if body.property is not None:
+        record = PropertyRecord.from_payload(body.property)
+        return {"property": record.to_dict(), "analysis": analyze_property(record)}
+    if not body.address:
+        raise HTTPException(status_code=422, detail="Send an address or a property payload")
+    return _row_response(await run_blocking(lookup_within_budget, body.address))
+
+
+@app.post("/v1/analyze/batch", dependencies=[Depends(require_token)])
+async def analyze_batch(body: BatchRequest, stream: bool = False):
+    addresses = dedupe_addresses(body.addresses)
+    if len(addresses) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} addresses per batch")
+    max_fetches = API_MAX_FETCHES if body.max_fetches is None else min(body.max_fetches, API_MAX_FETCHES)
+    rows = iter_bulk_lookup(addresses, DailyFetches(max_fetches), API_BATCH_CONCURRENCY)
+
+    if stream:
+        async def ndjson():
+            async for row in rows:
+                yield dumps_bytes(row.to_dict()) + b"\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    results = [row.to_dict() async for row in rows]
+    summary: Dict[str, int] = {}
+    for row in results:
+        summary[row["status"]] = summary.get(row["status"], 0) + 1
+    return {"results": results, "summary": summary}
+
+
+@app.post("/v1/portfolio/metrics", dependencies=[Depends(require_token)])
+async def portfolio_metrics(body: PortfolioRequest):
+    properties = [{"record": PropertyRecord.from_payload(payload)} for payload in body.properties]
+    return calculate_portfolio_metrics(properties)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    if not API_TOKEN:
+        parser.error("set API_TOKEN; every /v1 request must carry it as a bearer token")
+    # One process: the rate limiter, coalescing and pools are per process
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
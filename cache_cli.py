@@ -0,0 +1,181 @@
+"""
+Warm-up and maintenance for the RentCast response cache, without Streamlit.
+
+    python cache_cli.py warm --address "123 Main St, Austin, TX 78701" --zip 78701
+    python cache_cli.py warm --file addresses.txt --workers 4
+    python cache_cli.py warm --portfolio --markets
+    python cache_cli.py stats
+    python cache_cli.py evict-expired --grace 86400
+    python cache_cli.py compact
+
+RENTCAST_API_KEY is read from the environment (or .streamlit/secrets.toml);
+--portfolio also needs the Supabase credentials. Warm-up calls are not
+charged to any user's query limit.
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Set, Tuple
+
+from utils.api_cache import CACHE_PATH, get_api_cache
+from utils.property_record import PropertyRecord
+from utils.rentcast_api import RentCastError, RentCastNotFound, fetch_coalesced, get_cached, get_not_found
+
+
+# ------------------------
+# Warm-up Targets
+# ------------------------
+def portfolio_addresses() -> Set[str]:
+    """Full addresses of every saved property, from Supabase"""
+    from utils.supabase_client import init_supabase
+
+    supabase = init_supabase()
+    result = supabase.table("properties").select("data").execute()
+    addresses = set()
+    for row in result.data or []:
+        record = PropertyRecord.from_payload(row.get("data") or {})
+        if not record.address:
+            continue
+        if "," in record.address:
+            addresses.add(record.address)
+        else:
+            addresses.add(", ".join(filter(None, [record.address, record.city,
+                                                  f"{record.state} {record.zip_code}".strip()])))
+    return addresses
+
+
+def read_lines(path: str) -> List[str]:
+    """Non-empty, non-comment lines of a file ('-' reads stdin)"""
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        return [line.strip() for line in handle if line.strip() and not line.lstrip().startswith("#")]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def warm_one(endpoint: str, target: str, force: bool) -> Tuple[str, str, str]:
+    """Fetch one lookup into the cache; returns (target, outcome, detail)"""
+    if not force and get_cached(endpoint, target) is not None:
+        return target, "cached", ""
+    if get_not_found(endpoint, target) is not None:
+        return target, "not_found", "known unresolvable"
+    try:
+        fetch_coalesced(endpoint, target, check_negative=False)
+    except RentCastNotFound as e:
+        return target, "not_found", str(e)
+    except RentCastError as e:
+        return target, "error", str(e)
+    return target, "fetched", ""
+
+
+def warm(jobs: Iterable[Tuple[str, str]], workers: int, force: bool, limit: int, verbose: bool) -> int:
+    jobs = list(dict.fromkeys(jobs))
+    if limit:
+        jobs = jobs[:limit]
+    if not jobs:
+        print("Nothing to warm.")
+        return 0
+
+    counts = {"cached": 0, "fetched": 0, "not_found": 0, "error": 0}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(warm_one, endpoint, target, force) for endpoint, target in jobs]
+        for (endpoint, _), future in zip(jobs, futures):
+            target, outcome, detail = future.result()
+            counts[outcome] += 1
+            if verbose or outcome == "error":
+                print(f"  {outcome:<9} {endpoint:<10} {target}{f'  ({detail})' if detail else ''}")
+
+    elapsed = time.perf_counter() - started
+    print(f"Warmed {len(jobs)} lookups in {elapsed:.1f}s: " + ", ".join(f"{k} {v}" for k, v in counts.items()))
+    return 1 if counts["error"] else 0
+
+
+# ------------------------
+# Commands
+# ------------------------
+def cmd_warm(args) -> int:
+    addresses = list(args.address or [])
+    zips = list(args.zip or [])
+    for path in args.file or []:
+        for line in read_lines(path):
+            (zips if line.isdigit() and len(line) == 5 else addresses).append(line)
+    if args.portfolio:
+        found = sorted(portfolio_addresses())
+        print(f"Found {len(found)} saved portfolio properties.")
+        addresses.extend(found)
+
+    jobs = [("properties", address) for address in addresses]
+    if args.markets:
+        jobs += [("markets", address) for address in addresses]
+    jobs += [("markets", zip_code) for zip_code in zips]
+    return warm(jobs, args.workers, args.force, args.limit, args.verbose)
+
+
+def cmd_stats(args) -> int:
+    cache = get_api_cache()
+    stats = cache.stats()
+    print(f"Cache: {CACHE_PATH} ({cache.size_bytes() / 1024:,.1f} KiB on disk)")
+    print(f"{'namespace':<18} {'entries':>8} {'KiB':>10} {'hits':>8} {'misses':>8} {'hit rate':>9}")
+    totals = {"entries": 0, "bytes": 0, "hits": 0, "misses": 0}
+    for namespace, counts in sorted(stats.items()):
+        for name in totals:
+            totals[name] += counts.get(name, 0)
+        print(f"{namespace:<18} {counts['entries']:>8,} {counts['bytes'] / 1024:>10,.1f} "
+              f"{counts['hits']:>8,} {counts['misses']:>8,} {counts['hit_rate']:>8.1f}%")
+    lookups = totals["hits"] + totals["misses"]
+    print(f"{'total':<18} {totals['entries']:>8,} {totals['bytes'] / 1024:>10,.1f} "
+          f"{totals['hits']:>8,} {totals['misses']:>8,} "
+          f"{(totals['hits'] / lookups * 100 if lookups else 0):>8.1f}%")
+    return 0
+
+
+def cmd_evict(args) -> int:
+    removed = get_api_cache().evict_expired(grace=args.grace, namespace=args.namespace)
+    print(f"Removed {removed:,} expired entries.")
+    return 0
+
+
+def cmd_compact(args) -> int:
+    before, after = get_api_cache().compact()
+    print(f"Compacted {CACHE_PATH}: {before / 1024:,.1f} KiB -> {after / 1024:,.1f} KiB")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    warm_parser = commands.add_parser("warm", help="fetch addresses and ZIP codes into the cache")
+    warm_parser.add_argument("--address", action="append", help="address to look up (repeatable)")
+    warm_parser.add_argument("--zip", action="append", help="ZIP code for market data (repeatable)")
+    warm_parser.add_argument("--file", action="append",
+                             help="file of addresses and/or 5-digit ZIPs, one per line ('-' for stdin)")
+    warm_parser.add_argument("--portfolio", action="store_true", help="every saved portfolio property")
+    warm_parser.add_argument("--markets", action="store_true", help="also warm market data for each address")
+    warm_parser.add_argument("--workers", type=int, default=4, help="concurrent lookups (rate limit still applies)")
+    warm_parser.add_argument("--limit", type=int, default=0, help="stop after N lookups (0 = no limit)")
+    warm_parser.add_argument("--force", action="store_true", help="refetch entries that are still fresh")
+    warm_parser.add_argument("-v", "--verbose", action="store_true", help="print every lookup")
+    warm_parser.set_defaults(func=cmd_warm)
+
+    stats_parser = commands.add_parser("stats", help="cache size and hit rates per namespace")
+    stats_parser.set_defaults(func=cmd_stats)
+
+    evict_parser = commands.add_parser("evict-expired", help="delete expired entries")
+    evict_parser.add_argument("--grace", type=float, default=0,
+                              help="keep entries expired less than this many seconds (stale fallbacks)")
+    evict_parser.add_argument("--namespace", help="only this namespace")
+    evict_parser.set_defaults(func=cmd_evict)
+
+    compact_parser = commands.add_parser("compact", help="checkpoint the WAL and VACUUM the store")
+    compact_parser.set_defaults(func=cmd_compact)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
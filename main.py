@@ -18,6 +18,10 @@ from pages.settings import display_settings_page
 from utils.auth import wp_login, init_supabase
 from utils.config import get_config
 from utils.usage import get_user_usage
+from utils.ui import clear_caches, render
+from utils.market_prefetch import start_market_prefetcher
+from utils.telemetry import start_metrics_server
+from utils.offline import OFFLINE_FORCED, get_outbox, is_offline, offline_reason, set_offline, sync_outbox
 
 # ------------------------
 # Page Configuration
@@ -71,6 +75,8 @@ st.markdown("""
 # ------------------------
 supabase = init_supabase()
 config = get_config()
+start_market_prefetcher()  # one background thread per process; no-op on reruns
+start_metrics_server()     # Prometheus /metrics when METRICS_PORT is set
 
 # ------------------------
 # Main Application
@@ -138,6 +144,15 @@ def display_main_application():
     wp_user = st.session_state.wp_user
     user_id = wp_user["user_id"]
 
+    # Replay this user's writes queued while offline before anything reads
+    # remote data; the Supabase login (property search) may be a second identity
+    session_user = st.session_state.get("user")
+    user_ids = [user_id] + ([session_user.id] if session_user else [])
+    synced = sync_outbox(*user_ids)
+    if synced and synced["replayed"]:
+        clear_caches()
+        st.toast(f"🔄 Synced {synced['replayed']} offline change(s)")
+
     # Sidebar
     with st.sidebar:
         st.markdown(f"""
@@ -148,16 +163,29 @@ def display_main_application():
         </div>
         """ , unsafe_allow_html=True)
 
-        # API Usage
-        usage_data = get_user_usage(user_id)
-        usage_pct = (usage_data['current_month'] / usage_data['limit']) * 100
+        # Offline Mode
+        offline = st.toggle("📴 Offline mode", value=is_offline(), disabled=OFFLINE_FORCED,
+                            help="Serve pages from data saved on this device and queue changes")
+        if offline != is_offline():
+            set_offline(offline)
+            st.rerun()
+        pending = get_outbox().pending(*user_ids)
+        if is_offline():
+            st.caption(f"{offline_reason()} · {pending} change(s) waiting to sync")
+        elif pending:
+            st.caption(f"⏳ {pending} change(s) waiting to sync")
+
+        # API Usage (None when it cannot be read, which is not the same as 0)
         st.markdown("### 📊 API Usage This Month")
-        st.progress(usage_pct / 100)
-        st.write(f"{usage_data['current_month']}/{usage_data['limit']} calls ({usage_pct:.1f}%)")
-        if usage_data.get('by_type'):
-            st.write("**By Type:**")
-            for query_type, count in usage_data['by_type'].items():
-                st.write(f"• {query_type}: {count}")
+        usage_data = render(get_user_usage(user_id))
+        if usage_data:
+            usage_pct = (usage_data['current_month'] / usage_data['limit']) * 100
+            st.progress(usage_pct / 100)
+            st.write(f"{usage_data['current_month']}/{usage_data['limit']} calls ({usage_pct:.1f}%)")
+            if usage_data.get('by_type'):
+                st.write("**By Type:**")
+                for query_type, count in usage_data['by_type'].items():
+                    st.write(f"• {query_type}: {count}")
 
         st.markdown("---")
 
@@ -180,7 +208,7 @@ def display_main_application():
     elif page == "🛒 Orders":
         display_orders_page(user_id)
     elif page == "📈 Market Analysis":
-        market_analysis_page()
+        market_analysis_page(user_id, wp_user['user_email'])
     elif page == "⚙️ Settings":
         display_settings_page(user_id)
 
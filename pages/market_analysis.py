@@ -1,15 +1,19 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from utils.database import QuotaReservation
+from utils.property_analysis import summarize_listings
+from utils.rentcast_api import MAX_QUERIES, RentCastError
+from utils.rentcast_listings import ListingQuery, iter_listings, pages_needed
 
-def market_analysis_page():
+def market_analysis_page(user_id: int, user_email: str):
     """Advanced market analysis tools"""
     st.header("📊 Market Analysis")
     
     tab1, tab2, tab3 = st.tabs(["🏘️ Neighborhood Analysis", "📈 Market Trends", "🔍 Comparable Properties"])
     
     with tab1:
-        neighborhood_analysis()
+        neighborhood_analysis(user_id, user_email)
     
     with tab2:
         market_trends_analysis()
@@ -17,34 +21,66 @@ def market_analysis_page():
     with tab3:
         comparable_properties_analysis()
 
-def neighborhood_analysis():
-    """Analyze neighborhood metrics"""
+def neighborhood_analysis(user_id: int, user_email: str):
+    """Analyze neighborhood metrics from live sale and rental listings"""
     st.subheader("🏘️ Neighborhood Analysis")
     
     col1, col2 = st.columns(2)
     with col1:
         city = st.text_input("City", value="Los Angeles")
         state = st.text_input("State", value="CA")
+        zip_code = st.text_input("ZIP Code (optional)", help="Search one ZIP code instead of the whole city")
     
     with col2:
-        radius = st.slider("Analysis Radius (miles)", 1, 10, 3)
+        max_listings = st.slider("Listings to Analyze", 100, 2000, 500, step=100,
+                                 help="Each 500 listings fetched uses one API query")
         property_type = st.selectbox("Property Type", ["All", "Single Family", "Condo", "Townhouse"])
     
     if st.button("🔍 Analyze Neighborhood"):
-        with st.spinner("Analyzing neighborhood data..."):
-            # This would typically involve multiple API calls to gather neighborhood data
-            st.info("Neighborhood analysis feature requires additional API integrations")
-            
-            # Placeholder for neighborhood metrics
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Avg Home Price", "$650,000", "↑ 5.2%")
-            with col2:
-                st.metric("Avg Rent", "$2,800", "↑ 3.1%")
-            with col3:
-                st.metric("Cap Rate", "4.8%", "↓ 0.2%")
-            with col4:
-                st.metric("Price/Rent Ratio", "19.3", "↑ 1.1")
+        area = {"zip_code": zip_code.strip()} if zip_code.strip() else {"city": city, "state": state}
+        property_type = None if property_type == "All" else property_type
+        # Hold the pages one search needs; both draw on it, and it reserves a
+        # page at a time beyond that. Only the pages fetched are charged on exit
+        with QuotaReservation(user_id, user_email, MAX_QUERIES, top_up=1) as quota:
+            quota.reserve(pages_needed(max_listings))
+            sales = iter_listings(ListingQuery("sale", property_type=property_type, **area),
+                                  max_results=max_listings, quota=quota)
+            rentals = iter_listings(ListingQuery("rental", property_type=property_type, **area),
+                                    max_results=max_listings, quota=quota)
+            try:
+                with st.spinner("Analyzing neighborhood listings..."):
+                    sale_stats = summarize_listings(sales)
+                    rent_stats = summarize_listings(rentals)
+            except RentCastError as e:
+                st.error(f"Failed to fetch listings: {e}")
+                return
+        
+        if not sale_stats['count'] and not rent_stats['count']:
+            st.info("No active listings found for this area")
+            return
+        
+        avg_price, avg_rent = sale_stats['avg_price'], rent_stats['avg_rent']
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Avg Asking Price", f"${avg_price:,.0f}", f"{sale_stats['count']} for sale", delta_color="off")
+        with col2:
+            st.metric("Avg Rent", f"${avg_rent:,.0f}", f"{rent_stats['count']} for rent", delta_color="off")
+        with col3:
+            st.metric("Gross Cap Rate", f"{avg_rent * 12 / avg_price * 100:.1f}%" if avg_price else "N/A")
+        with col4:
+            st.metric("Price/Rent Ratio", f"{avg_price / (avg_rent * 12):.1f}" if avg_rent else "N/A")
+        
+        if sale_stats['by_type']:
+            type_df = pd.DataFrame(
+                sorted(sale_stats['by_type'].items(), key=lambda item: -item[1]),
+                columns=['Property Type', 'Listings']
+            )
+            fig = px.bar(type_df, x='Property Type', y='Listings', title="🏠 Listings for Sale by Type")
+            st.plotly_chart(fig, use_container_width=True)
+        
+        st.caption(f"Avg $/sq ft: ${sale_stats['avg_price_per_sqft']:,.0f} · "
+                   f"Price range: ${sale_stats['min_price']:,.0f} – ${sale_stats['max_price']:,.0f} · "
+                   f"{sales.pages + rentals.pages} page(s) read, API queries used: {sales.fetched + rentals.fetched}")
 
 def market_trends_analysis():
     """Display market trends and forecasts"""
@@ -1,6 +1,8 @@
 import streamlit as st
 from typing import Dict
-from utils.woocommerce import get_wc_orders, display_orders_analytics
+from utils.woocommerce import get_wc_orders
+from utils.ui import display_orders_analytics, render
+from utils.offline import snapshot_note
 
 def display_orders_page(user_id: int):
     """Display orders management page"""
@@ -8,7 +10,10 @@ def display_orders_page(user_id: int):
     st.header("🛒 Order Management")
     
     # Fetch orders
-    orders = get_wc_orders(user_id)
+    orders = render(get_wc_orders(user_id), [])
+    note = snapshot_note("orders", user_id)
+    if note:
+        st.caption(note)
     
     if not orders:
         st.info("📦 No orders found for your account.")
@@ -4,6 +4,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 from typing import Dict, List
 from utils.property_management import get_user_properties, delete_property
+from utils.market_prefetch import get_market_prefetcher, get_warm_market
+from utils.property_record import PropertyRecord
+from utils.property_analysis import calculate_portfolio_metrics
+from utils.offline import snapshot_note
+from utils.ui import render
 from datetime import datetime
 
 def display_portfolio_page(user_id: int):
@@ -12,15 +17,25 @@ def display_portfolio_page(user_id: int):
     st.header("📊 Investment Portfolio")
     
     # Get user properties
-    properties = get_user_properties(user_id)
+    properties = render(get_user_properties(user_id), [])
+    note = snapshot_note("portfolio", user_id)
+    if note:
+        st.caption(note)
     
     if not properties:
         st.info("📊 No properties in your portfolio yet. Start by searching for properties!")
         return
     
+    # Project each saved row once; everything below reads record attributes
+    for prop in properties:
+        prop['record'] = PropertyRecord.from_payload(prop.get('data', {}))
+    
     # Portfolio overview
     display_portfolio_overview(properties)
     
+    # Market context (from the prefetched cache only; never calls the API inline)
+    display_market_context(properties)
+    
     # Property management
     st.subheader("🏠 Property Management")
     display_portfolio_table(properties, user_id)
@@ -74,45 +89,38 @@ def display_portfolio_overview(properties: List[Dict]):
     # Portfolio composition charts
     create_portfolio_charts(properties, portfolio_metrics)
 
-def calculate_portfolio_metrics(properties: List[Dict]) -> Dict:
-    """Calculate comprehensive portfolio metrics"""
-    total_value = 0
-    total_rent = 0
-    total_cash_flow = 0
-    cap_rates = []
+def display_market_context(properties: List[Dict]):
+    """Show cached ZIP-level market statistics for the portfolio"""
+    zip_codes = sorted({prop['record'].zip_code[:5] for prop in properties if prop['record'].zip_code})
+    if not zip_codes:
+        return
     
-    for prop in properties:
-        data = prop.get('data', {})
-        
-        # Extract financial data
-        price = data.get('price', 0) or data.get('lastSalePrice', 0)
-        rent = data.get('rentEstimate', {}).get('rent', 0) if isinstance(data.get('rentEstimate'), dict) else 0
-        
-        if price:
-            total_value += price
-            annual_rent = rent * 12
-            total_rent += rent
-            
-            # Estimate cash flow (simplified)
-            monthly_expenses = price * 0.004  # 4% monthly expense ratio
-            cash_flow = rent - monthly_expenses
-            total_cash_flow += cash_flow
-            
-            # Cap rate
-            if annual_rent > 0:
-                cap_rate = (annual_rent / price) * 100
-                cap_rates.append(cap_rate)
+    rows = []
+    missing = []
+    for zip_code in zip_codes:
+        market = get_warm_market(zip_code)
+        if not market:
+            missing.append(zip_code)
+            continue
+        sale = market.get('saleData') or {}
+        rental = market.get('rentalData') or {}
+        rows.append({
+            'ZIP': zip_code,
+            'Median Price': f"${sale['medianPrice']:,.0f}" if sale.get('medianPrice') else 'N/A',
+            'Median Rent': f"${rental['medianRent']:,.0f}" if rental.get('medianRent') else 'N/A',
+            'Avg Days on Market': f"{sale['averageDaysOnMarket']:.0f}" if sale.get('averageDaysOnMarket') else 'N/A',
+            'Active Listings': sale.get('totalListings', 'N/A')
+        })
     
-    return {
-        'total_properties': len(properties),
-        'total_value': total_value,
-        'total_monthly_rent': total_rent,
-        'total_annual_rent': total_rent * 12,
-        'total_cash_flow': total_cash_flow,
-        'avg_cap_rate': sum(cap_rates) / len(cap_rates) if cap_rates else 0,
-        'avg_property_value': total_value / len(properties) if properties else 0,
-        'portfolio_yield': (total_rent * 12 / total_value * 100) if total_value > 0 else 0
-    }
+    # Warm the rest in the background for the next visit
+    if missing:
+        get_market_prefetcher().request(missing)
+    
+    st.subheader("📍 Market Context")
+    if rows:
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    if missing:
+        st.caption(f"Market data for {len(missing)} ZIP code(s) will be ready after the next prefetch run.")
 
 def create_portfolio_charts(properties: List[Dict], metrics: Dict):
     """Create portfolio visualization charts"""
@@ -125,12 +133,11 @@ def create_portfolio_charts(properties: List[Dict], metrics: Dict):
         prop_labels = []
         
         for i, prop in enumerate(properties):
-            data = prop.get('data', {})
-            price = data.get('price', 0) or data.get('lastSalePrice', 0)
-            address = data.get('address', f'Property {i+1}')
+            record = prop['record']
+            address = record.address or f'Property {i+1}'
             
-            if price > 0:
-                prop_values.append(price)
+            if record.price > 0:
+                prop_values.append(record.price)
                 prop_labels.append(f"{address[:20]}...")
         
         if prop_values:
@@ -147,14 +154,11 @@ def create_portfolio_charts(properties: List[Dict], metrics: Dict):
         property_names = []
         
         for i, prop in enumerate(properties):
-            data = prop.get('data', {})
-            price = data.get('price', 0) or data.get('lastSalePrice', 0)
-            rent = data.get('rentEstimate', {}).get('rent', 0) if isinstance(data.get('rentEstimate'), dict) else 0
-            address = data.get('address', f'Property {i+1}')
+            record = prop['record']
+            address = record.address or f'Property {i+1}'
             
-            if price > 0:
-                cash_flow = rent - (price * 0.004)
-                cash_flows.append(cash_flow)
+            if record.price > 0:
+                cash_flows.append(record.cash_flow)
                 property_names.append(f"{address[:15]}...")
         
         if cash_flows:
@@ -178,27 +182,21 @@ def display_portfolio_table(properties: List[Dict], user_id: int):
     table_data = []
     
     for i, prop in enumerate(properties):
-        data = prop.get('data', {})
-        
-        price = data.get('price', 0) or data.get('lastSalePrice', 0)
-        rent = data.get('rentEstimate', {}).get('rent', 0) if isinstance(data.get('rentEstimate'), dict) else 0
-        
-        # Calculate metrics
-        annual_rent = rent * 12
-        cap_rate = (annual_rent / price * 100) if price > 0 else 0
-        cash_flow = rent - (price * 0.004) if price > 0 else 0
+        record = prop['record']
+        cap_rate = record.cap_rate
+        cash_flow = record.cash_flow
         
         table_data.append({
-            'Property': data.get('address', f'Property {i+1}'),
-            'City': data.get('city', 'N/A'),
-            'State': data.get('state', 'N/A'),
-            'Price': f"${price:,.0f}" if price else 'N/A',
-            'Monthly Rent': f"${rent:,.0f}" if rent else 'N/A',
+            'Property': record.address or f'Property {i+1}',
+            'City': record.city or 'N/A',
+            'State': record.state or 'N/A',
+            'Price': f"${record.price:,.0f}" if record.price else 'N/A',
+            'Monthly Rent': f"${record.rent:,.0f}" if record.rent else 'N/A',
             'Cap Rate': f"{cap_rate:.2f}%" if cap_rate else 'N/A',
             'Cash Flow': f"${cash_flow:,.0f}" if cash_flow else 'N/A',
-            'Bedrooms': data.get('bedrooms', 'N/A'),
-            'Bathrooms': data.get('bathrooms', 'N/A'),
-            'Sq Ft': f"{data.get('squareFootage', 0):,}" if data.get('squareFootage') else 'N/A',
+            'Bedrooms': record.bedrooms or 'N/A',
+            'Bathrooms': record.bathrooms or 'N/A',
+            'Sq Ft': f"{record.square_feet:,}" if record.square_feet else 'N/A',
             'Added': prop.get('created_at', '')[:10] if prop.get('created_at') else 'N/A',
             'ID': prop.get('id')  # For deletion
         })
@@ -256,7 +254,7 @@ def display_portfolio_table(properties: List[Dict], user_id: int):
                 
                 with col4:
                     if st.button(f"🗑️ Delete", key=f"delete_{row['ID']}"):
-                        if delete_property(user_id, row['ID']):
+                        if render(delete_property(user_id, row['ID'])):
                             st.rerun()
         
         # Export option
@@ -3,11 +3,21 @@
 # =====================================================
 
 import streamlit as st
+import asyncio
 import json
+import time
 import pandas as pd
+from datetime import datetime
 from utils.auth import initialize_auth_state
-from utils.rentcast_api import fetch_property_details, get_market_data
-from utils.database import get_user_usage
+from utils.search_pipeline import PropertySearch
+from utils.rentcast_api import MAX_QUERIES
+from utils.database import QuotaReservation, get_user_usage
+from utils.usage import get_user_usage as get_usage_summary, log_usage_batch
+from utils.ui import render
+from utils.bulk_lookup import (
+    DEFAULT_CONCURRENCY, MAX_BATCH_SIZE, dedupe_addresses, iter_bulk_lookup,
+    parse_address_csv, parse_address_text
+)
 
 st.set_page_config(page_title="Property Search", page_icon="🏠")
 
@@ -37,106 +47,238 @@ with st.sidebar:
     elif queries_used >= 25:
         st.warning("⚠️ Approaching limit!")
 
-# Main content
-col1, col2 = st.columns([2, 1])
-
-with col1:
-    st.subheader("🔍 Search Property")
-    address = st.text_input(
-        "Enter Property Address",
-        placeholder="e.g., 123 Main St, New York, NY 10001",
-        help="Enter a complete address for best results"
+
+# Bulk lookup
+def display_bulk_lookup(user_id, user_email):
+    """Bulk lookup: many addresses fetched concurrently, streamed into a table"""
+    st.subheader("📋 Bulk Address Lookup")
+    st.markdown("Paste one address per line or upload a CSV with an `address` column "
+                "(or `street`, `city`, `state`, `zip` columns).")
+
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        pasted = st.text_area("Addresses", height=200,
+                              placeholder="123 Main St, New York, NY 10001\n456 Oak Ave, Austin, TX 78701")
+    with col2:
+        uploaded = st.file_uploader("Or upload CSV", type=["csv"])
+        concurrency = st.slider("Parallel requests", 1, 25, DEFAULT_CONCURRENCY)
+
+    addresses = parse_address_text(pasted) if pasted else []
+    if uploaded is not None:
+        addresses = dedupe_addresses(addresses + parse_address_csv(uploaded.getvalue().decode("utf-8-sig")))
+
+    usage = render(get_usage_summary(user_id))
+    remaining = f"{max(0, usage['limit'] - usage['current_month'])} queries left this month" if usage else \
+        "queries left unknown"
+    st.caption(f"{len(addresses)} unique addresses • {remaining} • cached addresses are free")
+    if len(addresses) > MAX_BATCH_SIZE:
+        st.warning(f"Only the first {MAX_BATCH_SIZE} addresses will be processed.")
+
+    if not st.button("🚀 Run Bulk Lookup", type="primary", use_container_width=True, disabled=not addresses):
+        return
+
+    progress = st.progress(0.0)
+    status_line = st.empty()
+    table = st.empty()
+    total = min(len(addresses), MAX_BATCH_SIZE)
+    rows = []
+    charged = []
+    # Hold quota for the whole batch up front so parallel workers (and other
+    # tabs) can't overspend it; unused units are released when it settles
+    reservation = QuotaReservation(user_id, user_email, MAX_QUERIES)
+    reservation.reserve(total)
+
+    async def consume():
+        last_render = 0.0
+        async for result in iter_bulk_lookup(addresses, reservation, concurrency):
+            rows.append(result.to_row())
+            if result.charged:
+                charged.append(result.address)
+            # Re-rendering the table is the expensive part; throttle it
+            now = time.monotonic()
+            if now - last_render > 0.3 or len(rows) == total:
+                last_render = now
+                progress.progress(len(rows) / total)
+                status_line.text(f"{len(rows)}/{total} done • {len(charged)} queries used")
+                table.dataframe(pd.DataFrame(rows), use_container_width=True)
+
+    try:
+        asyncio.run(consume())
+    finally:
+        # Charge whatever was fetched, even if the run was interrupted
+        reservation.commit(len(charged))
+        if charged:
+            render(log_usage_batch(user_id, charged, "bulk_lookup"))
+
+    results_df = pd.DataFrame(rows)
+    counts = results_df["Status"].value_counts().to_dict() if not results_df.empty else {}
+    st.success(f"✅ Bulk lookup finished: " + ", ".join(f"{v} {k}" for k, v in counts.items()))
+    st.download_button(
+        label="📥 Download Results (CSV)",
+        data=results_df.to_csv(index=False),
+        file_name="bulk_lookup_results.csv",
+        mime="text/csv"
     )
 
-with col2:
-    st.subheader("⚙️ Search Options")
-    include_market_data = st.checkbox("Include Market Data", value=True)
-    show_raw_json = st.checkbox("Show Raw JSON Response", value=False)
 
-if st.button("🔍 Search Property", type="primary", use_container_width=True):
-    if not address:
-        st.error("Please enter a property address.")
+# Search results
+def format_stale(outcome):
+    return datetime.fromtimestamp(outcome.stale_since).strftime("%Y-%m-%d %H:%M")
+
+
+def display_not_found(outcome):
+    """Render a not-found answer with suggested address fixes"""
+    st.warning(f"🔍 {outcome.error}")
+    st.info("**Try these fixes:**\n" + "\n".join(f"- {hint}" for hint in outcome.suggestions))
+    if outcome.source == "cache":
+        st.caption("⚡ Answered from recent lookups — no API query used")
+
+
+def display_property_outcome(outcome, show_raw_json):
+    """Render the property tabs once the /properties lookup finishes"""
+    property_data = outcome.data
+    if outcome.suggestions:
+        display_not_found(outcome)
+        return
+    if not property_data:
+        if outcome.status_code is not None:
+            st.error(f"Error fetching data from RentCast API. {outcome.error}")
+        else:
+            st.error(outcome.error)
+        return
+
+    if outcome.source == "stale":
+        st.warning(f"⚠️ RentCast is unavailable. Showing cached data from {format_stale(outcome)}; "
+                   f"it will refresh automatically once the service recovers.")
     else:
-        with st.spinner("Searching property data..."):
-            # Fetch property details
-            property_data = fetch_property_details(address, user_id, user_email)
-            
-            if property_data:
-                st.success("✅ Property data retrieved successfully!")
-                
-                # Display property information in organized tabs
-                tab1, tab2, tab3 = st.tabs(["🏠 Property Details", "💰 Financial Info", "📋 Raw Data"])
-                
-                with tab1:
-                    if "properties" in property_data and property_data["properties"]:
-                        prop = property_data["properties"][0]
-                        
-                        # Basic property info
-                        st.subheader("Basic Information")
-                        col1, col2, col3 = st.columns(3)
-                        
-                        with col1:
-                            st.metric("Property Type", prop.get("propertyType", "N/A"))
-                            st.metric("Bedrooms", prop.get("bedrooms", "N/A"))
-                        
-                        with col2:
-                            st.metric("Bathrooms", prop.get("bathrooms", "N/A"))
-                            st.metric("Square Feet", prop.get("squareFootage", "N/A"))
-                        
-                        with col3:
-                            st.metric("Year Built", prop.get("yearBuilt", "N/A"))
-                            st.metric("Lot Size", prop.get("lotSize", "N/A"))
-                        
-                        # Address information
-                        if "address" in prop:
-                            addr = prop["address"]
-                            st.subheader("Address Details")
-                            st.text(f"{addr.get('line1', '')} {addr.get('line2', '')}")
-                            st.text(f"{addr.get('city', '')}, {addr.get('state', '')} {addr.get('zipCode', '')}")
-                    else:
-                        st.warning("No property details found for this address.")
-                
-                with tab2:
-                    if "properties" in property_data and property_data["properties"]:
-                        prop = property_data["properties"][0]
-                        
-                        # Financial information
-                        st.subheader("Estimated Values")
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            if "rentEstimate" in prop:
-                                rent_est = prop["rentEstimate"]
-                                st.metric("Rent Estimate", f"${rent_est.get('rent', 'N/A'):,}/month")
-                        
-                        with col2:
-                            if "valueEstimate" in prop:
-                                value_est = prop["valueEstimate"]
-                                st.metric("Property Value", f"${value_est.get('value', 'N/A'):,}")
-                
-                with tab3:
-                    if show_raw_json:
-                        st.json(property_data)
-                    else:
-                        st.info("Enable 'Show Raw JSON Response' to view complete API response.")
-                
-                # Market data section
-                if include_market_data:
-                    st.markdown("---")
-                    st.subheader("📊 Market Analytics")
-                    
-                    with st.spinner("Fetching market data..."):
-                        market_data = get_market_data(address, user_id, user_email)
-                        
-                        if market_data:
-                            st.success("✅ Market data retrieved!")
-                            
-                            if show_raw_json:
-                                st.json(market_data)
+        st.success("✅ Property data retrieved successfully!")
+    if outcome.source in ("cache", "stale") and not outcome.charged:
+        st.caption("⚡ Served from cache — no API query used")
+
+    record = outcome.record
+
+    # Display property information in organized tabs
+    tab1, tab2, tab3 = st.tabs(["🏠 Property Details", "💰 Financial Info", "📋 Raw Data"])
+
+    with tab1:
+        if record:
+            # Basic property info
+            st.subheader("Basic Information")
+            col1, col2, col3 = st.columns(3)
+
+            with col1:
+                st.metric("Property Type", record.property_type or "N/A")
+                st.metric("Bedrooms", record.bedrooms or "N/A")
+
+            with col2:
+                st.metric("Bathrooms", record.bathrooms or "N/A")
+                st.metric("Square Feet", record.square_feet or "N/A")
+
+            with col3:
+                st.metric("Year Built", record.year_built or "N/A")
+                st.metric("Lot Size", record.lot_size or "N/A")
+
+            # Address information
+            if record.address:
+                st.subheader("Address Details")
+                st.text(record.address)
+                st.text(f"{record.city}, {record.state} {record.zip_code}")
+        else:
+            st.warning("No property details found for this address.")
+
+    with tab2:
+        if record:
+            # Financial information
+            st.subheader("Estimated Values")
+            col1, col2 = st.columns(2)
+
+            with col1:
+                if record.rent:
+                    st.metric("Rent Estimate", f"${record.rent:,.0f}/month")
+
+            with col2:
+                if record.value_estimate:
+                    st.metric("Property Value", f"${record.value_estimate:,.0f}")
+
+    with tab3:
+        if show_raw_json:
+            st.json(property_data)
+        else:
+            st.info("Enable 'Show Raw JSON Response' to view complete API response.")
+
+
+def display_market_outcome(outcome, show_raw_json):
+    """Render the market analytics section once the /markets lookup finishes"""
+    st.markdown("---")
+    st.subheader("📊 Market Analytics")
+
+    market_data = outcome.data
+    if outcome.suggestions:
+        display_not_found(outcome)
+    elif market_data:
+        if outcome.source == "stale":
+            st.warning(f"⚠️ RentCast is unavailable. Showing cached market data from {format_stale(outcome)}.")
+        else:
+            st.success("✅ Market data retrieved!")
+        if outcome.source in ("cache", "stale") and not outcome.charged:
+            st.caption("⚡ Served from cache — no API query used")
+
+        if show_raw_json:
+            st.json(market_data)
+        else:
+            st.info("Market data available. Enable 'Show Raw JSON Response' to view details.")
+    else:
+        if outcome.status_code is not None:
+            st.error(f"Error fetching market data. {outcome.error}")
+        elif outcome.error:
+            st.error(outcome.error)
+        st.warning("Market data not available for this location.")
+
+
+# Main content
+search_mode = st.radio("Search Mode", ["Single Address", "Bulk Lookup"], horizontal=True)
+
+if search_mode == "Bulk Lookup":
+    display_bulk_lookup(user_id, user_email)
+else:
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        st.subheader("🔍 Search Property")
+        address = st.text_input(
+            "Enter Property Address",
+            placeholder="e.g., 123 Main St, New York, NY 10001",
+            help="Enter a complete address for best results"
+        )
+
+    with col2:
+        st.subheader("⚙️ Search Options")
+        include_market_data = st.checkbox("Include Market Data", value=True)
+        show_raw_json = st.checkbox("Show Raw JSON Response", value=False)
+
+    if st.button("🔍 Search Property", type="primary", use_container_width=True):
+        if not address:
+            st.error("Please enter a property address.")
+        else:
+            endpoints = ["properties", "markets"] if include_market_data else ["properties"]
+            # Uncached endpoints reserve their queries in one call, then are
+            # fetched in parallel; only the calls RentCast charged are committed
+            with QuotaReservation(user_id, user_email, MAX_QUERIES) as reservation:
+                search = PropertySearch(address, endpoints, reservation.reserve)
+                property_area = st.container()
+                market_area = st.container()
+
+                try:
+                    with st.spinner("Searching property data..."):
+                        for outcome in search.as_completed():
+                            if outcome.endpoint == "properties":
+                                with property_area:
+                                    display_property_outcome(outcome, show_raw_json)
                             else:
-                                st.info("Market data available. Enable 'Show Raw JSON Response' to view details.")
-                        else:
-                            st.warning("Market data not available for this location.")
+                                with market_area:
+                                    display_market_outcome(outcome, show_raw_json)
+                finally:
+                    reservation.commit(search.charged)
 
 # Recent searches (you could implement this with a database table)
 st.markdown("---")
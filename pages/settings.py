@@ -1,7 +1,10 @@
 import streamlit as st
 from typing import Dict
-from utils.rentcast_api import test_rentcast_connection, validate_rentcast_config
-from utils.usage import get_user_usage
+from utils.rentcast_api import test_rentcast_connection, validate_rentcast_config, get_rentcast_pool_stats, get_cache_stats, get_coalescing_stats, get_rate_limit_stats, get_breaker_stats
+from utils.usage import get_usage_counter, get_user_usage
+from utils.ui import render
+from utils.market_prefetch import get_market_prefetcher
+from utils.telemetry import latency_summary
 
 def display_settings_page(user_id: int):
     """Display settings and configuration page"""
@@ -46,19 +49,131 @@ def api_settings_tab():
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.info("**RentCast API**\n🟢 Active")
+        breaker = get_breaker_stats()
+        breaker_labels = {
+            "closed": "🟢 Active",
+            "half_open": "🟡 Recovering",
+            "open": "🔴 Unavailable — serving cached data"
+        }
+        st.info(f"**RentCast API**\n{breaker_labels[breaker['state']]}")
+        st.caption(f"Breaker opened {breaker['times_opened']}× • {breaker['slow_calls']} calls over the "
+                   f"{breaker['latency_budget_s']:g}s budget • {breaker['rejected']} short-circuited • "
+                   f"{breaker['pending_refreshes']} stale entries awaiting refresh")
+        if breaker['last_refresh_error']:
+            st.caption(f"{breaker['refresh_errors']} background refreshes failed; "
+                       f"last: {breaker['last_refresh_error']}")
     
     with col2:
         st.info("**WordPress API**\n🟢 Connected")
     
     with col3:
         st.info("**WooCommerce API**\n🟢 Operational")
+    
+    # Connection pool
+    with st.expander("🔌 RentCast Connection Pool"):
+        pool_stats = get_rentcast_pool_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Requests", pool_stats['requests'])
+        with col2:
+            st.metric("Connections Opened", pool_stats['connections_opened'])
+        with col3:
+            st.metric("Connection Reuse", f"{pool_stats['connection_reuse_pct']}%")
+        with col4:
+            st.metric("Avg Latency", f"{pool_stats['avg_latency_ms']} ms")
+        st.caption(f"Retries: {pool_stats['retries']} • Network errors: {pool_stats['errors']} • "
+                   f"Idle connections: {pool_stats['idle_connections']}/{pool_stats['pool_size']}")
+    
+    # Rate limiter
+    with st.expander("🚦 RentCast Rate Limiter"):
+        limiter_stats = get_rate_limit_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Requests Admitted", limiter_stats['acquired'])
+        with col2:
+            st.metric("Queued", limiter_stats['queued'])
+        with col3:
+            st.metric("Avg / Max Wait", f"{limiter_stats['avg_wait_ms']} / {limiter_stats['max_wait_ms']} ms")
+        with col4:
+            st.metric("Timed Out", limiter_stats['timeouts'])
+        st.caption(f"{limiter_stats['rate']:g} req/s, burst {limiter_stats['capacity']:g} "
+                   f"({limiter_stats['backend']} backend)")
+        st.bar_chart({str(k): v for k, v in limiter_stats['wait_histogram_ms'].items()})
+    
+    # Response cache
+    with st.expander("🗄️ RentCast Response Cache"):
+        cache_stats = get_cache_stats()
+        if not cache_stats:
+            st.info("The response cache is empty.")
+        for endpoint, counts in cache_stats.items():
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric(f"/{endpoint} Entries", counts['entries'])
+            with col2:
+                st.metric("Hits", counts['hits'])
+            with col3:
+                st.metric("Misses", counts['misses'])
+            with col4:
+                st.metric("Hit Rate", f"{counts['hit_rate']}%")
+        
+        coalescing = get_coalescing_stats()
+        st.caption(f"Coalesced requests: {coalescing['coalesced']} of {coalescing['calls']} "
+                   f"upstream requests ({coalescing['coalesced_pct']}%) shared another session's "
+                   f"in-flight call • In flight now: {coalescing['in_flight']}")
+    
+    # Outbound call latency
+    with st.expander("📈 Outbound API Latency"):
+        rows = latency_summary()
+        if rows:
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+            st.caption("p50/p95 are histogram bucket upper bounds. Prometheus metrics are served at "
+                       "/metrics when METRICS_PORT is set.")
+        else:
+            st.info("No outbound calls recorded in this process yet.")
+    
+    # Market prefetcher
+    with st.expander("🌙 Market Data Prefetcher"):
+        prefetch_stats = get_market_prefetcher().stats()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Status", "Running" if prefetch_stats['running'] else "Stopped")
+        with col2:
+            st.metric("Budget Used Today", f"{prefetch_stats['budget_used_today']}/{prefetch_stats['daily_budget']}")
+        with col3:
+            st.metric("ZIPs Prefetched", prefetch_stats['fetched'])
+        with col4:
+            st.metric("Queued ZIPs", prefetch_stats['queued'])
+        st.caption(f"Runs during off-peak hours {prefetch_stats['off_peak_hours']} (server time) • "
+                   f"{prefetch_stats['skipped_warm']} already-warm ZIPs skipped • "
+                   f"{prefetch_stats['errors']} errors")
+        if prefetch_stats['last_error']:
+            st.caption(f"Last error: {prefetch_stats['last_error']}")
+
+    # Usage writer
+    with st.expander("📝 Usage Log Writer"):
+        writer_stats = get_usage_counter().stats()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Status", "Running" if writer_stats['running'] else "Idle")
+        with col2:
+            st.metric("Pending Rows", writer_stats['pending'])
+        with col3:
+            st.metric("Rows Written", writer_stats['rows_flushed'])
+        with col4:
+            st.metric("Users Cached", writer_stats['users'])
+        st.caption(f"Flushes every {writer_stats['flush_interval']:g}s • "
+                   f"{writer_stats['rows_to_outbox']} rows sent to the offline outbox • "
+                   f"{writer_stats['reconciles']} reconciles")
+        if writer_stats['last_error']:
+            st.caption(f"Last error: {writer_stats['last_error']}")
 
 def usage_statistics_tab(user_id: int):
     """Display detailed usage statistics"""
     st.subheader("📊 Usage Statistics")
     
-    usage_data = get_user_usage(user_id)
+    usage_data = render(get_user_usage(user_id))
+    if usage_data is None:
+        return
     
     # Current month usage
     col1, col2, col3 = st.columns(3)
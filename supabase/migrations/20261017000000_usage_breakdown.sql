@@ -0,0 +1,28 @@
+-- Grouped usage counts for the sidebar and Settings -> Usage Statistics.
+-- utils/usage.get_user_usage() calls usage_breakdown through RPC, so only one
+-- row per (query type, day) leaves the database, however long a user's
+-- history is. Lifetime totals use a head-only count(*) query.
+--
+-- api_usage.user_id holds the Supabase auth user id. The function only ever
+-- counts the caller's own rows (auth.uid()), so it is not granted to anon.
+
+create index if not exists api_usage_user_created_idx
+    on public.api_usage (user_id, created_at);
+
+create or replace function public.usage_breakdown(p_since timestamptz)
+returns table (query_type text, day date, count bigint)
+language sql
+stable
+as $$
+    select coalesce(u.query_type, 'property_search') as query_type,
+           (u.created_at at time zone 'utc')::date as day,
+           count(*) as count
+    from public.api_usage u
+    where u.user_id = auth.uid()
+      and u.created_at >= p_since
+    group by 1, 2
+    order by 2, 1;
+$$;
+
+revoke execute on function public.usage_breakdown(timestamptz) from public, anon;
+grant execute on function public.usage_breakdown(timestamptz) to authenticated;
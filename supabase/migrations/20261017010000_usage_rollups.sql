@@ -0,0 +1,113 @@
+-- Materialized usage rollups: one row per (user, day, query type) with the
+-- month alongside for indexed monthly reads. An insert trigger on api_usage
+-- keeps them current, so every writer (log_usage, log_usage_batch and
+-- replayed offline writes) updates them in the same transaction as the
+-- events. Usage views read a handful of rollup rows instead of raw events.
+-- Row-level security limits every signed-in user to their own rollups.
+
+create table if not exists public.api_usage_rollups (
+    user_id uuid not null,         -- Supabase auth user id, as in api_usage
+    month date not null,           -- first day of the month, UTC
+    day date not null,             -- UTC
+    query_type text not null,
+    count bigint not null default 0,
+    primary key (user_id, day, query_type)
+);
+
+create index if not exists api_usage_rollups_user_month_idx
+    on public.api_usage_rollups (user_id, month);
+
+alter table public.api_usage_rollups enable row level security;
+
+drop policy if exists "Users read their own rollups" on public.api_usage_rollups;
+create policy "Users read their own rollups" on public.api_usage_rollups
+    for select to authenticated using (user_id = auth.uid());
+
+-- Written only by the trigger below, read only through the policy above
+revoke all on public.api_usage_rollups from public, anon, authenticated;
+grant select on public.api_usage_rollups to authenticated;
+
+
+-- Incremental maintenance: one grouped upsert per insert statement, so a
+-- batched insert of N events costs one rollup write per (day, type).
+create or replace function public.bump_usage_rollups()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into public.api_usage_rollups as r (user_id, month, day, query_type, count)
+    select i.user_id,
+           date_trunc('month', coalesce(i.created_at, now()) at time zone 'utc')::date,
+           (coalesce(i.created_at, now()) at time zone 'utc')::date,
+           coalesce(i.query_type, 'property_search'),
+           count(*)
+    from inserted i
+    where i.user_id is not null
+    group by 1, 2, 3, 4
+    on conflict (user_id, day, query_type)
+        do update set count = r.count + excluded.count;
+    return null;
+end;
+$$;
+
+drop trigger if exists api_usage_rollup on public.api_usage;
+create trigger api_usage_rollup
+    after insert on public.api_usage
+    referencing new table as inserted
+    for each statement execute function public.bump_usage_rollups();
+
+
+-- The caller's lifetime total from the rollups (a few hundred rows per user per year).
+create or replace function public.usage_total()
+returns bigint
+language sql
+stable
+as $$
+    select coalesce(sum(count), 0)::bigint from public.api_usage_rollups where user_id = auth.uid();
+$$;
+
+revoke execute on function public.usage_total() from public, anon;
+grant execute on function public.usage_total() to authenticated;
+
+
+-- Rebuild rollups from api_usage events for days in [p_from, p_to), or for
+-- all history when both are null. Blocks concurrent event inserts while it
+-- runs so the trigger cannot double count. Used by the initial backfill
+-- below and by tools/backfill_usage_rollups.py. Returns rollup rows written.
+create or replace function public.backfill_usage_rollups(p_from date default null, p_to date default null)
+returns bigint
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    written bigint;
+begin
+    lock table public.api_usage in share row exclusive mode;
+
+    delete from public.api_usage_rollups
+    where (p_from is null or day >= p_from)
+      and (p_to is null or day < p_to);
+
+    insert into public.api_usage_rollups (user_id, month, day, query_type, count)
+    select u.user_id,
+           date_trunc('month', coalesce(u.created_at, now()) at time zone 'utc')::date,
+           (coalesce(u.created_at, now()) at time zone 'utc')::date,
+           coalesce(u.query_type, 'property_search'),
+           count(*)
+    from public.api_usage u
+    where u.user_id is not null
+      and (p_from is null or (u.created_at at time zone 'utc')::date >= p_from)
+      and (p_to is null or (u.created_at at time zone 'utc')::date < p_to)
+    group by 1, 2, 3, 4;
+
+    get diagnostics written = row_count;
+    return written;
+end;
+$$;
+
+revoke execute on function public.backfill_usage_rollups(date, date) from public, anon, authenticated;
+
+select public.backfill_usage_rollups();
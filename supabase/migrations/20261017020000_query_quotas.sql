@@ -0,0 +1,125 @@
+-- Monthly RentCast query quota, charged atomically.
+-- consume_query_quota() checks the allowance and increments it in a single
+-- UPDATE, so a charged API call costs one round trip and concurrent tabs
+-- cannot lose increments. Callers that charge before the upstream call give
+-- unused units back with refund_query_quota().
+--
+-- Both functions act on the caller's own row (auth.uid(), the Supabase auth
+-- user id) and are not granted to anon. A refund can only return units
+-- charged this month that have not been refunded yet.
+
+create table if not exists public.query_quotas (
+    user_id uuid primary key,             -- Supabase auth user id
+    email text,
+    period date not null,                 -- first day of the month being counted, UTC
+    used integer not null default 0 check (used >= 0),
+    refundable integer not null default 0 check (refundable >= 0),  -- charged this month, not yet refunded
+    updated_at timestamptz not null default now()
+);
+
+-- Seed from the old per-user counter rows in api_usage, if any
+insert into public.query_quotas (user_id, email, period, used)
+select distinct on (user_id) user_id, email, date_trunc('month', now() at time zone 'utc')::date, queries
+from public.api_usage
+where queries is not null and user_id is not null
+order by user_id, queries desc
+on conflict (user_id) do nothing;
+
+alter table public.query_quotas enable row level security;
+
+drop policy if exists "Users read their own quota" on public.query_quotas;
+create policy "Users read their own quota" on public.query_quotas
+    for select to authenticated using (user_id = auth.uid());
+
+-- Written only by the functions below
+revoke all on public.query_quotas from public, anon, authenticated;
+grant select on public.query_quotas to authenticated;
+
+
+-- The calling user; raises for anonymous callers
+create or replace function public.quota_user()
+returns uuid
+language plpgsql
+stable
+as $$
+begin
+    if auth.uid() is null then
+        raise exception 'not signed in' using errcode = '42501';
+    end if;
+    return auth.uid();
+end;
+$$;
+
+
+-- Charge p_amount units if they fit under p_limit (no cap when p_limit is
+-- null). The month rolls over inside the same statement. Returns
+-- {"allowed", "used", "remaining"}; remaining is null without a cap.
+create or replace function public.consume_query_quota(
+    p_amount integer default 1,
+    p_limit integer default null,
+    p_email text default null
+)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    this_period date := date_trunc('month', now() at time zone 'utc')::date;
+    caller uuid := public.quota_user();
+    quota public.query_quotas;
+    current_used integer;
+begin
+    if p_amount < 0 then
+        raise exception 'p_amount must be >= 0';
+    end if;
+
+    insert into public.query_quotas (user_id, email, period, used)
+    values (caller, p_email, this_period, 0)
+    on conflict (user_id) do nothing;
+
+    update public.query_quotas q
+       set used = (case when q.period < this_period then 0 else q.used end) + p_amount,
+           refundable = (case when q.period < this_period then 0 else q.refundable end) + p_amount,
+           period = this_period,
+           email = coalesce(p_email, q.email),
+           updated_at = now()
+     where q.user_id = caller
+       and (p_limit is null
+            or (case when q.period < this_period then 0 else q.used end) + p_amount <= p_limit)
+    returning * into quota;
+
+    if found then
+        return jsonb_build_object('allowed', true, 'used', quota.used,
+                                  'remaining', case when p_limit is null then null else p_limit - quota.used end);
+    end if;
+
+    select * into quota from public.query_quotas where user_id = caller;
+    current_used := case when quota.period < this_period then 0 else quota.used end;
+    return jsonb_build_object('allowed', false, 'used', current_used,
+                              'remaining', greatest(p_limit - current_used, 0));
+end;
+$$;
+
+-- Give back units charged this month that were not spent, up to what was
+-- charged and not refunded yet. Returns the units now used.
+create or replace function public.refund_query_quota(p_amount integer default 1)
+returns integer
+language sql
+security definer
+set search_path = public
+as $$
+    update public.query_quotas
+       set used = greatest(used - least(greatest(p_amount, 0), refundable), 0),
+           refundable = refundable - least(greatest(p_amount, 0), refundable),
+           updated_at = now()
+     where user_id = public.quota_user()
+       and period = date_trunc('month', now() at time zone 'utc')::date
+    returning used;
+$$;
+
+revoke execute on function public.quota_user() from public, anon;
+revoke execute on function public.consume_query_quota(integer, integer, text) from public, anon;
+revoke execute on function public.refund_query_quota(integer) from public, anon;
+grant execute on function public.consume_query_quota(integer, integer, text) to authenticated;
+grant execute on function public.refund_query_quota(integer) to authenticated;
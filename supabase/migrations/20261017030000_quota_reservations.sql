@@ -0,0 +1,181 @@
+-- Quota reservations for batch and concurrent lookups.
+-- A caller reserves N units up front; the server grants what is left under
+-- the limit after this month's usage and every other live reservation. The
+-- caller then commits the units it actually used, and the rest go back.
+-- Reservations expire after their TTL, so a session that dies mid-batch
+-- cannot hold quota for long. Charges, reservations and commits all lock the
+-- user's query_quotas row first, so they serialize per user. Like the quota
+-- functions, reserve and commit act on the caller (auth.uid()) only and are
+-- not granted to anon.
+
+create table if not exists public.quota_reservations (
+    id uuid primary key default gen_random_uuid(),
+    user_id uuid not null,
+    units integer not null check (units > 0),
+    created_at timestamptz not null default now(),
+    expires_at timestamptz not null
+);
+
+create index if not exists quota_reservations_user_idx
+    on public.quota_reservations (user_id, expires_at);
+
+-- Only the functions below touch reservations
+alter table public.quota_reservations enable row level security;
+revoke all on public.quota_reservations from public, anon, authenticated;
+
+
+-- Lock (creating if needed) the user's quota row for this month and return it
+create or replace function public.lock_query_quota(p_user_id uuid, p_email text default null)
+returns public.query_quotas
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    this_period date := date_trunc('month', now() at time zone 'utc')::date;
+    quota public.query_quotas;
+begin
+    insert into public.query_quotas (user_id, email, period, used)
+    values (p_user_id, p_email, this_period, 0)
+    on conflict (user_id) do nothing;
+
+    select * into quota from public.query_quotas where user_id = p_user_id for update;
+    if quota.period < this_period then
+        update public.query_quotas set used = 0, refundable = 0, period = this_period, updated_at = now()
+        where user_id = p_user_id
+        returning * into quota;
+    end if;
+    return quota;
+end;
+$$;
+
+-- Units held by live reservations (expired ones are swept first)
+create or replace function public.reserved_query_quota(p_user_id uuid)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    delete from public.quota_reservations where user_id = p_user_id and expires_at <= now();
+    return coalesce((select sum(units) from public.quota_reservations where user_id = p_user_id), 0);
+end;
+$$;
+
+
+-- consume_query_quota now also leaves room for other sessions' reservations
+create or replace function public.consume_query_quota(
+    p_amount integer default 1,
+    p_limit integer default null,
+    p_email text default null
+)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    caller uuid := public.quota_user();
+    quota public.query_quotas;
+    available integer;
+begin
+    if p_amount < 0 then
+        raise exception 'p_amount must be >= 0';
+    end if;
+
+    quota := public.lock_query_quota(caller, p_email);
+    if p_limit is not null then
+        available := greatest(p_limit - quota.used - public.reserved_query_quota(caller), 0);
+        if p_amount > available then
+            return jsonb_build_object('allowed', false, 'used', quota.used, 'remaining', available);
+        end if;
+    end if;
+
+    update public.query_quotas
+       set used = used + p_amount, refundable = refundable + p_amount,
+           email = coalesce(p_email, email), updated_at = now()
+     where user_id = caller
+    returning * into quota;
+    return jsonb_build_object('allowed', true, 'used', quota.used,
+                              'remaining', case when p_limit is null then null else available - p_amount end);
+end;
+$$;
+
+
+-- Hold up to p_units for p_ttl_seconds. Returns {"reservation_id", "granted",
+-- "remaining"}; reservation_id is null when nothing could be granted.
+create or replace function public.reserve_query_quota(
+    p_units integer,
+    p_limit integer,
+    p_ttl_seconds integer default 300,
+    p_email text default null
+)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    caller uuid := public.quota_user();
+    quota public.query_quotas;
+    available integer;
+    granted integer;
+    new_id uuid;
+begin
+    if p_units <= 0 then
+        raise exception 'p_units must be > 0';
+    end if;
+
+    quota := public.lock_query_quota(caller, p_email);
+    available := greatest(p_limit - quota.used - public.reserved_query_quota(caller), 0);
+    granted := least(p_units, available);
+    if granted > 0 then
+        insert into public.quota_reservations (user_id, units, expires_at)
+        values (caller, granted, now() + make_interval(secs => p_ttl_seconds))
+        returning id into new_id;
+    end if;
+    return jsonb_build_object('reservation_id', new_id, 'granted', granted, 'remaining', available - granted);
+end;
+$$;
+
+
+-- Charge the units actually used and release the reservation. Units that
+-- were used are charged even if the reservation already expired, since the
+-- upstream calls were made. Only the caller's own reservations are released.
+create or replace function public.commit_query_quota_reservation(
+    p_reservation_id uuid,
+    p_used integer
+)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    caller uuid := public.quota_user();
+    quota public.query_quotas;
+    held integer;
+begin
+    quota := public.lock_query_quota(caller);
+    delete from public.quota_reservations
+    where id = p_reservation_id and user_id = caller
+    returning units into held;
+
+    if p_used > 0 then
+        update public.query_quotas
+           set used = used + p_used, updated_at = now()
+         where user_id = caller
+        returning * into quota;
+    end if;
+    return jsonb_build_object('used', quota.used, 'committed', greatest(p_used, 0),
+                              'released', greatest(coalesce(held, 0) - greatest(p_used, 0), 0),
+                              'expired', held is null);
+end;
+$$;
+
+revoke execute on function public.reserve_query_quota(integer, integer, integer, text) from public, anon;
+revoke execute on function public.commit_query_quota_reservation(uuid, integer) from public, anon;
+grant execute on function public.reserve_query_quota(integer, integer, integer, text) to authenticated;
+grant execute on function public.commit_query_quota_reservation(uuid, integer) to authenticated;
+revoke execute on function public.lock_query_quota(uuid, text) from public, anon, authenticated;
+revoke execute on function public.reserved_query_quota(uuid) from public, anon, authenticated;
@@ -0,0 +1,218 @@
+"""
+Shared test setup: makes the repository importable, points the response
+cache at a throwaway directory and gives the app config placeholder
+credentials. Fakes stand in for RentCast and for the quota functions of
+supabase/migrations.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Read at import time by utils/, so set before anything imports them
+TMP = Path(tempfile.mkdtemp(prefix="tests-"))
+os.environ["API_CACHE_PATH"] = str(TMP / "api_cache.sqlite3")
+
+# Placeholders only: tests replace every client that would use them. The
+# environment wins over secrets.toml in utils/config.py.
+os.environ.update({
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_ANON_KEY": "test",
+    "RENTCAST_API_KEY": "test",
+    "WP_BASE_URL": "http://127.0.0.1:9",
+    "WP_USERNAME": "test",
+    "WP_PASSWORD": "test",
+    "WC_CONSUMER_KEY": "test",
+    "WC_CONSUMER_SECRET": "test",
+})
+
+import datetime  # noqa: E402
+import json  # noqa: E402
+import threading  # noqa: E402
+from typing import Dict, List  # noqa: E402
+
+import pytest  # noqa: E402
+import requests  # noqa: E402
+from postgrest.exceptions import APIError  # noqa: E402
+
+
+# ------------------------
+# Fake RentCast
+# ------------------------
+class FakeRentCast:
+    """
+    Stands in for the RentCast HTTP call (rentcast_api._rentcast_get).
+
+    Records every request. ``fail[address] = status`` answers that address
+    with an error status, and clearing ``gate`` holds requests until it is set.
+    """
+
+    def __init__(self):
+        self.calls: List = []
+        self.fail: Dict[str, int] = {}
+        self.gate = threading.Event()
+        self.gate.set()
+        self._lock = threading.Lock()
+
+    def get(self, path, params):
+        address = params.get("address", "")
+        with self._lock:
+            self.calls.append((path, address))
+        assert self.gate.wait(5), "request held past the test timeout"
+        status = self.fail.get(address, 200)
+        if path == "/properties":
+            body = [{"formattedAddress": address, "price": 250000, "rentEstimate": {"rent": 1900}}]
+        else:
+            body = {"path": path, "address": address}
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(body if status == 200 else {"message": "error"}).encode()
+        response.headers["Content-Type"] = "application/json"
+        return response
+
+    def paths(self) -> List[str]:
+        return [path for path, _ in self.calls]
+
+
+@pytest.fixture
+def rentcast(monkeypatch) -> FakeRentCast:
+    """Replaces the RentCast HTTP call, behind a fresh circuit breaker"""
+    from utils import rentcast_api
+    from utils.circuit_breaker import CircuitBreaker
+
+    fake = FakeRentCast()
+    monkeypatch.setattr(rentcast_api, "_rentcast_get", fake.get)
+    monkeypatch.setattr(rentcast_api, "_breaker", CircuitBreaker("RentCast", failure_threshold=3,
+                                                                 recovery_timeout=0.2, latency_budget=0.5))
+    yield fake
+    # Stale entries queue background refreshes; none may outlive the fake
+    with rentcast_api._refresh_lock:
+        rentcast_api._refresh_pending.clear()
+
+
+# ------------------------
+# Fake Supabase
+# ------------------------
+class FakeResponse:
+    def __init__(self, data=None):
+        self.data = data
+
+
+class FakeQuery:
+    """Chainable stand-in for a PostgREST request; filters are recorded, not applied"""
+
+    def __init__(self, run):
+        self._run = run
+        self.filters: Dict = {}
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def execute(self):
+        return self._run(self)
+
+
+class FakeSupabase:
+    """
+    The quota functions of supabase/migrations, in memory, for one user.
+
+    Like the database they act on the caller (auth.uid()) and never take a
+    user id. Set ``fail[name]`` to an exception to make that call raise.
+    """
+
+    def __init__(self, user_id: str = "user-1"):
+        self.user_id = user_id
+        self.used = 0
+        self.refundable = 0
+        self.reservations: Dict[str, int] = {}
+        self.calls: List = []
+        self.fail: Dict[str, Exception] = {}
+
+    def rpc(self, name: str, params: Dict) -> FakeQuery:
+        def run(query):
+            self.calls.append((name, dict(params)))
+            if name in self.fail:
+                raise self.fail[name]
+            return FakeResponse(getattr(self, name)(**params))
+        return FakeQuery(run)
+
+    def table(self, name: str) -> FakeQuery:
+        def run(query):
+            self.calls.append((f"{name}.select", dict(query.filters)))
+            if name in self.fail:
+                raise self.fail[name]
+            period = datetime.datetime.utcnow().strftime("%Y-%m-01")
+            return FakeResponse([{"used": self.used, "period": period}])
+        return FakeQuery(run)
+
+    def reserved(self) -> int:
+        return sum(self.reservations.values())
+
+    def consume_query_quota(self, p_amount=1, p_limit=None, p_email=None):
+        available = None if p_limit is None else max(p_limit - self.used - self.reserved(), 0)
+        if available is not None and p_amount > available:
+            return {"allowed": False, "used": self.used, "remaining": available}
+        self.used += p_amount
+        self.refundable += p_amount
+        return {"allowed": True, "used": self.used,
+                "remaining": None if available is None else available - p_amount}
+
+    def refund_query_quota(self, p_amount=1):
+        refunded = min(max(p_amount, 0), self.refundable)
+        self.used -= refunded
+        self.refundable -= refunded
+        return self.used
+
+    def reserve_query_quota(self, p_units, p_limit, p_ttl_seconds=300, p_email=None):
+        available = max(p_limit - self.used - self.reserved(), 0)
+        granted = min(p_units, available)
+        reservation_id = None
+        if granted:
+            reservation_id = f"reservation-{len(self.calls)}"
+            self.reservations[reservation_id] = granted
+        return {"reservation_id": reservation_id, "granted": granted, "remaining": available - granted}
+
+    def commit_query_quota_reservation(self, p_reservation_id, p_used):
+        held = self.reservations.pop(p_reservation_id, None)
+        self.used += max(p_used, 0)
+        return {"used": self.used, "committed": max(p_used, 0),
+                "released": max((held or 0) - max(p_used, 0), 0), "expired": held is None}
+
+    def names(self) -> List[str]:
+        return [name for name, _ in self.calls]
+
+
+def missing_function() -> APIError:
+    return APIError({"code": "PGRST202", "message": "Could not find the function"})
+
+
+def permission_denied() -> APIError:
+    return APIError({"code": "42501", "message": "permission denied"})
+
+
+@pytest.fixture
+def supabase(monkeypatch) -> FakeSupabase:
+    """A signed-in user's client: get_user_client() returns this fake"""
+    from utils import database
+    from utils.offline import get_outbox, mark_online, set_offline
+
+    fake = FakeSupabase()
+    monkeypatch.setattr(database, "get_user_client", lambda: fake)
+    monkeypatch.setattr(database, "session_user_id", lambda: fake.user_id)
+    monkeypatch.setitem(database._server_features, "query_quotas", True)
+    monkeypatch.setitem(database._server_features, "quota_reservations", True)
+    set_offline(False)
+    mark_online()
+    outbox = get_outbox()
+    for entry in outbox.entries():
+        outbox.discard(entry["id"])
+    yield fake
+    set_offline(False)
+    mark_online()
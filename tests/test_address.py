@@ -0,0 +1,29 @@
+from utils.address import AddressIndex, canonical_key, parse_address, property_key
+
+
+def test_spelling_variants_share_one_key():
+    assert canonical_key("123 North Main Street, Springfield, Illinois 62704") == \
+        canonical_key("123 n main st springfield il")
+
+
+def test_units_are_kept_apart():
+    assert canonical_key("10 Elm St Apt 4, Austin, TX") != canonical_key("10 Elm St Apt 5, Austin, TX")
+
+
+def test_display_is_sendable_upstream():
+    assert parse_address("5500 grand lake drive, san antonio, tx, 78244").display() == \
+        "5500 Grand Lake Dr, San Antonio, TX 78244"
+
+
+def test_index_fills_in_a_zip_seen_earlier():
+    index = AddressIndex()
+    index.normalize("77 Oak Ave, Denver, CO 80203")
+
+    assert index.normalize("77 Oak Avenue, Denver, CO").zip_code == "80203"
+
+
+def test_property_key_matches_rentcast_and_saved_shapes():
+    rentcast = {"formattedAddress": "9 Pine Rd, Boise, ID 83702"}
+    saved = {"address": "9 Pine Road", "city": "Boise", "state": "ID", "zipCode": "83702"}
+
+    assert property_key(rentcast) == property_key(saved)
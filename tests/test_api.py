@@ -0,0 +1,111 @@
+import itertools
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from utils.errors import ConfigError
+
+_numbers = itertools.count(1)
+
+
+def address():
+    return f"{next(_numbers)} Api Ave, Denver, CO 80202"
+
+
+@pytest.fixture
+def client(rentcast, monkeypatch):
+    monkeypatch.setattr(api, "API_TOKEN", "secret")
+    # Not entered as a context manager: the lifespan would shut down the
+    # module's worker pool, which later tests still need
+    return TestClient(api.app, headers={"Authorization": "Bearer secret"})
+
+
+def test_lookup_returns_the_projected_record(client, rentcast):
+    target = address()
+    response = client.get("/v1/lookup", params={"address": target})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "fetched"
+    assert body["property"]["price"] == 250000
+    assert "analysis" not in body
+
+
+def test_failed_lookups_map_to_http_errors(client, rentcast):
+    missing, broken = address(), address()
+    rentcast.fail[missing] = 404
+    rentcast.fail[broken] = 500
+
+    assert client.get("/v1/lookup", params={"address": missing}).status_code == 404
+    assert client.get("/v1/lookup", params={"address": broken}).status_code == 502
+
+
+def test_analyze_accepts_a_payload_without_calling_upstream(client, rentcast):
+    response = client.post("/v1/analyze", json={"property": {"formattedAddress": "1 Payload Pl",
+                                                             "price": 300000, "rentEstimate": {"rent": 2400}}})
+
+    assert response.status_code == 200
+    assert response.json()["property"]["rent"] == 2400
+    assert rentcast.calls == []
+
+
+def test_batch_caps_upstream_calls(client, rentcast):
+    batch = [address() for _ in range(3)]
+    response = client.post("/v1/analyze/batch", json={"addresses": batch, "max_fetches": 2})
+
+    assert response.json()["summary"] == {"fetched": 2, "over_quota": 1}
+    assert len(rentcast.calls) == 2
+
+
+def test_batch_streams_ndjson(client, rentcast):
+    batch = [address() for _ in range(2)]
+    response = client.post("/v1/analyze/batch", params={"stream": "true"}, json={"addresses": batch})
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(row["address"] for row in rows) == sorted(batch)
+
+
+def test_portfolio_metrics(client):
+    response = client.post("/v1/portfolio/metrics", json={"properties": [
+        {"price": 200000, "rentEstimate": {"rent": 2000}},
+        {"price": 300000, "rentEstimate": {"rent": 2500}},
+    ]})
+
+    assert response.status_code == 200
+    assert response.json()["total_value"] == 500000
+
+
+def test_requests_need_the_token(client, monkeypatch):
+    params = {"address": address()}
+    assert client.get("/v1/lookup", params=params, headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/health", headers={"Authorization": ""}).status_code == 200
+
+    monkeypatch.setattr(api, "API_TOKEN", "")
+    assert client.get("/v1/lookup", params=params).status_code == 503
+    with pytest.raises(ConfigError):
+        with TestClient(api.app):
+            pass
+
+
+def test_every_lookup_draws_on_the_daily_budget(client, rentcast, monkeypatch):
+    monkeypatch.setattr(api, "API_DAILY_FETCHES", api.fetches_used_today() + 2)
+    first, second, third = address(), address(), address()
+
+    assert client.get("/v1/lookup", params={"address": first}).status_code == 200
+    assert client.get("/v1/lookup", params={"address": first}).json()["status"] == "cached"
+    response = client.post("/v1/analyze/batch", json={"addresses": [second, third]})
+
+    assert response.json()["summary"] == {"fetched": 1, "over_quota": 1}
+    assert client.get("/v1/lookup", params={"address": address()}).status_code == 429
+    assert len(rentcast.calls) == 2
+
+
+def test_failed_calls_return_their_budget(client, rentcast):
+    broken = address()
+    rentcast.fail[broken] = 500
+    used = api.fetches_used_today()
+
+    assert client.get("/v1/lookup", params={"address": broken}).status_code == 502
+    assert api.fetches_used_today() == used
@@ -0,0 +1,83 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.api_cache import ApiCache
+
+
+def test_round_trip_and_expiry(tmp_path):
+    cache = ApiCache(tmp_path / "cache.sqlite3")
+    cache.set("ns", "key", {"a": 1}, ttl=60)
+    cache.set("ns", "old", {"a": 2}, ttl=-1)
+
+    assert cache.get("ns", "key") == {"a": 1}
+    assert cache.get("ns", "old") is None
+    assert cache.get("other", "key") is None
+
+
+def test_entries_survive_a_new_instance(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    ApiCache(path).set("ns", "key", [1, 2, 3], ttl=60)
+
+    assert ApiCache(path).get("ns", "key") == [1, 2, 3]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ApiCache(tmp_path / "cache.sqlite3", max_entries=2)
+    cache.set("ns", "a", 1, ttl=60)
+    time.sleep(0.01)
+    cache.set("ns", "b", 2, ttl=60)
+    time.sleep(0.01)
+    cache.set("ns", "c", 3, ttl=60)
+
+    fresh = ApiCache(tmp_path / "cache.sqlite3")
+    assert fresh.get("ns", "a") is None
+    assert fresh.get("ns", "c") == 3
+
+
+def test_stats_count_hits_and_misses(tmp_path):
+    cache = ApiCache(tmp_path / "cache.sqlite3")
+    cache.set("ns", "key", 1, ttl=60)
+    cache.get("ns", "key")
+    cache.get("ns", "missing")
+
+    stats = cache.stats()["ns"]
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 50.0
+
+
+def test_counters_never_pass_their_limit_across_processes(tmp_path):
+    # Two instances on one file stand in for two app processes
+    caches = [ApiCache(tmp_path / "cache.sqlite3"), ApiCache(tmp_path / "cache.sqlite3")]
+
+    def spend(cache):
+        return sum(cache.increment("budget", "today", 1, limit=5) for _ in range(10))
+
+    with ThreadPoolExecutor(4) as pool:
+        granted = sum(pool.map(spend, caches * 2))
+
+    assert granted == 5
+    assert caches[0].counter("budget", "today") == 5
+
+
+def test_counters_give_units_back_but_not_below_zero(tmp_path):
+    cache = ApiCache(tmp_path / "cache.sqlite3")
+    cache.increment("budget", "today", 2)
+    cache.increment("budget", "today", -5)
+
+    assert cache.counter("budget", "today") == 0
+    assert cache.counter("budget", "never") == 0
+
+
+def test_evicting_expired_entries_keeps_those_within_the_grace_period(tmp_path):
+    cache = ApiCache(tmp_path / "cache.sqlite3")
+    cache.set("ns", "fresh", 1, ttl=60)
+    cache.set("ns", "recent", 2, ttl=-10)
+    cache.set("ns", "ancient", 3, ttl=-1000)
+
+    assert cache.evict_expired(grace=100) == 1
+    assert cache.get_stale("ns", "recent") is not None
+    assert cache.get_stale("ns", "ancient") is None
+
+    before, after = cache.compact()
+    assert after <= before
+    assert cache.get("ns", "fresh") == 1
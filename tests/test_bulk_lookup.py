@@ -0,0 +1,89 @@
+import asyncio
+import itertools
+import threading
+
+import pytest
+
+from utils import bulk_lookup
+from utils.api_cache import get_api_cache
+from utils.bulk_lookup import iter_bulk_lookup, parse_address_csv, parse_address_text
+from utils.rentcast_api import cache_key
+
+_numbers = itertools.count(1000)
+
+
+def addresses(count):
+    return [f"{next(_numbers)} Bulk St, Tulsa, OK 74103" for _ in range(count)]
+
+
+def run(batch, quota, concurrency=4):
+    async def collect():
+        return [row async for row in iter_bulk_lookup(batch, quota, concurrency)]
+    return {row.address: row for row in asyncio.run(collect())}
+
+
+def test_parsers_drop_blanks_and_spelling_variants():
+    assert parse_address_text("1 Main St, Waco, TX\n\n1 main street waco tx\n2 Main St, Waco, TX") == \
+        ["1 Main St, Waco, TX", "2 Main St, Waco, TX"]
+    assert parse_address_csv("street,city,state\n3 Oak Ave,Waco,TX\n") == ["3 Oak Ave, Waco, TX"]
+
+
+def test_cached_rows_are_free_and_the_rest_stop_at_the_quota(rentcast):
+    cached, *uncached = addresses(4)
+    get_api_cache().set("properties", cache_key(cached), [{"formattedAddress": cached}], ttl=60)
+
+    rows = run([cached] + uncached, quota=2)
+
+    assert rows[cached].status == "cached"
+    assert sorted(row.status for row in rows.values()) == ["cached", "fetched", "fetched", "over_quota"]
+    assert len(rentcast.calls) == 2
+
+
+def test_failed_upstream_calls_give_their_unit_back(rentcast):
+    failing, other = addresses(2)
+    rentcast.fail[failing] = 500
+
+    rows = run([failing, other], quota=1, concurrency=1)
+
+    assert rows[failing].status == "error"
+    assert rows[other].status == "fetched"
+
+
+def test_each_address_probes_the_cache_once(rentcast, monkeypatch):
+    probes = []
+    monkeypatch.setattr(bulk_lookup, "get_cached", lambda endpoint, address: probes.append(address))
+
+    batch = addresses(3)
+    run(batch, quota=1)
+
+    assert sorted(probes) == sorted(batch)
+
+
+def test_closing_early_drops_queued_lookups_and_waits_for_running_ones(rentcast):
+    batch = addresses(5)
+    rentcast.gate.clear()
+    threading.Timer(0.2, rentcast.gate.set).start()
+
+    async def close_early():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        rows = iter_bulk_lookup(batch, 5, concurrency=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(rows.__anext__(), 0.05)
+        ticker.cancel()
+        return ticks
+
+    ticks = asyncio.run(close_early())
+
+    # The running lookup finished before the generator returned; the rest never started
+    assert rentcast.gate.is_set()
+    assert len(rentcast.calls) == 1
+    # ...and the event loop kept running while it waited
+    assert ticks >= 10
@@ -0,0 +1,38 @@
+import cache_cli
+from utils.api_cache import get_api_cache
+
+
+def test_warm_fetches_once_then_reports_cached(rentcast, capsys):
+    argv = ["warm", "--address", "10 Warm Way, Reno, NV 89501", "--zip", "89501"]
+
+    assert cache_cli.main(argv) == 0
+    assert "fetched 2" in capsys.readouterr().out
+    assert cache_cli.main(argv) == 0
+    assert "cached 2" in capsys.readouterr().out
+    assert rentcast.paths() == ["/properties", "/markets"]
+
+
+def test_warm_reads_addresses_and_zips_from_a_file(rentcast, tmp_path, capsys):
+    targets = tmp_path / "targets.txt"
+    targets.write_text("# to warm\n11 Warm Way, Reno, NV 89501\n\n89502\n")
+
+    assert cache_cli.main(["warm", "--file", str(targets), "--limit", "1"]) == 0
+    assert rentcast.paths() == ["/properties"]
+
+
+def test_failed_lookups_set_the_exit_code(rentcast, capsys):
+    address = "12 Broken Blvd, Reno, NV 89501"
+    rentcast.fail[address] = 500
+
+    assert cache_cli.main(["warm", "--address", address]) == 1
+    assert "error" in capsys.readouterr().out
+
+
+def test_maintenance_commands(capsys):
+    get_api_cache().set("cli", "gone", 1, ttl=-10)
+
+    assert cache_cli.main(["evict-expired", "--namespace", "cli"]) == 0
+    assert "Removed 1 expired entries." in capsys.readouterr().out
+    assert cache_cli.main(["stats"]) == 0
+    assert cache_cli.main(["compact"]) == 0
+    assert get_api_cache().get_stale("cli", "gone") is None
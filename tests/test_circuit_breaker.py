@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from utils import rentcast_api
+from utils.api_cache import get_api_cache
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from utils.offline import is_offline
+from utils.rentcast_api import RentCastError, cache_key, fetch_resilient
+
+
+def test_opens_after_consecutive_failures_and_recovers_through_one_trial():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=0.05)
+    breaker.record_failure()
+    breaker.record_success(0.01)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success(0.01)
+    assert breaker.state == CLOSED
+
+
+def test_slow_successes_count_as_failures():
+    breaker = CircuitBreaker("test", failure_threshold=1, latency_budget=0.1)
+    breaker.record_success(0.5)
+    assert breaker.state == OPEN
+    assert breaker.stats()["slow_calls"] == 1
+
+
+def test_stale_entry_is_served_while_rentcast_fails(rentcast):
+    address = "3 Stale St, Mobile, AL 36602"
+    get_api_cache().set("properties", cache_key(address), [{"old": True}], ttl=-1)
+    rentcast.fail[address] = 503
+
+    data, chargeable, stale_since = fetch_resilient("properties", address)
+
+    assert data == [{"old": True}]
+    assert not chargeable
+    assert stale_since is not None
+
+
+def test_open_breaker_rejects_without_calling_upstream(rentcast):
+    address = "4 Down Rd, Mobile, AL 36602"
+    rentcast.fail[address] = 500
+    for _ in range(3):
+        with pytest.raises(RentCastError):
+            rentcast_api.fetch_upstream("properties", address)
+
+    with pytest.raises(RentCastError, match="temporarily unavailable"):
+        rentcast_api.fetch_upstream("properties", address)
+    assert len(rentcast.calls) == 3
+
+
+def test_unexpected_errors_release_the_half_open_trial(rentcast, monkeypatch):
+    address = "6 Trial Way, Mobile, AL 36602"
+    rentcast.fail[address] = 500
+    for _ in range(3):
+        with pytest.raises(RentCastError):
+            rentcast_api.fetch_upstream("properties", address)
+    time.sleep(0.25)
+
+    def broken(path, params):
+        raise ValueError("unexpected")
+    monkeypatch.setattr(rentcast_api, "_rentcast_get", broken)
+    with pytest.raises(ValueError):
+        rentcast_api.fetch_upstream("properties", address)
+
+    # The failed trial re-opened the breaker instead of leaving it claimed forever
+    time.sleep(0.25)
+    monkeypatch.setattr(rentcast_api, "_rentcast_get", rentcast.get)
+    del rentcast.fail[address]
+    assert rentcast_api.fetch_upstream("properties", address)
+
+
+def test_refresher_survives_unexpected_errors(rentcast, monkeypatch):
+    def broken(endpoint, address):
+        raise ValueError("unexpected")
+    monkeypatch.setattr(rentcast_api, "fetch_coalesced", broken)
+    errors_before = rentcast_api.get_breaker_stats()["refresh_errors"]
+
+    rentcast_api.schedule_refresh("properties", "7 Loop Ln, Mobile, AL 36602")
+    for _ in range(30):
+        if rentcast_api.get_breaker_stats()["refresh_errors"] > errors_before:
+            break
+        time.sleep(0.1)
+
+    assert rentcast_api.get_breaker_stats()["last_refresh_error"] == "ValueError: unexpected"
+    assert rentcast_api._refresher.is_alive()
+
+
+def test_a_dead_refresher_is_restarted(rentcast, monkeypatch):
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    monkeypatch.setattr(rentcast_api, "_refresher", dead)
+
+    rentcast_api.schedule_refresh("properties", "8 Loop Ln, Mobile, AL 36602")
+
+    assert rentcast_api._refresher is not dead
+    assert rentcast_api._refresher.is_alive()
+
+
+def test_a_call_still_in_flight_after_the_budget_is_chargeable(rentcast, monkeypatch):
+    address = "9 Slow St, Mobile, AL 36602"
+    get_api_cache().set("properties", cache_key(address), [{"old": True}], ttl=-1)
+    monkeypatch.setattr(rentcast_api, "RENTCAST_LATENCY_BUDGET", 0.05)
+    rentcast.gate.clear()
+
+    data, chargeable, stale_since = fetch_resilient("properties", address)
+    rentcast.gate.set()
+
+    assert data == [{"old": True}] and stale_since is not None
+    # The request reached RentCast and is billed even though it answered late
+    assert chargeable
+    assert len(rentcast.calls) == 1
+
+
+def test_connection_errors_trip_the_breaker_without_going_offline(rentcast, monkeypatch):
+    def unreachable(path, params):
+        raise requests.ConnectionError("connection refused")
+
+    monkeypatch.setattr(rentcast_api, "_rentcast_get", unreachable)
+    with pytest.raises(RentCastError, match="Network error"):
+        rentcast_api.fetch_upstream("properties", "6 Refused Rd, Mobile, AL 36602")
+
+    assert not is_offline()
+    assert rentcast_api._breaker.stats()["consecutive_failures"] == 1
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from utils.config import load_config
+from utils.errors import ConfigError, Result, ServiceError
+from utils.ttl_cache import clear_all, ttl_cache
+
+
+def test_environment_wins_over_secrets():
+    secrets = {"supabase": {"url": "https://from-secrets", "key": "legacy-key"},
+               "rentcast": {"api_key": "secret-key"}}
+    config = load_config({"RENTCAST_API_KEY": "env-key"}, secrets)
+
+    assert config.rentcast_key == "env-key"
+    assert config.supabase_url == "https://from-secrets"
+    assert config.supabase_anon_key == "legacy-key"
+    assert config.rentcast_url == "https://api.rentcast.io/v1"
+
+
+def test_missing_settings_are_named():
+    with pytest.raises(ConfigError, match="WP_BASE_URL or \\[wordpress\\] base_url"):
+        load_config({}, {}).require("wp_url")
+
+
+def test_results_carry_values_errors_and_notices():
+    saved = Result.success(True, ("success", "Saved"))
+    assert saved.ok and saved.value and saved.notices == [("success", "Saved")]
+
+    failed = Result.failure(ServiceError("down", "supabase"), []).notify("info", "Showing cached data")
+    assert not failed.ok and failed.value == []
+    assert failed.error.service == "supabase"
+    assert failed.notices == [("info", "Showing cached data")]
+
+
+def test_ttl_cache_memoizes_per_arguments():
+    calls = []
+
+    @ttl_cache(ttl=60)
+    def square(n):
+        calls.append(n)
+        return n * n
+
+    assert square(3) == 9 and square(3) == 9 and square(4) == 16
+    assert calls == [3, 4]
+    square.clear(3)
+    square(3)
+    clear_all()
+    square(4)
+    assert calls == [3, 4, 3, 4]
+
+
+def test_core_modules_do_not_import_streamlit():
+    modules = ["utils.rentcast_api", "utils.database", "utils.usage", "utils.property_management",
+               "utils.woocommerce", "utils.bulk_lookup", "utils.search_pipeline", "utils.rentcast_listings"]
+    code = f"import sys; import {', '.join(modules)}; print('streamlit' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,69 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.http_client import PooledClient, get_client
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures_left = 0
+
+    def do_GET(self):
+        if Handler.failures_left > 0:
+            Handler.failures_left -= 1
+            status, body = 503, b"busy"
+        else:
+            status, body = 200, b"{}"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    Handler.failures_left = 0
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_requests_reuse_one_connection(server):
+    client = PooledClient("reuse")
+    for _ in range(5):
+        assert client.get(f"{server}/ping").status_code == 200
+
+    stats = client.stats()
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connection_reuse_pct"] == 80.0
+
+
+def test_retries_on_5xx_then_succeeds(server):
+    Handler.failures_left = 2
+    client = PooledClient("retry", max_retries=3)
+
+    assert client.get(f"{server}/ping").status_code == 200
+    assert client.stats()["retries"] == 2
+
+
+def test_gives_up_after_max_retries(server):
+    Handler.failures_left = 10
+    client = PooledClient("give-up", max_retries=1)
+
+    assert client.get(f"{server}/ping").status_code == 503
+    assert client.stats()["requests"] == 2
+
+
+def test_registry_returns_one_client_per_name():
+    assert get_client("shared") is get_client("shared")
+    assert get_client("shared") is not get_client("other")
@@ -0,0 +1,116 @@
+import json
+import threading
+
+import pytest
+import requests
+
+from utils import rentcast_listings
+from utils.property_analysis import summarize_listings
+from utils.rentcast_api import RentCastError
+from utils.database import QuotaReservation
+from utils.rentcast_listings import ListingQuery, iter_listings, pages_needed
+
+
+class FakeListings:
+    """Answers listing searches with ``total`` numbered listings"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.offsets = []
+        self._lock = threading.Lock()
+
+    def request(self, path, params):
+        offset, limit = params["offset"], params["limit"]
+        with self._lock:
+            self.offsets.append(offset)
+        page = [{"formattedAddress": f"{i} Main St", "price": 1000 * (i + 1), "propertyType": "Condo"}
+                for i in range(offset, min(offset + limit, self.total))]
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(page).encode()
+        response.headers["Content-Type"] = "application/json"
+        if params.get("includeTotalCount") == "true":
+            response.headers["X-Total-Count"] = str(self.total)
+        return response
+
+
+@pytest.fixture
+def listings(monkeypatch):
+    fake = FakeListings(total=23)
+    monkeypatch.setattr(rentcast_listings, "rentcast_request", fake.request)
+    return fake
+
+
+def test_stream_walks_every_page_once(listings):
+    stream = iter_listings(ListingQuery("sale", city="Austin", state="TX"), page_size=5, prefetch=2)
+
+    records = list(stream)
+
+    assert len(records) == 23
+    assert records[0].price == 1000
+    assert sorted(listings.offsets) == [0, 5, 10, 15, 20]
+    assert stream.total == 23 and stream.fetched == 5
+
+
+def test_pages_are_cached(listings):
+    query = ListingQuery("rental", zip_code="78701")
+    list(iter_listings(query, page_size=10))
+
+    again = iter_listings(query, page_size=10)
+    records = list(again)
+
+    assert len(records) == 23
+    assert again.fetched == 0 and again.cached == 3
+    # A rental listing's asking price is its rent
+    assert records[0].rent == 1000 and records[0].price == 0
+
+
+def test_max_results_stops_requesting_pages(listings):
+    stream = iter_listings(ListingQuery("sale", zip_code="78702"), page_size=5, max_results=8)
+
+    assert len(list(stream)) == 8
+    assert sorted(listings.offsets) == [0, 5]
+
+
+def test_summary_is_computed_in_one_pass(listings):
+    stats = summarize_listings(iter_listings(ListingQuery("sale", zip_code="78703"), page_size=10))
+
+    assert stats["count"] == 23
+    assert stats["min_price"] == 1000 and stats["max_price"] == 23000
+    assert stats["by_type"] == {"Condo": 23}
+
+
+def test_streams_stop_when_the_allowance_runs_out(listings):
+    quota = QuotaReservation.local(3)
+    sales = iter_listings(ListingQuery("sale", zip_code="78704"), page_size=5, prefetch=1, quota=quota)
+
+    with pytest.raises(RentCastError, match="query limit"):
+        list(sales)
+
+    assert sales.fetched == 3
+    assert sorted(listings.offsets) == [0, 5, 10]
+
+
+def test_failed_pages_give_their_unit_back(monkeypatch):
+    def unavailable(path, params):
+        raise RentCastError("RentCast is temporarily unavailable")
+
+    monkeypatch.setattr(rentcast_listings, "rentcast_request", unavailable)
+    quota = QuotaReservation.local(1)
+    with pytest.raises(RentCastError):
+        list(iter_listings(ListingQuery("sale", zip_code="78705"), quota=quota))
+
+    assert quota.used == 0
+
+
+def test_a_reservation_tops_up_a_page_at_a_time(listings, supabase):
+    supabase.used = 26
+    with QuotaReservation(supabase.user_id, "a@example.com", 30, top_up=1) as quota:
+        assert quota.reserve(pages_needed(10, page_size=5)) == 2
+        sales = iter_listings(ListingQuery("sale", zip_code="78706"), page_size=5, prefetch=1, quota=quota)
+
+        with pytest.raises(RentCastError, match="query limit"):
+            list(sales)
+
+    assert sales.fetched == 4
+    assert supabase.used == 30 and supabase.reservations == {}
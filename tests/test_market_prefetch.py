@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pytest
+
+from utils import market_prefetch
+from utils.api_cache import get_api_cache
+from utils.market_prefetch import MarketPrefetcher, budget_used, in_off_peak
+
+
+@pytest.fixture
+def prefetcher(rentcast, monkeypatch):
+    # Each test gets today's budget to itself
+    monkeypatch.setattr(market_prefetch, "_BUDGET_NAMESPACE", f"prefetch_budget_{id(rentcast)}")
+    return MarketPrefetcher(daily_budget=2)
+
+
+def test_off_peak_window_wraps_past_midnight():
+    assert in_off_peak(datetime(2026, 1, 1, 23), "22-4")
+    assert in_off_peak(datetime(2026, 1, 1, 3), "22-4")
+    assert not in_off_peak(datetime(2026, 1, 1, 4), "22-4")
+
+
+def test_warm_zips_are_skipped_and_cold_ones_fetched(prefetcher, rentcast):
+    get_api_cache().set("markets_zip", "30301", {"warm": True}, ttl=48 * 3600)
+
+    result = prefetcher.run_once(["30301", "30302"])
+
+    assert (result["fetched"], result["skipped_warm"]) == (1, 1)
+    assert rentcast.paths() == ["/markets"]
+    assert budget_used() == 1
+
+
+def test_stops_at_the_daily_budget_and_queues_the_rest(prefetcher, rentcast):
+    result = prefetcher.run_once(["30311", "30312", "30313"])
+
+    assert result["fetched"] == 2
+    assert len(rentcast.calls) == 2
+    assert prefetcher.stats()["queued"] == 1
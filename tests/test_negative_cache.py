@@ -0,0 +1,32 @@
+import pytest
+
+from utils.rentcast_api import RentCastNotFound, fetch_resilient, get_not_found
+from utils.search_pipeline import PropertySearch
+
+
+def test_not_found_answers_are_remembered(rentcast):
+    address = "404 Nowhere Ln, Boise, ID 83702"
+    rentcast.fail[address] = 404
+
+    with pytest.raises(RentCastNotFound):
+        fetch_resilient("properties", address)
+    with pytest.raises(RentCastNotFound) as error:
+        fetch_resilient("properties", address)
+
+    assert error.value.cached
+    assert len(rentcast.calls) == 1
+    assert get_not_found("properties", "404 nowhere lane, boise, id") is not None
+
+
+def test_known_bad_addresses_cost_nothing(rentcast):
+    address = "405 Nowhere Ln, Boise, ID 83702"
+    rentcast.fail[address] = 400
+    with pytest.raises(RentCastNotFound):
+        fetch_resilient("properties", address)
+
+    search = PropertySearch(address, ["properties"], consume=lambda n: n)
+    outcome = next(search.as_completed(timeout=5))
+
+    assert outcome.data is None and outcome.error
+    assert search.charged == 0
+    assert len(rentcast.calls) == 1
@@ -0,0 +1,144 @@
+import base64
+import json
+
+import pytest
+import requests
+
+from utils import database, offline, supabase_client
+from utils.offline import (Outbox, OUTBOX_MAX_ATTEMPTS, ReplayDeferred, is_network_error, is_offline,
+                           load_snapshot, mark_offline, mark_online, register_handler, save_snapshot,
+                           set_offline)
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    """A fresh outbox and connectivity state; handlers registered here are removed afterwards"""
+    handlers = dict(offline._handlers)
+    set_offline(False)
+    mark_online()
+    yield Outbox(tmp_path / "outbox.sqlite3")
+    offline._handlers.clear()
+    offline._handlers.update(handlers)
+    set_offline(False)
+    mark_online()
+
+
+def test_replay_runs_queued_writes_in_order(outbox):
+    seen = []
+    register_handler("test_write", lambda user_id, value: seen.append(value))
+    outbox.enqueue("test_write", user_id=1, value=1)
+    outbox.enqueue("test_write", user_id=1, value=2)
+
+    result = outbox.replay(1)
+
+    assert seen == [1, 2]
+    assert result == {"replayed": 2, "failed": 0, "deferred": 0, "remaining": 0}
+    assert outbox.entries() == []
+
+
+def test_network_failure_keeps_the_entry_and_goes_offline(outbox):
+    def unreachable(user_id, value):
+        raise requests.ConnectionError("no route to host")
+
+    register_handler("test_write", unreachable)
+    outbox.enqueue("test_write", user_id=1, value=1)
+
+    result = outbox.replay(1)
+
+    assert result["remaining"] == 1
+    assert is_offline()
+    assert outbox.entries()[0]["attempts"] == 0
+
+
+def test_failing_entries_are_parked_after_max_attempts(outbox):
+    def broken(user_id, value):
+        raise ValueError("bad row")
+
+    register_handler("test_write", broken)
+    outbox.enqueue("test_write", user_id=1, value=1)
+
+    for _ in range(OUTBOX_MAX_ATTEMPTS):
+        outbox.replay(1)
+
+    entry = outbox.entries()[0]
+    assert entry["attempts"] == OUTBOX_MAX_ATTEMPTS
+    assert entry["last_error"] == "bad row"
+    assert outbox.pending() == 0
+
+
+def test_unknown_ops_count_as_failures(outbox):
+    outbox.enqueue("no_such_op", user_id=1, value=1)
+    assert outbox.replay(1)["failed"] == 1
+
+
+def test_only_the_signed_in_users_entries_replay(outbox):
+    seen = []
+    register_handler("test_write", lambda user_id, value: seen.append((user_id, value)))
+    outbox.enqueue("test_write", user_id=1, value="mine")
+    outbox.enqueue("test_write", user_id="abc-2", value="theirs")
+
+    result = outbox.replay(1)
+
+    assert seen == [(1, "mine")]
+    assert result["remaining"] == 0
+    assert outbox.pending() == 1 and outbox.pending("abc-2") == 1
+    outbox.replay("abc-2")
+    assert seen[-1] == ("abc-2", "theirs")
+
+
+def test_deferred_entries_are_kept_without_counting_an_attempt(outbox):
+    def needs_session(user_id, value):
+        raise ReplayDeferred("no session")
+
+    register_handler("test_write", needs_session)
+    outbox.enqueue("test_write", user_id=1, value=1)
+
+    result = outbox.replay(1)
+
+    assert result["deferred"] == 1 and result["remaining"] == 1
+    assert outbox.entries()[0]["attempts"] == 0
+
+
+def test_increment_replay_waits_for_its_users_session(outbox, monkeypatch):
+    monkeypatch.setattr(database, "get_user_client", lambda: None)
+    outbox.enqueue("increment_usage", user_id="abc-2", email="b@example.com", amount=1)
+
+    result = outbox.replay("abc-2")
+
+    assert result["deferred"] == 1
+    assert outbox.pending("abc-2") == 1
+
+
+def test_offline_mode_toggles():
+    set_offline(True)
+    assert is_offline()
+    set_offline(False)
+    assert not is_offline()
+
+    mark_offline(requests.ConnectionError())
+    assert is_offline()
+    mark_online()
+    assert not is_offline()
+
+
+def test_network_errors_are_recognised():
+    assert is_network_error(requests.ConnectionError())
+    assert is_network_error(TimeoutError())
+    assert not is_network_error(ValueError())
+
+
+def test_snapshots_round_trip():
+    save_snapshot("usage", 7, {"current_month": 3})
+    value, stored_at = load_snapshot("usage", 7)
+    assert value == {"current_month": 3}
+    assert stored_at > 0
+    assert load_snapshot("usage", 8) is None
+
+
+def test_the_session_user_comes_from_the_access_token(monkeypatch):
+    claims = base64.urlsafe_b64encode(json.dumps({"sub": "abc-2"}).encode()).decode().rstrip("=")
+    monkeypatch.setattr(supabase_client, "_token_provider", lambda: f"header.{claims}.signature")
+    assert supabase_client.session_user_id() == "abc-2"
+
+    monkeypatch.setattr(supabase_client, "_token_provider", lambda: "not-a-jwt")
+    assert supabase_client.session_user_id() is None
@@ -0,0 +1,78 @@
+import hashlib
+
+from utils import property_management
+
+
+class Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class PropertiesTable:
+    """Just enough of a PostgREST ``properties`` table for save_property"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self._filters = []
+        self._update = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self._filters.append(lambda row: row[column] == value)
+        return self
+
+    def in_(self, column, values):
+        self._filters.append(lambda row: row[column] in values)
+        return self
+
+    def update(self, data):
+        self._update = data
+        return self
+
+    def insert(self, data):
+        self.rows.append({"id": len(self.rows) + 1, **data})
+        return self
+
+    def execute(self):
+        matched = [row for row in self.rows if all(match(row) for match in self._filters)]
+        if self._update is not None:
+            for row in matched:
+                row.update(self._update)
+        self._filters, self._update = [], None
+        return Response(matched)
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.properties = PropertiesTable(rows)
+
+    def table(self, name):
+        return self.properties
+
+
+def legacy_row(row_id, data):
+    raw = f"{data['address']}{data['city']}{data['state']}"
+    return {"id": row_id, "user_id": 1, "property_hash": hashlib.md5(raw.encode()).hexdigest(), "data": data}
+
+
+def test_old_hash_row_is_updated_and_rekeyed(monkeypatch):
+    data = {"address": "12 Birch Ln", "city": "Reno", "state": "NV", "zipCode": "89501"}
+    rows = [legacy_row(1, data)]
+    monkeypatch.setattr(property_management, "init_supabase", lambda: FakeSupabase(rows))
+
+    assert property_management.save_property(1, dict(data))
+    assert len(rows) == 1
+    assert rows[0]["property_hash"] == property_management._property_hash(data)
+
+
+def test_colliding_old_hash_for_another_address_is_not_matched(monkeypatch):
+    # "1 Main St" + "Xenia" and "1 Main StX" + "enia" hash alike under the old scheme
+    other = legacy_row(1, {"address": "1 Main StX", "city": "enia", "state": "OH"})
+    rows = [other]
+    monkeypatch.setattr(property_management, "init_supabase", lambda: FakeSupabase(rows))
+
+    assert property_management.save_property(1, {"address": "1 Main St", "city": "Xenia", "state": "OH"})
+    assert len(rows) == 2
+    assert rows[0]["data"]["address"] == "1 Main StX"
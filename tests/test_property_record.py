@@ -0,0 +1,37 @@
+from utils.property_record import PropertyRecord
+
+PAYLOAD = [{
+    "formattedAddress": "12 Record Rd, Austin, TX 78701",
+    "city": "Austin",
+    "state": "TX",
+    "zipCode": 78701,
+    "bedrooms": 3,
+    "squareFootage": 1500,
+    "lastSalePrice": 300000,
+    "rentEstimate": {"rent": 2000},
+    "taxAssessments": {"2024": {"value": 280000}},
+}]
+
+
+def test_projects_the_fields_the_app_reads():
+    record = PropertyRecord.from_payload(PAYLOAD)
+
+    assert record.address == "12 Record Rd, Austin, TX 78701"
+    assert record.zip_code == "78701"
+    assert (record.price, record.rent) == (300000, 2000)
+    assert record.price_per_sqft == 200.0
+    assert round(record.cap_rate, 1) == 8.0
+
+
+def test_storage_dict_round_trips_and_drops_empty_fields():
+    stored = PropertyRecord.from_payload(PAYLOAD).to_dict()
+
+    assert "taxAssessments" not in stored and "lotSize" not in stored
+    assert PropertyRecord.from_payload(stored) == PropertyRecord.from_payload(PAYLOAD)
+
+
+def test_raw_payload_is_kept_compressed_only_on_request():
+    assert PropertyRecord.from_payload(PAYLOAD).raw_payload() is None
+
+    stored = PropertyRecord.from_payload(PAYLOAD, keep_raw=True).to_dict(include_raw=True)
+    assert PropertyRecord.from_payload(stored).raw_payload() == PAYLOAD
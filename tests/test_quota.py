@@ -0,0 +1,92 @@
+"""Charging and refunding the monthly query quota (utils/database.py and rentcast_api.lookup)"""
+import itertools
+
+import pytest
+import requests
+from postgrest.exceptions import APIError
+
+from conftest import missing_function, permission_denied
+from utils import database
+from utils.offline import get_outbox, is_offline, set_offline, sync_outbox
+from utils.rentcast_api import lookup
+
+_numbers = itertools.count(1)
+
+
+def address():
+    return f"{next(_numbers)} Quota Ln, Austin, TX 78701"
+
+
+def queued(op):
+    return [entry for entry in get_outbox().entries() if entry["op"] == op]
+
+
+def test_charge_is_one_call(supabase):
+    assert database.consume_quota(supabase.user_id, "a@example.com", 2, 30) == (True, 28, True)
+    assert supabase.calls == [("consume_query_quota", {"p_amount": 2, "p_limit": 30, "p_email": "a@example.com"})]
+
+
+def test_charge_over_the_limit_is_refused(supabase):
+    supabase.used = 30
+    assert database.consume_quota(supabase.user_id, "a@example.com", 1, 30) == (False, 0, False)
+    assert supabase.used == 30
+
+
+def test_refund_while_offline_is_replayed(supabase):
+    database.consume_quota(supabase.user_id, "a@example.com", 1, 30)
+    set_offline(True)
+    database.refund_quota(supabase.user_id, "a@example.com")
+    assert len(queued("refund_quota")) == 1
+    assert supabase.used == 1
+
+    set_offline(False)
+    assert sync_outbox(supabase.user_id)["replayed"] == 1
+    assert supabase.used == 0
+
+
+def test_queued_refunds_wait_for_their_users_session(supabase):
+    set_offline(True)
+    database.refund_quota("someone-else", "b@example.com")
+    set_offline(False)
+
+    assert sync_outbox("someone-else")["deferred"] == 1
+    assert len(queued("refund_quota")) == 1
+    assert "refund_query_quota" not in supabase.names()
+
+
+def test_failed_upstream_call_is_refunded(supabase, rentcast):
+    target = address()
+    rentcast.fail[target] = 500
+
+    assert not lookup("properties", target, supabase.user_id, "a@example.com").ok
+    assert supabase.names() == ["consume_query_quota", "refund_query_quota"]
+    assert supabase.used == 0
+
+
+def test_fetched_lookup_stays_charged(supabase, rentcast):
+    assert lookup("properties", address(), supabase.user_id, "a@example.com").ok
+    assert supabase.names() == ["consume_query_quota"]
+    assert supabase.used == 1
+
+
+def test_network_error_while_charging_is_never_refunded(supabase, rentcast):
+    supabase.fail["consume_query_quota"] = requests.ConnectionError("no route")
+
+    assert database.consume_quota(supabase.user_id, "a@example.com", 1, 30) == (True, None, False)
+    assert is_offline()
+    lookup("properties", address(), supabase.user_id, "a@example.com")
+    assert "refund_query_quota" not in supabase.names()
+    assert queued("refund_quota") == []
+
+
+def test_permission_error_does_not_disable_quotas(supabase):
+    supabase.fail["consume_query_quota"] = permission_denied()
+    with pytest.raises(APIError):
+        database.consume_quota(supabase.user_id, "a@example.com", 1, 30)
+    assert database._server_features["query_quotas"]
+
+
+def test_missing_function_falls_back_to_the_counter(supabase):
+    supabase.fail["refund_query_quota"] = missing_function()
+    assert database._quota_rpc(supabase, "query_quotas", "refund_query_quota", {"p_amount": 1}) is None
+    assert not database._server_features["query_quotas"]
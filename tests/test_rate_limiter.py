@@ -0,0 +1,40 @@
+import pytest
+
+from utils.rate_limiter import RateLimitTimeout, SqliteTokenBucket, TokenBucket
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_bucket(request, tmp_path):
+    def make(rate, capacity, max_wait=5.0):
+        if request.param == "sqlite":
+            return SqliteTokenBucket("test", rate, capacity, max_wait, path=tmp_path / "buckets.sqlite3")
+        return TokenBucket("test", rate, capacity, max_wait)
+    return make
+
+
+def test_burst_is_free_then_callers_wait(make_bucket):
+    bucket = make_bucket(rate=20, capacity=3)
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+
+    assert bucket.acquire() == pytest.approx(0.05, abs=0.03)
+
+
+def test_callers_past_max_wait_are_refused_without_reserving(make_bucket):
+    bucket = make_bucket(rate=10, capacity=1, max_wait=0.01)
+    bucket.acquire()
+
+    with pytest.raises(RateLimitTimeout):
+        bucket.acquire()
+    assert bucket.stats()["timeouts"] == 1
+    # The refused call reserved nothing, so the next token is 0.1s away, not 0.2s
+    assert bucket.acquire(max_wait=5) < 0.15
+
+
+def test_sqlite_buckets_share_one_budget(tmp_path):
+    path = tmp_path / "buckets.sqlite3"
+    first = SqliteTokenBucket("shared", rate=1, capacity=1, max_wait=0, path=path)
+    second = SqliteTokenBucket("shared", rate=1, capacity=1, max_wait=0, path=path)
+
+    first.acquire()
+    with pytest.raises(RateLimitTimeout):
+        second.acquire()
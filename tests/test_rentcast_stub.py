@@ -0,0 +1,46 @@
+import pytest
+import requests
+
+from tools.rentcast_stub import start_stub
+from utils import rentcast_api
+from utils.circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture
+def stub():
+    server = start_stub(latency_ms=0, jitter_ms=0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(stub, path, key="test", **params):
+    return requests.get(f"{stub.base_url}{path}", params=params, headers={"X-Api-Key": key} if key else {},
+                        timeout=5)
+
+
+def test_synthesized_answers_are_stable_per_address(stub):
+    first = get(stub, "/properties", address="1 Stub St, Dallas, TX 75201").json()
+    again = get(stub, "/properties", address="1 stub street dallas tx 75201").json()
+
+    assert first == again and first[0]["zipCode"] == "75201"
+    assert get(stub, "/markets", zipCode="75201").json()["zipCode"] == "75201"
+
+
+def test_failure_modes(stub):
+    assert get(stub, "/properties", key=None, address="2 Stub St, Dallas, TX").status_code == 401
+    stub.config.error_rate = 1.0
+    assert get(stub, "/properties", address="2 Stub St, Dallas, TX").status_code == 500
+
+    counters = requests.get(f"{stub.base_url[:-len('/v1')]}/stats", timeout=5).json()
+    assert (counters["requests"], counters["401"], counters["500"]) == (2, 1, 1)
+
+
+def test_the_app_client_runs_against_the_stub(stub, monkeypatch):
+    monkeypatch.setattr(rentcast_api, "RENTCAST_BASE_URL", stub.base_url)
+    monkeypatch.setattr(rentcast_api, "_breaker", CircuitBreaker("RentCast"))
+
+    data = rentcast_api.fetch_upstream("properties", "3 Stub St, Dallas, TX 75201")
+
+    assert rentcast_api.first_property(data)["city"] == "Dallas"
+    assert stub.counters["synthesized"] == 1
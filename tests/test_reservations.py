@@ -0,0 +1,122 @@
+"""Quota reservations for batches (utils.database.QuotaReservation with utils.bulk_lookup)"""
+import asyncio
+
+import pytest
+import requests
+from postgrest.exceptions import APIError
+
+from conftest import missing_function, permission_denied
+from utils import database
+from utils.bulk_lookup import iter_bulk_lookup
+from utils.database import QuotaReservation
+from utils.offline import get_outbox, is_offline, set_offline, sync_outbox
+
+
+def addresses(count: int, street: str):
+    return [f"{i + 1} {street}, Austin, TX 78701" for i in range(count)]
+
+
+async def collect(rows):
+    return [row async for row in rows]
+
+
+def queued(op):
+    return [entry for entry in get_outbox().entries() if entry["op"] == op]
+
+
+def test_parallel_batch_cannot_overspend(supabase, rentcast):
+    supabase.used = 27
+    with QuotaReservation(supabase.user_id, "a@example.com", 30) as reservation:
+        assert reservation.reserve(6) == 3
+        rows = asyncio.run(collect(iter_bulk_lookup(addresses(6, "Held Ave"), reservation, concurrency=6)))
+
+    assert sorted(row.status for row in rows) == ["fetched"] * 3 + ["over_quota"] * 3
+    assert len(rentcast.calls) == 3
+    assert supabase.used == 30 and supabase.reservations == {}
+
+
+def test_uncharged_units_are_reused_by_the_batch(supabase, rentcast):
+    batch = addresses(3, "Retry Rd")
+    rentcast.fail[batch[0]] = 500
+    with QuotaReservation(supabase.user_id, "a@example.com", 30) as reservation:
+        reservation.reserve(2)
+        rows = asyncio.run(collect(iter_bulk_lookup(batch, reservation, concurrency=1)))
+
+    assert [row.status for row in rows].count("fetched") == 2
+    assert supabase.used == 2
+
+
+def test_reservations_leave_room_for_each_other(supabase):
+    supabase.used = 27
+    first = QuotaReservation(supabase.user_id, "a@example.com", 30)
+    second = QuotaReservation(supabase.user_id, "a@example.com", 30)
+    assert first.reserve(5) == 3
+    assert second.reserve(5) == 0
+
+    first.release()
+    assert second.reserve(5) == 3
+
+
+def test_unused_units_are_released(supabase):
+    with QuotaReservation(supabase.user_id, "a@example.com", 30) as reservation:
+        reservation.reserve(5)
+        assert reservation.take() and reservation.take()
+        reservation.give_back()
+    assert supabase.used == 1
+    assert supabase.reservations == {}
+
+
+def test_reserve_propagates_non_network_errors(supabase):
+    supabase.fail["reserve_query_quota"] = permission_denied()
+    reservation = QuotaReservation(supabase.user_id, "a@example.com", 30)
+    with pytest.raises(APIError):
+        reservation.reserve(5)
+    assert reservation.granted == 0
+    assert not is_offline()
+
+
+def test_missing_reservations_leave_query_quotas_enabled(supabase):
+    supabase.fail["reserve_query_quota"] = missing_function()
+    assert database._quota_rpc(supabase, "quota_reservations", "reserve_query_quota", {"p_units": 1}) is None
+    assert not database._server_features["quota_reservations"]
+
+    assert database.consume_quota(supabase.user_id, "a@example.com", 1, 30)[0]
+    assert supabase.used == 1
+
+
+def test_reserve_network_error_grants_locally_and_charges_later(supabase):
+    supabase.fail["reserve_query_quota"] = requests.ConnectionError("no route")
+    with QuotaReservation(supabase.user_id, "a@example.com", 30) as reservation:
+        assert reservation.reserve(4) == 4
+        assert is_offline()
+        reservation.take()
+    assert [entry["payload"]["amount"] for entry in queued("increment_usage")] == [1]
+
+
+def test_commit_while_offline_is_replayed(supabase):
+    reservation = QuotaReservation(supabase.user_id, "a@example.com", 30)
+    reservation.reserve(5)
+    reservation.take()
+    reservation.take()
+
+    set_offline(True)
+    reservation.commit()
+    assert len(queued("commit_reservation")) == 1
+    assert supabase.used == 0
+
+    set_offline(False)
+    assert sync_outbox(supabase.user_id)["replayed"] == 1
+    assert supabase.used == 2
+    assert supabase.reservations == {}
+
+
+def test_queued_commits_wait_for_their_users_session(supabase):
+    reservation = QuotaReservation("someone-else", "b@example.com", 30)
+    reservation.reserve(1)
+    reservation.take()
+    set_offline(True)
+    reservation.commit()
+    set_offline(False)
+
+    assert sync_outbox("someone-else")["deferred"] == 1
+    assert "commit_query_quota_reservation" not in supabase.names()
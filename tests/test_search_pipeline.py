@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from utils import rentcast_api
+from utils.api_cache import get_api_cache
+from utils.rentcast_api import cache_key
+from utils.search_pipeline import PropertySearch
+
+ADDRESS = "88 Pipeline Ave, Omaha, NE 68102"
+
+
+def test_endpoints_are_requested_in_parallel(rentcast):
+    rentcast.gate.clear()
+    search = PropertySearch(f"1 {ADDRESS}", ["properties", "markets"], consume=lambda n: n)
+    # Both calls are in flight at once, held at the same gate
+    for _ in range(100):
+        if len(rentcast.calls) == 2:
+            break
+        time.sleep(0.01)
+    assert sorted(rentcast.paths()) == ["/markets", "/properties"]
+
+    rentcast.gate.set()
+    outcomes = {outcome.endpoint: outcome for outcome in search.as_completed(timeout=5)}
+    assert outcomes["markets"].data["path"] == "/markets"
+    assert search.charged == 2
+
+
+def test_cached_endpoints_are_free_and_the_rest_stop_at_the_quota(rentcast):
+    address = "2 Quota Ave, Omaha, NE 68104"
+    get_api_cache().set("properties", cache_key(address), [{"cached": True}], ttl=60)
+
+    search = PropertySearch(address, ["properties", "markets"], consume=lambda n: 0, max_queries=30)
+    outcomes = {outcome.endpoint: outcome for outcome in search.as_completed(timeout=5)}
+
+    assert outcomes["properties"].source == "cache"
+    assert "query limit" in outcomes["markets"].error
+    assert rentcast.calls == []
+    assert search.charged == 0
+
+
+def test_market_data_is_shared_by_every_address_in_a_zip(rentcast):
+    first = PropertySearch("3 Zip St, Omaha, NE 68105", ["markets"], consume=lambda n: n)
+    list(first.as_completed(timeout=5))
+    second = PropertySearch("4 Other St, Omaha, NE 68105", ["markets"], consume=lambda n: n)
+    outcome = next(second.as_completed(timeout=5))
+
+    assert outcome.source == "cache"
+    assert rentcast.calls == [("/markets", "")]
+
+
+def test_market_lookup_waits_for_the_zip_when_the_address_has_none(rentcast, monkeypatch):
+    def with_zip(path, params):
+        response = rentcast.get(path, params)
+        if path == "/properties":
+            response._content = b'[{"formattedAddress": "5 Nozip Rd", "zipCode": "68106"}]'
+        return response
+    monkeypatch.setattr(rentcast_api, "_rentcast_get", with_zip)
+
+    search = PropertySearch("5 Nozip Rd, Omaha, NE", ["properties", "markets"], consume=lambda n: n)
+    outcomes = {outcome.endpoint: outcome for outcome in search.as_completed(timeout=5)}
+
+    assert rentcast.paths() == ["/properties", "/markets"]
+    assert outcomes["markets"].data["path"] == "/markets"
+    assert search.charged == 2
+
+
+def test_a_failing_chained_lookup_surfaces_instead_of_hanging(rentcast, monkeypatch):
+    def broken_markets(path, params):
+        if path == "/markets":
+            raise ValueError("unexpected")
+        response = rentcast.get(path, params)
+        response._content = b'[{"formattedAddress": "6 Nozip Rd", "zipCode": "68107"}]'
+        return response
+    monkeypatch.setattr(rentcast_api, "_rentcast_get", broken_markets)
+
+    search = PropertySearch("6 Nozip Rd, Omaha, NE", ["properties", "markets"], consume=lambda n: n)
+    with pytest.raises(ValueError):
+        list(search.as_completed(timeout=5))
+    # The failed endpoint is not charged
+    assert search.charged == 1
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+import requests
+
+from utils import serialization
+from utils.serialization import PayloadError, decode_response, dumps, loads
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+def response(body: bytes) -> requests.Response:
+    r = requests.Response()
+    r.status_code = 200
+    r._content = body
+    return r
+
+
+def test_round_trip(backend):
+    value = {"a": [1, 2.5, None], "b": "ü"}
+    assert loads(dumps(value)) == value
+    assert json.loads(dumps(value)) == value
+
+
+def test_invalid_json_raises_payload_error(backend):
+    with pytest.raises(PayloadError):
+        loads(b"<html>busy</html>")
+
+
+def test_response_shape_is_checked(backend):
+    assert decode_response(response(b"[1]"), expect=list) == [1]
+    with pytest.raises(PayloadError):
+        decode_response(response(b'{"message": "error"}'), expect=list)
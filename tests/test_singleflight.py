@@ -0,0 +1,53 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.rentcast_api import fetch_coalesced, get_coalescing_stats
+from utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(flight.do, "key", work) for _ in range(4)]
+        while flight.stats()["calls"] < 4:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(runs) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_followers_see_the_leaders_exception():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    # Nothing is remembered once the call completes
+    assert flight.do("key", lambda: 1) == (1, False)
+
+
+def test_only_the_leader_is_charged_for_a_shared_lookup(rentcast):
+    rentcast.gate.clear()
+    address = "5 Coalesce Ct, Fargo, ND 58102"
+    calls_before = get_coalescing_stats()["calls"]
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(fetch_coalesced, "properties", address) for _ in range(3)]
+        while get_coalescing_stats()["calls"] < calls_before + 3:
+            time.sleep(0.01)
+        rentcast.gate.set()
+        results = [future.result() for future in futures]
+
+    assert len(rentcast.calls) == 1
+    assert sorted(chargeable for _, chargeable in results) == [False, False, True]
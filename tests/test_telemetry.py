@@ -0,0 +1,34 @@
+import pytest
+
+from utils.telemetry import Registry, latency_summary, record_request, track
+
+
+def test_track_records_latency_and_error_status():
+    with track("unit-test", "ok-call"):
+        pass
+    with pytest.raises(KeyError):
+        with track("unit-test", "bad-call"):
+            raise KeyError("boom")
+
+    rows = {row["endpoint"]: row for row in latency_summary() if row["service"] == "unit-test"}
+    assert (rows["ok-call"]["calls"], rows["ok-call"]["errors"]) == (1, 0)
+    assert (rows["bad-call"]["calls"], rows["bad-call"]["errors"]) == (1, 1)
+
+
+def test_client_errors_count_as_errors_but_not_redirects():
+    record_request("unit-test", "status", 302, 0.01)
+    record_request("unit-test", "status", 404, 0.01)
+
+    row = next(row for row in latency_summary() if row["endpoint"] == "status")
+    assert (row["calls"], row["errors"]) == (2, 1)
+
+
+def test_prometheus_rendering_includes_collector_gauges():
+    registry = Registry()
+    registry.counter("things_total", "Things").inc(3, kind="a")
+    registry.register_collector(lambda: [("queue_depth", "Queued items", {"queue": "x"}, 7)])
+    registry.register_collector(lambda: 1 / 0)
+
+    text = registry.render_prometheus()
+    assert 'things_total{kind="a"} 3' in text
+    assert 'queue_depth{queue="x"} 7' in text
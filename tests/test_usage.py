@@ -0,0 +1,197 @@
+import datetime
+
+import pytest
+
+from utils import offline, usage
+from utils.offline import mark_online, set_offline
+from utils.usage_counter import UsageCounter
+
+
+class FakeQuery:
+    """Chainable stand-in for a PostgREST request"""
+
+    def __init__(self, run):
+        self._run = run
+        self.kwargs = {}
+
+    def select(self, *columns, **kwargs):
+        self.kwargs.update(kwargs)
+        return self
+
+    def insert(self, rows):
+        self.kwargs["insert"] = rows
+        return self
+
+    def eq(self, column, value):
+        self.kwargs[column] = value
+        return self
+
+    def gte(self, column, value):
+        self.kwargs["since"] = value
+        return self
+
+    def execute(self):
+        return self._run(self)
+
+
+class MissingObject(Exception):
+    """How PostgREST reports a function or table that does not exist"""
+    code = "PGRST202"
+
+
+class FakeResponse:
+    def __init__(self, data=None, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeUsageDatabase:
+    """api_usage rows, their rollups and the usage functions, in memory"""
+
+    def __init__(self, rows, breakdown=True, rollups=True):
+        self.rows = rows
+        self.breakdown = breakdown
+        self.rollups = rollups
+        self.calls = []
+        self.inserted = []
+
+    def _grouped(self, since=""):
+        grouped = {}
+        for row in self.rows:
+            if row["created_at"] >= since:
+                key = (row["query_type"], row["created_at"][:10])
+                grouped[key] = grouped.get(key, 0) + 1
+        return [{"query_type": t, "day": day, "count": n} for (t, day), n in grouped.items()]
+
+    def table(self, name):
+        def run(query):
+            if "insert" in query.kwargs:
+                self.inserted.append(query.kwargs["insert"])
+                return FakeResponse([query.kwargs["insert"]])
+            if name == "api_usage_rollups":
+                self.calls.append("rollups")
+                if not self.rollups:
+                    raise MissingObject("relation api_usage_rollups does not exist")
+                return FakeResponse([row for row in self._grouped() if row["day"][:7] == query.kwargs["month"][:7]])
+            rows = [row for row in self.rows if row["created_at"] >= query.kwargs.get("since", "")]
+            if query.kwargs.get("head"):
+                self.calls.append("count")
+                return FakeResponse([], len(rows))
+            self.calls.append("select")
+            return FakeResponse([dict(row) for row in rows])
+        return FakeQuery(run)
+
+    def rpc(self, name, params):
+        def run(query):
+            self.calls.append(name)
+            if name == "usage_total":
+                if not self.rollups:
+                    raise MissingObject("Could not find the function usage_total")
+                return FakeResponse(len(self.rows))
+            if not self.breakdown:
+                raise MissingObject("Could not find the function usage_breakdown")
+            return FakeResponse(self._grouped(params["p_since"]))
+        return FakeQuery(run)
+
+
+def usage_rows():
+    today = datetime.datetime.utcnow()
+    last_year = today.replace(year=today.year - 1).isoformat()
+    return [
+        {"query_type": "property_search", "created_at": today.isoformat()},
+        {"query_type": "property_search", "created_at": today.isoformat()},
+        {"query_type": "bulk_lookup", "created_at": today.isoformat()},
+        {"query_type": "property_search", "created_at": last_year},
+    ]
+
+
+@pytest.fixture
+def database(monkeypatch):
+    set_offline(False)
+    mark_online()
+    fake = FakeUsageDatabase(usage_rows())
+    monkeypatch.setattr(usage, "get_user_client", lambda: fake)
+    monkeypatch.setitem(usage._server_features, "usage_rollups", True)
+    monkeypatch.setitem(usage._server_features, "usage_breakdown", True)
+    monkeypatch.setattr(usage, "_counter", UsageCounter(seed=usage._read_usage, write=usage._write_usage,
+                                                        flush_interval=3600))
+    monkeypatch.setattr(usage, "_session_clients", {})
+    return fake
+
+
+def test_usage_is_read_from_the_rollups(database):
+    result = usage._read_usage(7)
+
+    assert result.ok
+    assert result.value["current_month"] == 3
+    assert result.value["total"] == 4
+    assert result.value["by_type"] == {"property_search": 2, "bulk_lookup": 1}
+    assert sorted(database.calls) == ["rollups", "usage_total"]
+
+
+def test_without_rollups_usage_is_counted_from_events(database):
+    database.rollups = False
+    result = usage._read_usage(7)
+
+    assert result.ok
+    assert result.value["current_month"] == 3
+    assert result.value["total"] == 4
+    assert result.value["by_type"] == {"property_search": 2, "bulk_lookup": 1}
+    assert sum(result.value["daily_usage"].values()) == 3
+    assert sorted(database.calls) == ["count", "rollups", "usage_breakdown"]
+
+
+def test_without_the_function_the_split_falls_back_once(database):
+    database.rollups = database.breakdown = False
+
+    first = usage._read_usage(7).value
+    database.calls.clear()
+    second = usage._read_usage(7).value
+
+    assert first["by_type"] == second["by_type"] == {"property_search": 2, "bulk_lookup": 1}
+    assert "usage_breakdown" not in database.calls
+
+
+def test_permission_errors_do_not_switch_to_the_fallback(database, monkeypatch):
+    def denied(name, params):
+        raise PermissionError("permission denied for function usage_total")
+
+    monkeypatch.setattr(database, "rpc", denied)
+
+    assert not usage._read_usage(7).ok
+    assert usage._server_features["usage_rollups"]
+
+
+def test_without_a_session_usage_is_unknown_not_zero(database, monkeypatch):
+    monkeypatch.setattr(usage, "get_user_client", lambda: None)
+
+    result = usage.get_user_usage(7)
+
+    assert not result.ok and result.value is None
+    assert "sign-in" in str(result.error)
+    assert database.calls == []
+
+
+def test_usage_is_written_with_the_same_session_it_is_read_with(database, monkeypatch, tmp_path):
+    outbox = offline.Outbox(tmp_path / "outbox.sqlite3")
+    monkeypatch.setattr(offline, "get_outbox", lambda: outbox)
+
+    monkeypatch.setattr(usage, "session_user_id", lambda: "abc-2")
+    assert usage.log_usage("abc-2", "1 Main St").ok
+    assert database.inserted == []  # counted now, written behind
+    usage.get_usage_counter().flush()
+    assert len(database.inserted) == 1
+
+    # Logged from a session without a Supabase sign-in: waits for one
+    assert usage.log_usage("xyz-3", "2 Main St").ok
+    usage.get_usage_counter().flush()
+    assert len(database.inserted) == 1 and outbox.pending("xyz-3") == 1
+
+
+def test_a_seeded_user_is_served_from_memory(database):
+    assert usage.get_user_usage(7).value["current_month"] == 3
+    database.calls.clear()
+
+    usage.log_usage(7, "1 Main St")
+    assert usage.get_user_usage(7).value["current_month"] == 4
+    assert database.calls == []
@@ -0,0 +1,130 @@
+"""The write-behind usage counter (utils/usage_counter.py)"""
+import threading
+import time
+
+import pytest
+
+from utils import offline
+from utils.errors import Result, ServiceError
+from utils.usage_counter import UsageCounter, _this_month
+
+
+def _row(user_id, query_type="property_search"):
+    return {"user_id": user_id, "query": "1 Main St", "query_type": query_type,
+            "created_at": f"{_this_month()}-15T12:00:00"}
+
+
+class FakeServer:
+    """api_usage rows on the server; seed() summarizes them like _read_usage"""
+
+    def __init__(self):
+        self.rows = []
+        self.writes = []
+
+    def seed(self, user_id) -> Result:
+        count = sum(1 for row in self.rows if row["user_id"] == user_id)
+        return Result.success({"current_month": count, "total": count, "limit": 30,
+                               "by_type": {}, "daily_usage": {}})
+
+    def write(self, user_id, rows):
+        self.writes.append(user_id)
+        self.rows.extend(rows)
+
+
+@pytest.fixture
+def outbox(monkeypatch, tmp_path):
+    outbox = offline.Outbox(tmp_path / "outbox.sqlite3")
+    monkeypatch.setattr(offline, "get_outbox", lambda: outbox)
+    return outbox
+
+
+def _counter(server, **kwargs) -> UsageCounter:
+    kwargs.setdefault("flush_interval", 3600)
+    return UsageCounter(seed=server.seed, write=server.write, **kwargs)
+
+
+def test_logged_rows_count_before_they_are_written():
+    server = FakeServer()
+    counter = _counter(server)
+    assert counter.get(1).value["current_month"] == 0
+
+    counter.record(1, [_row(1), _row(1, "bulk_lookup")])
+    usage = counter.get(1).value
+    assert usage["current_month"] == 2
+    assert usage["by_type"] == {"property_search": 1, "bulk_lookup": 1}
+    assert server.rows == []
+
+    assert counter.flush() == 2
+    counter.forget(1)
+    assert counter.get(1).value["current_month"] == 2
+
+
+def test_each_users_rows_are_written_separately():
+    server = FakeServer()
+    counter = _counter(server)
+    counter.record(1, [_row(1)])
+    counter.record(2, [_row(2), _row(2)])
+    counter.record(1, [_row(1)])
+
+    assert counter.flush() == 4
+    assert sorted(server.writes) == [1, 2]
+
+
+def test_seed_during_a_flush_counts_each_row_once():
+    server = FakeServer()
+    written = threading.Event()
+    release = threading.Event()
+
+    def slow_write(user_id, rows):
+        server.write(user_id, rows)  # committed on the server...
+        written.set()
+        release.wait(5)              # ...but the flush has not finished yet
+
+    counter = UsageCounter(seed=server.seed, write=slow_write, flush_interval=3600)
+    counter.record(1, [_row(1)])
+    flusher = threading.Thread(target=counter.flush)
+    flusher.start()
+    assert written.wait(5)
+
+    seen = {}
+    reader = threading.Thread(target=lambda: seen.update(counter.get(1).value))
+    reader.start()
+    time.sleep(0.1)
+    release.set()
+    flusher.join(5)
+    reader.join(5)
+    assert seen["current_month"] == 1
+
+
+def test_a_failed_seed_is_not_cached():
+    server = FakeServer()
+    results = [Result.failure(ServiceError("Usage figures need a Supabase sign-in", "supabase"))]
+    counter = UsageCounter(seed=lambda user_id: results.pop() if results else server.seed(user_id),
+                           write=server.write, flush_interval=3600)
+    counter.record(1, [_row(1)])
+
+    first = counter.get(1)
+    assert not first.ok and first.value is None
+    assert counter.get(1).value["current_month"] == 1
+
+
+def test_failed_writes_go_to_the_outbox(outbox):
+    def failing_write(user_id, rows):
+        raise RuntimeError("insert rejected")
+
+    counter = UsageCounter(seed=FakeServer().seed, write=failing_write, flush_interval=3600)
+    counter.record(1, [_row(1)])
+    assert counter.flush() == 1
+    assert outbox.pending(1) == 1
+    assert counter.stats()["rows_to_outbox"] == 1
+
+
+def test_reconcile_drops_old_summaries_for_the_next_read():
+    server = FakeServer()
+    counter = _counter(server, reconcile_interval=0.01)
+    assert counter.get(1).value["current_month"] == 0
+
+    server.rows.append(_row(1))  # logged by another process
+    time.sleep(0.05)
+    counter.reconcile()
+    assert counter.get(1).value["current_month"] == 1
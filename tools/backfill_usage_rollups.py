@@ -0,0 +1,78 @@
+"""
+Rebuild the api_usage_rollups table from raw api_usage events.
+
+The migration that creates the rollups backfills them once; run this to
+repair a range afterwards (e.g. after deleting or importing events by hand).
+Each month is rebuilt in its own call so locks on api_usage stay short.
+
+    python tools/backfill_usage_rollups.py --since 2025-01
+    python tools/backfill_usage_rollups.py --since 2026-09 --until 2026-10 --dry-run
+
+Needs SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY (or [supabase]
+service_role_key in secrets.toml); backfill_usage_rollups() is not callable
+with the anon key.
+"""
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Iterator, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.errors import AppError  # noqa: E402
+
+
+def parse_month(value: str) -> date:
+    try:
+        year, month = value.split("-")[:2]
+        return date(int(year), int(month), 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+
+
+def next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def months(start: date, end: date) -> Iterator[Tuple[date, date]]:
+    """[first, next first) pairs covering start..end inclusive"""
+    current = start
+    while current <= end:
+        yield current, next_month(current)
+        current = next_month(current)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", type=parse_month, required=True, help="first month to rebuild (YYYY-MM)")
+    parser.add_argument("--until", type=parse_month, help="last month to rebuild (YYYY-MM, default this month)")
+    parser.add_argument("--dry-run", action="store_true", help="list the months without rebuilding")
+    args = parser.parse_args(argv)
+    until = args.until or date.today().replace(day=1)
+
+    if args.dry_run:
+        for first, _ in months(args.since, until):
+            print(f"would rebuild {first:%Y-%m}")
+        return 0
+
+    from utils.supabase_client import create_service_client
+
+    try:
+        supabase = create_service_client()
+    except AppError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    total = 0
+    for first, after in months(args.since, until):
+        written = supabase.rpc("backfill_usage_rollups",
+                               {"p_from": first.isoformat(), "p_to": after.isoformat()}).execute().data
+        total += int(written or 0)
+        print(f"{first:%Y-%m}: {int(written or 0):,} rollup rows")
+    print(f"Rebuilt {total:,} rollup rows.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Load benchmark for the headless API (api.py): requests per second and latency.
+
+Drives one endpoint from many keep-alive connections and reports throughput,
+p50/p95/p99 latency and status codes. --distinct controls how many different
+addresses are used, i.e. how much of the run is served from the cache.
+
+    python tools/bench_api.py --self-hosted --endpoint analyze --requests 2000
+    python tools/bench_api.py --url http://127.0.0.1:8000 --endpoint batch --batch-size 25
+
+--self-hosted starts tools/rentcast_stub.py and the API in this process, on a
+throwaway response cache, so no API quota is spent. Without it, point --url
+at a running service (started with RENTCAST_BASE_URL set to a stub).
+"""
+import argparse
+import http.client
+import json
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+ENDPOINTS = ("lookup", "analyze", "batch", "portfolio")
+
+
+def make_address(i: int) -> str:
+    return f"{100 + i} Main St, Austin, TX 78701"
+
+
+def build_request(endpoint: str, i: int, distinct: int, batch_size: int) -> Tuple[str, str, bytes]:
+    """(method, path, body) for the i-th request"""
+    address = make_address(i % distinct)
+    if endpoint == "lookup":
+        return "GET", "/v1/lookup?" + urllib.parse.urlencode({"address": address}), b""
+    if endpoint == "analyze":
+        return "POST", "/v1/analyze", json.dumps({"address": address}).encode()
+    if endpoint == "batch":
+        addresses = [make_address((i * batch_size + j) % distinct) for j in range(batch_size)]
+        return "POST", "/v1/analyze/batch", json.dumps({"addresses": addresses}).encode()
+    properties = [{"formattedAddress": make_address(j), "price": 300000 + j * 1000,
+                   "rentEstimate": {"rent": 2000 + j * 10}} for j in range(batch_size)]
+    return "POST", "/v1/portfolio/metrics", json.dumps({"properties": properties}).encode()
+
+
+class Worker:
+    """One keep-alive connection per thread"""
+
+    def __init__(self, url: str, token: str):
+        parts = urllib.parse.urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.headers = {"Content-Type": "application/json"}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+        self.local = threading.local()
+
+    def send(self, method: str, path: str, body: bytes) -> Tuple[int, float]:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=body or None, headers=self.headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.local.conn = None
+            status = 0
+        return status, time.perf_counter() - started
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def run(url: str, endpoint: str, requests: int, concurrency: int, distinct: int,
+        batch_size: int, token: str) -> Dict:
+    worker = Worker(url, token)
+    jobs = [build_request(endpoint, i, distinct, batch_size) for i in range(requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda job: worker.send(*job), jobs))
+    elapsed = time.perf_counter() - started
+
+    statuses: Dict[int, int] = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = sorted(latency for _, latency in results)
+    return {
+        "elapsed": elapsed,
+        "rps": requests / elapsed if elapsed else 0,
+        "p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "p99": percentile(latencies, 99),
+        "statuses": statuses,
+    }
+
+
+def start_self_hosted(args) -> str:
+    """Stub upstream + API in background threads; returns the API base URL"""
+    from tools.rentcast_stub import start_stub
+
+    stub = start_stub(latency_ms=args.stub_latency_ms, jitter_ms=args.stub_latency_ms / 2, require_key=False)
+    os.environ["RENTCAST_BASE_URL"] = stub.base_url
+    os.environ.setdefault("RENTCAST_API_KEY", "bench")
+    os.environ.setdefault("API_CACHE_PATH", str(Path(tempfile.mkdtemp(prefix="bench-api-")) / "cache.sqlite3"))
+    # Don't let the production-sized limiter be the thing being measured
+    os.environ.setdefault("RENTCAST_RATE_LIMIT", "1000")
+    os.environ.setdefault("RENTCAST_RATE_BURST", "1000")
+    os.environ.setdefault("API_MAX_FETCHES", str(args.requests * max(1, args.batch_size)))
+    os.environ.setdefault("API_DAILY_FETCHES", str((args.requests + args.warmup) * max(1, args.batch_size)))
+    # The API refuses to start without a token; use a throwaway one
+    os.environ.setdefault("API_TOKEN", args.token or secrets.token_urlsafe(16))
+    args.token = os.environ["API_TOKEN"]
+
+    import uvicorn
+    from api import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    threading.Thread(target=server.run, name="bench-api", daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise SystemExit("API did not start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{args.port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="running API (ignored with --self-hosted)")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="analyze")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32, help="parallel connections")
+    parser.add_argument("--distinct", type=int, default=100, help="distinct addresses (fewer = more cache hits)")
+    parser.add_argument("--batch-size", type=int, default=20, help="addresses per batch/portfolio request")
+    parser.add_argument("--warmup", type=int, default=0, help="untimed requests sent first")
+    parser.add_argument("--token", default=os.environ.get("API_TOKEN", ""))
+    parser.add_argument("--self-hosted", action="store_true", help="start the stub and the API in-process")
+    parser.add_argument("--port", type=int, default=8765, help="API port for --self-hosted")
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    url = start_self_hosted(args) if args.self_hosted else args.url
+    if args.warmup:
+        run(url, args.endpoint, args.warmup, args.concurrency, args.distinct, args.batch_size, args.token)
+
+    report = run(url, args.endpoint, args.requests, args.concurrency, args.distinct, args.batch_size, args.token)
+    print(f"{args.endpoint}: {args.requests} requests, {args.concurrency} connections, "
+          f"{args.distinct} distinct addresses")
+    print(f"  {report['rps']:,.1f} req/s over {report['elapsed']:.2f}s")
+    print(f"  latency p50 {report['p50'] * 1000:.1f} ms, p95 {report['p95'] * 1000:.1f} ms, "
+          f"p99 {report['p99'] * 1000:.1f} ms")
+    print("  status " + ", ".join(f"{code or 'conn-error'}: {count}"
+                                  for code, count in sorted(report["statuses"].items())))
+
+
+if __name__ == "__main__":
+    main()
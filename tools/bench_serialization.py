@@ -0,0 +1,86 @@
+"""
+Benchmark JSON decode and decode+project cost per payload size.
+
+Compares the standard library against orjson (when installed) on synthetic
+RentCast-shaped /properties payloads, and reports the extra cost of
+projecting each payload into a PropertyRecord.
+
+    python tools/bench_serialization.py [--repeat N]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.property_record import PropertyRecord  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SIZES = (1, 10, 100, 500, 2000)  # properties per payload
+
+
+def make_property(i: int) -> dict:
+    """A RentCast-like property record with history and tax data"""
+    return {
+        "id": f"{i}-Main-St,-Austin,-TX-78701",
+        "formattedAddress": f"{i} Main St, Austin, TX 78701",
+        "addressLine1": f"{i} Main St",
+        "city": "Austin", "state": "TX", "zipCode": "78701", "county": "Travis",
+        "latitude": 30.26 + random.random() / 100, "longitude": -97.74 - random.random() / 100,
+        "propertyType": "Single Family", "bedrooms": random.randint(1, 5), "bathrooms": random.randint(1, 4),
+        "squareFootage": random.randint(800, 4000), "lotSize": random.randint(2000, 12000),
+        "yearBuilt": random.randint(1950, 2022), "lastSalePrice": random.randint(150000, 900000),
+        "lastSaleDate": "2021-06-01T00:00:00.000Z",
+        "rentEstimate": {"rent": random.randint(900, 4500)},
+        "features": {"cooling": True, "heating": True, "garage": True, "pool": False, "floorCount": 2},
+        "taxAssessments": {str(y): {"year": y, "value": random.randint(100000, 800000)} for y in range(2015, 2024)},
+        "propertyTaxes": {str(y): {"year": y, "total": random.randint(2000, 12000)} for y in range(2015, 2024)},
+        "history": {f"20{y:02d}-01-01": {"event": "Sale", "price": random.randint(100000, 900000)} for y in range(0, 20)},
+        "owner": {"names": ["Jane Doe"], "type": "Individual"},
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    """Best-of-3 mean seconds per call"""
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - started) / repeat)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="calls per measurement")
+    args = parser.parse_args()
+
+    random.seed(7)
+    print(f"{'props':>6} {'bytes':>10} {'json ms':>9} {'orjson ms':>10} {'speedup':>8} {'project ms':>11}")
+    for size in SIZES:
+        payload = [make_property(i) for i in range(size)]
+        raw = json.dumps(payload).encode()
+        repeat = max(3, args.repeat // max(1, size // 50))
+
+        stdlib = timed(lambda: json.loads(raw), repeat)
+        fast = timed(lambda: orjson.loads(raw), repeat) if orjson else None
+        decoded = json.loads(raw)
+        project = timed(lambda: [PropertyRecord.from_payload(p) for p in decoded], repeat)
+
+        print(f"{size:>6} {len(raw):>10,} {stdlib * 1000:>9.3f} "
+              f"{(fast * 1000 if fast else float('nan')):>10.3f} "
+              f"{(stdlib / fast if fast else float('nan')):>7.1f}x {project * 1000:>11.3f}")
+    if orjson is None:
+        print("orjson is not installed; only the standard library was measured.")
+
+
+if __name__ == "__main__":
+    main()
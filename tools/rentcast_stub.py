@@ -0,0 +1,332 @@
+"""
+Local RentCast stand-in for load testing without spending API quota.
+
+Implements GET /v1/properties (?address=...), GET /v1/markets
+(?zipCode=... or ?address=...) and the paginated listing searches
+GET /v1/listings/sale and /v1/listings/rental/long-term (?city=&state= or
+?zipCode=, with limit/offset and includeTotalCount). Responses come from a fixtures file when it
+has an entry for the request, otherwise they are synthesized
+deterministically from the address/ZIP, so repeated runs see the same data.
+
+    python tools/rentcast_stub.py --port 8787 --latency-ms 150 --error-rate 0.02 --rate-limit 20
+    RENTCAST_BASE_URL=http://127.0.0.1:8787/v1 streamlit run main.py
+
+Fixtures file format (JSON), keyed by canonical address and ZIP code:
+
+    {"properties": {"123 main st|austin|tx": [...]}, "markets": {"78701": {...}}}
+
+With --record, requests missing from the fixtures are forwarded to the real
+API (RENTCAST_API_KEY from the environment) and written back to the file.
+"""
+import argparse
+import hashlib
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import requests  # noqa: E402
+
+from utils.address import normalize_address  # noqa: E402
+from utils.rate_limiter import RateLimitTimeout, TokenBucket  # noqa: E402
+from utils.serialization import dumps_bytes, loads  # noqa: E402
+
+UPSTREAM_URL = "https://api.rentcast.io/v1"
+PROPERTY_TYPES = ("Single Family", "Condo", "Townhouse", "Multi-Family")
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 120.0       # mean added latency per request
+    jitter_ms: float = 60.0         # uniform +/- jitter around the mean
+    error_rate: float = 0.0         # fraction of requests answered with 500
+    throttle_rate: float = 0.0      # fraction answered with 429 regardless of load
+    rate_limit: float = 0.0         # requests/second before 429s (0 = unlimited)
+    not_found_rate: float = 0.0     # fraction of addresses that resolve to []
+    require_key: bool = True        # 401 when X-Api-Key is missing
+    fixtures: Optional[Path] = None
+    record: bool = False
+
+
+# ------------------------
+# Synthesized Responses
+# ------------------------
+def _rng(seed: str) -> random.Random:
+    return random.Random(int(hashlib.md5(seed.encode()).hexdigest()[:12], 16))
+
+
+def synth_property(address: str, not_found_rate: float = 0.0) -> list:
+    """A RentCast-shaped /properties response for any address"""
+    normalized = normalize_address(address)
+    rng = _rng(normalized.key)
+    if rng.random() < not_found_rate or not normalized.number:
+        return []
+    zip_code = normalized.zip_code or f"{rng.randint(10000, 99999)}"
+    square_feet = rng.randint(700, 4200)
+    price = round(square_feet * rng.uniform(120, 450), -3)
+    line1 = normalized.line1.title()
+    city = normalized.city.title() or "Springfield"
+    state = normalized.state.upper() or "TX"
+    return [{
+        "id": f"{line1}, {city}, {state} {zip_code}".replace(" ", "-"),
+        "formattedAddress": f"{line1}, {city}, {state} {zip_code}",
+        "addressLine1": line1,
+        "addressLine2": None,
+        "city": city,
+        "state": state,
+        "zipCode": zip_code,
+        "latitude": round(rng.uniform(25, 48), 6),
+        "longitude": round(rng.uniform(-122, -71), 6),
+        "propertyType": rng.choice(PROPERTY_TYPES),
+        "bedrooms": rng.randint(1, 5),
+        "bathrooms": rng.randint(1, 4),
+        "squareFootage": square_feet,
+        "lotSize": rng.randint(1500, 15000),
+        "yearBuilt": rng.randint(1920, 2023),
+        "lastSalePrice": price,
+        "lastSaleDate": f"{rng.randint(2005, 2023)}-{rng.randint(1, 12):02d}-15T00:00:00.000Z",
+        "rentEstimate": {"rent": round(price * rng.uniform(0.005, 0.009), -1)},
+        "taxAssessments": {str(y): {"year": y, "value": round(price * (0.6 + (y - 2015) * 0.03), -2)}
+                           for y in range(2015, 2024)},
+    }]
+
+
+def synth_market(zip_code: str) -> Dict:
+    """A RentCast-shaped /markets response for a ZIP code"""
+    rng = _rng(f"market:{zip_code}")
+    median_price = round(rng.uniform(180000, 1200000), -3)
+    median_rent = round(median_price * rng.uniform(0.004, 0.008), -1)
+    return {
+        "id": zip_code,
+        "zipCode": zip_code,
+        "saleData": {
+            "lastUpdatedDate": "2024-01-01T00:00:00.000Z",
+            "averagePrice": round(median_price * 1.08, -3),
+            "medianPrice": median_price,
+            "averagePricePerSquareFoot": round(rng.uniform(120, 650), 2),
+            "averageDaysOnMarket": round(rng.uniform(12, 90), 1),
+            "totalListings": rng.randint(5, 400),
+        },
+        "rentalData": {
+            "lastUpdatedDate": "2024-01-01T00:00:00.000Z",
+            "averageRent": round(median_rent * 1.05, -1),
+            "medianRent": median_rent,
+            "averageDaysOnMarket": round(rng.uniform(8, 60), 1),
+            "totalListings": rng.randint(5, 600),
+        },
+    }
+
+
+LISTINGS_PATHS = {"/v1/listings/sale": "sale", "/v1/listings/rental/long-term": "rental"}
+
+
+def synth_listings(kind: str, area: str, offset: int, limit: int) -> Tuple[list, int]:
+    """One page of a deterministic listing search, and the search's total size"""
+    total = _rng(f"listings:{kind}:{area}").randint(50, 1500)
+    page = []
+    for i in range(offset, min(offset + limit, total)):
+        rng = _rng(f"listing:{kind}:{area}:{i}")
+        square_feet = rng.randint(600, 4000)
+        price = round(square_feet * rng.uniform(120, 450), -3)
+        page.append({
+            "id": f"{kind}-{area}-{i}",
+            "formattedAddress": f"{i + 1} Stub St, {area}",
+            "addressLine1": f"{i + 1} Stub St",
+            "zipCode": area if area.isdigit() else f"{rng.randint(10000, 99999)}",
+            "propertyType": rng.choice(PROPERTY_TYPES),
+            "bedrooms": rng.randint(1, 5),
+            "bathrooms": rng.randint(1, 4),
+            "squareFootage": square_feet,
+            "yearBuilt": rng.randint(1920, 2023),
+            "status": "Active",
+            "price": price if kind == "sale" else round(price * rng.uniform(0.005, 0.009), -1),
+            "daysOnMarket": rng.randint(1, 120),
+        })
+    return page, total
+
+
+# ------------------------
+# Fixtures
+# ------------------------
+class Fixtures:
+    """Recorded responses keyed by canonical address (properties) or ZIP (markets)"""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data: Dict[str, Dict] = {"properties": {}, "markets": {}}
+        if path and path.exists():
+            self.data.update(loads(path.read_bytes()))
+
+    def get(self, endpoint: str, key: str):
+        return self.data.get(endpoint, {}).get(key)
+
+    def put(self, endpoint: str, key: str, payload):
+        with self._lock:
+            self.data.setdefault(endpoint, {})[key] = payload
+            if self.path:
+                self.path.write_bytes(dumps_bytes(self.data))
+
+
+# ------------------------
+# HTTP Server
+# ------------------------
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], config: StubConfig):
+        super().__init__(address, StubHandler)
+        self.config = config
+        self.fixtures = Fixtures(config.fixtures)
+        self.limiter = TokenBucket("rentcast-stub", config.rate_limit, max(1.0, config.rate_limit),
+                                   max_wait=0) if config.rate_limit else None
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "200": 0, "401": 0, "404": 0, "429": 0, "500": 0,
+                         "fixture_hits": 0, "synthesized": 0, "recorded": 0}
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    server: StubServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload, headers: Optional[Dict[str, str]] = None):
+        body = dumps_bytes(payload)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(str(status))
+
+    def do_GET(self):
+        server, config = self.server, self.server.config
+        url = urllib.parse.urlparse(self.path)
+        params = {k: v[0] for k, v in urllib.parse.parse_qs(url.query).items()}
+
+        if url.path == "/stats":
+            return self._send(200, server.counters)
+        server.count("requests")
+
+        if config.require_key and not self.headers.get("X-Api-Key"):
+            return self._send(401, {"message": "Missing API key"})
+        if server.limiter is not None:
+            try:
+                server.limiter.acquire()
+            except RateLimitTimeout as e:
+                return self._send(429, {"message": "Too many requests"},
+                                  {"Retry-After": f"{max(1, round(e.wait))}"})
+
+        rng = random.Random()
+        if config.latency_ms or config.jitter_ms:
+            delay = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+            time.sleep(max(0.0, delay) / 1000)
+        if rng.random() < config.throttle_rate:
+            return self._send(429, {"message": "Too many requests"}, {"Retry-After": "1"})
+        if rng.random() < config.error_rate:
+            return self._send(500, {"message": "Internal server error"})
+
+        if url.path in LISTINGS_PATHS:
+            area = params.get("zipCode") or f"{params.get('city', '')}, {params.get('state', '')}".lower()
+            try:
+                offset, limit = int(params.get("offset", 0)), min(int(params.get("limit", 50)), 500)
+            except ValueError:
+                return self._send(400, {"message": "limit and offset must be integers"})
+            server.count("synthesized")
+            page, total = synth_listings(LISTINGS_PATHS[url.path], area, offset, limit)
+            headers = {"X-Total-Count": str(total)} if params.get("includeTotalCount") == "true" else None
+            return self._send(200, page, headers)
+
+        if url.path == "/v1/properties" and params.get("address"):
+            endpoint, key = "properties", normalize_address(params["address"]).key
+        elif url.path == "/v1/markets" and (params.get("zipCode") or params.get("address")):
+            zip_code = params.get("zipCode") or normalize_address(params["address"]).zip_code
+            if not zip_code:
+                return self._send(404, {"message": "No market data for this location"})
+            endpoint, key = "markets", zip_code
+        else:
+            return self._send(404, {"message": f"Unknown endpoint {url.path}"})
+
+        payload = server.fixtures.get(endpoint, key)
+        if payload is not None:
+            server.count("fixture_hits")
+        elif config.record:
+            payload = self._record(endpoint, key, url.path, params)
+            if payload is None:
+                return self._send(502, {"message": "Recording from upstream failed"})
+        else:
+            server.count("synthesized")
+            payload = (synth_property(params["address"], config.not_found_rate) if endpoint == "properties"
+                       else synth_market(key))
+        self._send(200, payload)
+
+    def _record(self, endpoint: str, key: str, path: str, params: Dict):
+        import os
+
+        response = requests.get(f"{UPSTREAM_URL}{path[len('/v1'):]}", params=params, timeout=15,
+                                headers={"accept": "application/json",
+                                         "X-Api-Key": os.environ.get("RENTCAST_API_KEY", "")})
+        if response.status_code != 200:
+            return None
+        payload = loads(response.content)
+        self.server.fixtures.put(endpoint, key, payload)
+        self.server.count("recorded")
+        return payload
+
+
+def start_stub(host: str = "127.0.0.1", port: int = 0, **options) -> StubServer:
+    """Start the stand-in in a background thread (port 0 picks a free port)"""
+    server = StubServer((host, port), StubConfig(**options))
+    threading.Thread(target=server.serve_forever, name="rentcast-stub", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=120.0)
+    parser.add_argument("--jitter-ms", type=float, default=60.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of random 429 responses")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests/second before 429 (0 = off)")
+    parser.add_argument("--not-found-rate", type=float, default=0.0, help="fraction of empty property results")
+    parser.add_argument("--no-auth", action="store_true", help="don't require an X-Api-Key header")
+    parser.add_argument("--fixtures", type=Path, help="JSON fixtures file to replay")
+    parser.add_argument("--record", action="store_true", help="fill missing fixtures from the real API")
+    args = parser.parse_args()
+
+    server = StubServer((args.host, args.port), StubConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, rate_limit=args.rate_limit, not_found_rate=args.not_found_rate,
+        require_key=not args.no_auth, fixtures=args.fixtures, record=args.record
+    ))
+    print(f"RentCast stand-in listening on {server.base_url} (counters at /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import difflib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
+
+# ------------------------
+# Abbreviation Tables
+# ------------------------
+STREET_SUFFIXES = {
+    "alley": "aly", "allee": "aly", "annex": "anx", "arcade": "arc",
+    "avenue": "ave", "av": "ave", "aven": "ave", "avenu": "ave",
+    "bayou": "byu", "beach": "bch", "bend": "bnd", "bluff": "blf",
+    "boulevard": "blvd", "boul": "blvd", "boulv": "blvd", "branch": "br",
+    "bridge": "brg", "brook": "brk", "bypass": "byp", "canyon": "cyn",
+    "causeway": "cswy", "center": "ctr", "centre": "ctr", "circle": "cir",
+    "circ": "cir", "cliff": "clf", "club": "clb", "common": "cmn",
+    "corner": "cor", "course": "crse", "court": "ct", "cove": "cv",
+    "creek": "crk", "crescent": "cres", "crossing": "xing", "drive": "dr",
+    "drv": "dr", "estate": "est", "estates": "ests", "expressway": "expy",
+    "extension": "ext", "falls": "fls", "ferry": "fry", "field": "fld",
+    "fields": "flds", "forest": "frst", "freeway": "fwy", "garden": "gdn",
+    "gardens": "gdns", "gateway": "gtwy", "glen": "gln", "green": "grn",
+    "grove": "grv", "harbor": "hbr", "heights": "hts", "highway": "hwy",
+    "hiway": "hwy", "hill": "hl", "hills": "hls", "hollow": "holw",
+    "island": "is", "junction": "jct", "key": "ky", "lake": "lk",
+    "lakes": "lks", "landing": "lndg", "lane": "ln", "loop": "loop",
+    "manor": "mnr", "meadow": "mdw", "meadows": "mdws", "mill": "ml",
+    "motorway": "mtwy", "mount": "mt", "mountain": "mtn", "orchard": "orch",
+    "park": "park", "parkway": "pkwy", "parkwy": "pkwy", "pkway": "pkwy",
+    "pass": "pass", "path": "path", "pike": "pike", "pine": "pne",
+    "place": "pl", "plaza": "plz", "point": "pt", "port": "prt",
+    "prairie": "pr", "ranch": "rnch", "ridge": "rdg", "river": "riv",
+    "road": "rd", "route": "rte", "row": "row", "run": "run",
+    "shore": "shr", "shores": "shrs", "spring": "spg", "springs": "spgs",
+    "square": "sq", "station": "sta", "stream": "strm", "street": "st",
+    "str": "st", "strt": "st", "summit": "smt", "terrace": "ter",
+    "trace": "trce", "track": "trak", "trail": "trl", "tunnel": "tunl",
+    "turnpike": "tpke", "union": "un", "valley": "vly", "view": "vw",
+    "village": "vlg", "ville": "vl", "vista": "vis", "walk": "walk",
+    "way": "way", "well": "wl", "wells": "wls",
+}
+# Canonical suffixes map to themselves so lookups can test membership once
+STREET_SUFFIXES.update({abbr: abbr for abbr in set(STREET_SUFFIXES.values())})
+
+DIRECTIONALS = {
+    "north": "n", "south": "s", "east": "e", "west": "w",
+    "northeast": "ne", "northwest": "nw", "southeast": "se", "southwest": "sw",
+    "n": "n", "s": "s", "e": "e", "w": "w", "ne": "ne", "nw": "nw", "se": "se", "sw": "sw",
+}
+
+UNIT_DESIGNATORS = {
+    "apartment", "apt", "unit", "suite", "ste", "building", "bldg", "floor",
+    "fl", "room", "rm", "lot", "space", "spc", "trailer", "trlr", "#",
+}
+
+CITY_PREFIXES = {"saint": "st", "fort": "ft", "mount": "mt"}
+
+STATES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar",
+    "california": "ca", "colorado": "co", "connecticut": "ct", "delaware": "de",
+    "district of columbia": "dc", "florida": "fl", "georgia": "ga", "hawaii": "hi",
+    "idaho": "id", "illinois": "il", "indiana": "in", "iowa": "ia",
+    "kansas": "ks", "kentucky": "ky", "louisiana": "la", "maine": "me",
+    "maryland": "md", "massachusetts": "ma", "michigan": "mi", "minnesota": "mn",
+    "mississippi": "ms", "missouri": "mo", "montana": "mt", "nebraska": "ne",
+    "nevada": "nv", "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm",
+    "new york": "ny", "north carolina": "nc", "north dakota": "nd", "ohio": "oh",
+    "oklahoma": "ok", "oregon": "or", "pennsylvania": "pa", "rhode island": "ri",
+    "south carolina": "sc", "south dakota": "sd", "tennessee": "tn", "texas": "tx",
+    "utah": "ut", "vermont": "vt", "virginia": "va", "washington": "wa",
+    "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy", "puerto rico": "pr",
+}
+STATE_CODES = set(STATES.values())
+
+_ZIP_RE = re.compile(r"(?:^|[\s,])(\d{5})(?:-\d{4})?$")
+_COUNTRY_RE = re.compile(r"[\s,]*(?:usa|us|united states(?: of america)?)$")
+_PUNCT_RE = re.compile(r"[^\w\s,#-]")
+
+
+# ------------------------
+# Normalized Address
+# ------------------------
+@dataclass(frozen=True)
+class NormalizedAddress:
+    """Canonical form of a US street address"""
+    number: str = ""
+    street: str = ""
+    unit: str = ""
+    city: str = ""
+    state: str = ""
+    zip_code: str = ""
+
+    @property
+    def line1(self) -> str:
+        line = " ".join(part for part in (self.number, self.street) if part)
+        return f"{line} #{self.unit}" if self.unit else line
+
+    @property
+    def key(self) -> str:
+        """Canonical lookup key. The ZIP is left out so that inputs with and
+        without a ZIP code resolve to the same key."""
+        return "|".join((self.line1, self.city, self.state))
+
+    def display(self) -> str:
+        """Address string suitable for sending to RentCast"""
+        parts = [self.line1.title(), self.city.title()]
+        tail = " ".join(part for part in (self.state.upper(), self.zip_code) if part)
+        return ", ".join(part for part in parts + [tail] if part)
+
+
+def _split_unit(tokens: List[str]):
+    """Separate a unit designator ("apt 4b", "#4b", "suite 200") from street tokens"""
+    for i, token in enumerate(tokens):
+        if token.startswith("#") and len(token) > 1:
+            return tokens[:i], token[1:], tokens[i + 1:]
+        if token in UNIT_DESIGNATORS and i > 0:
+            if i + 1 < len(tokens):
+                unit = tokens[i + 1].lstrip("#")
+                return tokens[:i], unit, tokens[i + 2:]
+            return tokens[:i], "", []
+    return tokens, "", []
+
+
+def _normalize_street(tokens: List[str]) -> str:
+    tokens = list(tokens)
+    if not tokens:
+        return ""
+    # Leading and trailing directionals ("North Main St", "Park Ave South")
+    if len(tokens) > 1 and tokens[0] in DIRECTIONALS:
+        tokens[0] = DIRECTIONALS[tokens[0]]
+    suffix_at = len(tokens) - 1
+    if len(tokens) > 1 and tokens[-1] in DIRECTIONALS:
+        tokens[-1] = DIRECTIONALS[tokens[-1]]
+        suffix_at -= 1
+    if suffix_at > 0 and tokens[suffix_at] in STREET_SUFFIXES:
+        tokens[suffix_at] = STREET_SUFFIXES[tokens[suffix_at]]
+    return " ".join(tokens)
+
+
+def _normalize_city(text: str) -> str:
+    tokens = text.split()
+    if tokens and tokens[0] in CITY_PREFIXES:
+        tokens[0] = CITY_PREFIXES[tokens[0]]
+    return " ".join(tokens)
+
+
+def _suffix_index(tokens: List[str]) -> int:
+    """Index of the street suffix in an address without commas, or -1.
+
+    Takes the first suffix not immediately followed by another suffix, so
+    "1 lake shore dr chicago" splits after "dr" and "789 ocean dr miami beach"
+    after "dr" rather than "beach".
+    """
+    start = 2 if tokens and tokens[0][0].isdigit() else 1
+    for i in range(start, len(tokens)):
+        if tokens[i] in STREET_SUFFIXES:
+            if i + 1 < len(tokens) and tokens[i + 1] in STREET_SUFFIXES:
+                continue
+            return i
+    return -1
+
+
+def parse_address(raw: str) -> NormalizedAddress:
+    """Parse a free-form address into its canonical components"""
+    text = _PUNCT_RE.sub(" ", (raw or "").lower().replace(".", ""))
+    text = re.sub(r"\s*,\s*", ",", " ".join(text.split())).strip(" ,")
+    text = _COUNTRY_RE.sub("", text).strip(" ,")
+
+    # ZIP code
+    zip_code = ""
+    match = _ZIP_RE.search(text)
+    if match:
+        zip_code = match.group(1)
+        text = text[:match.start()].strip(" ,")
+
+    # State: a trailing two-letter code, or a full name that forms its own segment
+    state = ""
+    segments = [seg.strip() for seg in text.split(",") if seg.strip()]
+    if segments:
+        last_tokens = segments[-1].split()
+        if len(last_tokens) > 1 and last_tokens[-1] in STATE_CODES:
+            state = last_tokens[-1]
+            segments[-1] = " ".join(last_tokens[:-1])
+        elif len(segments) > 1 and segments[-1] in STATE_CODES:
+            state = segments.pop()
+        elif len(segments) > 2 and segments[-1] in STATES:
+            state = STATES[segments.pop()]
+
+    # Street line vs city
+    if len(segments) > 1:
+        street_tokens = " ".join(segments[:-1]).split()
+        city = segments[-1]
+    else:
+        tokens = segments[0].split() if segments else []
+        split_at = _suffix_index(tokens)
+        if split_at < 0:
+            street_tokens, city = tokens, ""
+        else:
+            street_tokens, rest = tokens[:split_at + 1], tokens[split_at + 1:]
+            if rest and rest[0] in DIRECTIONALS and len(rest) > 1:
+                street_tokens.append(rest.pop(0))
+            if rest and (rest[0] in UNIT_DESIGNATORS or rest[0].startswith("#")):
+                take = 1 if rest[0].startswith("#") and len(rest[0]) > 1 else 2
+                street_tokens.extend(rest[:take])
+                rest = rest[take:]
+            city = " ".join(rest)
+
+    street_tokens, unit, trailing = _split_unit(street_tokens)
+    number = ""
+    if street_tokens and street_tokens[0][0].isdigit():
+        number = street_tokens.pop(0)
+    # Anything after the unit in the street segment ("apt 4, springfield") is the city
+    if trailing and not city:
+        city = " ".join(trailing)
+
+    return NormalizedAddress(
+        number=number,
+        street=_normalize_street(street_tokens),
+        unit=unit,
+        city=_normalize_city(city),
+        state=state,
+        zip_code=zip_code
+    )
+
+
+# ------------------------
+# Lookup Index
+# ------------------------
+class AddressIndex:
+    """Memoized raw-address → canonical-address index.
+
+    Also remembers the ZIP code last seen for each canonical key, so a later
+    lookup that omits the ZIP still resolves to the full address.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._parsed: "OrderedDict[str, NormalizedAddress]" = OrderedDict()
+        self._zips: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def normalize(self, raw: str) -> NormalizedAddress:
+        with self._lock:
+            address = self._parsed.get(raw)
+            if address is not None:
+                self._parsed.move_to_end(raw)
+        if address is None:
+            address = parse_address(raw)
+            with self._lock:
+                self._parsed[raw] = address
+                while len(self._parsed) > self.max_entries:
+                    self._parsed.popitem(last=False)
+
+        with self._lock:
+            if address.zip_code:
+                self._zips.setdefault(address.key, address.zip_code)
+            elif address.key in self._zips:
+                address = replace(address, zip_code=self._zips[address.key])
+        return address
+
+    def remember_zip(self, key: str, zip_code: str):
+        if key and zip_code:
+            with self._lock:
+                self._zips[key] = zip_code
+
+    def zip_for(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._zips.get(key)
+
+
+_index = AddressIndex()
+
+
+def get_address_index() -> AddressIndex:
+    return _index
+
+
+def normalize_address(raw: str) -> NormalizedAddress:
+    """Normalize a raw address through the shared lookup index"""
+    return _index.normalize(raw)
+
+
+def canonical_key(raw: str) -> str:
+    """Canonical key for a raw address string"""
+    return _index.normalize(raw).key
+
+
+def property_key(data: Dict) -> str:
+    """Canonical key for a property record (RentCast or saved property data)"""
+    address = data.get('address') or data.get('addressLine1') or data.get('formattedAddress') or ''
+    if isinstance(address, dict):
+        address = " ".join(filter(None, [address.get('line1'), address.get('line2')]))
+        data = {**data, **{k: v for k, v in data['address'].items() if k in ('city', 'state', 'zipCode')}}
+    elif data.get('addressLine2'):
+        address = f"{address} {data['addressLine2']}"
+    # formattedAddress already carries city/state; don't append them twice
+    if address and ',' in address:
+        return canonical_key(address)
+    parts = [address, data.get('city', ''), " ".join(filter(None, [data.get('state', ''), data.get('zipCode', '')]))]
+    return canonical_key(", ".join(part for part in parts if part))
+
+
+# ------------------------
+# Fix Suggestions
+# ------------------------
+def suggest_address_fixes(raw: str) -> List[str]:
+    """Human-readable hints for an address RentCast could not resolve"""
+    address = parse_address(raw)
+    hints = []
+    if not address.number:
+        hints.append("Start with the house number, e.g. \"123 Main St\".")
+    street_tokens = address.street.split()
+    if street_tokens and street_tokens[-1] not in STREET_SUFFIXES and street_tokens[-1] not in DIRECTIONALS:
+        close = difflib.get_close_matches(street_tokens[-1], list(STREET_SUFFIXES), n=1, cutoff=0.75)
+        if close:
+            hints.append(f"Check the street type: did you mean \"{STREET_SUFFIXES[close[0]].title()}\" "
+                         f"instead of \"{street_tokens[-1]}\"?")
+        else:
+            hints.append("Include the street type (St, Ave, Rd, Blvd, ...).")
+    if not address.city or not address.state:
+        hints.append("Include the city and two-letter state, separated by commas: "
+                     "\"123 Main St, Austin, TX 78701\".")
+    elif not address.zip_code:
+        hints.append("Add the 5-digit ZIP code.")
+    if address.unit:
+        hints.append(f"Try the building address without the unit: \"{replace(address, unit='').display()}\".")
+    if not hints:
+        hints.append("RentCast covers residential properties only; commercial and newly built "
+                     "addresses may not be listed yet.")
+    return hints
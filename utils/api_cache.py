@@ -0,0 +1,308 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from utils.serialization import dumps, loads
+from utils.telemetry import record_cache
+
+# ------------------------
+# Cache Configuration
+# ------------------------
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "api_cache.sqlite3"
+CACHE_PATH = Path(os.environ.get("API_CACHE_PATH", DEFAULT_CACHE_PATH))
+MAX_ENTRIES = 20000      # LRU bound for the disk store
+MEMORY_ENTRIES = 512     # LRU bound for the in-process front tier
+STATS_FLUSH_EVERY = 50   # persist hit/miss counters every N lookups
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    stored_at   REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits        INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache_entries (last_access);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    namespace TEXT PRIMARY KEY,
+    hits      INTEGER NOT NULL DEFAULT 0,
+    misses    INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS counters (
+    namespace  TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      INTEGER NOT NULL DEFAULT 0,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+
+class ApiCache:
+    """Disk-backed (SQLite) response cache with per-entry TTLs and LRU eviction.
+
+    A small in-memory LRU sits in front of the database so repeated lookups in
+    the same process never touch disk. Entries survive restarts and are shared
+    by every process pointing at the same file.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, max_entries: int = MAX_ENTRIES,
+                 memory_entries: int = MEMORY_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        self._memory: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._pending: Dict[str, Dict[str, int]] = {}
+        self._pending_ops = 0
+
+    # ------------------------
+    # Counters
+    # ------------------------
+    def _record(self, namespace: str, outcome: str):
+        record_cache(namespace, outcome == "hits")
+        for bucket in (self._counters, self._pending):
+            counts = bucket.setdefault(namespace, {"hits": 0, "misses": 0})
+            counts[outcome] += 1
+        self._pending_ops += 1
+        if self._pending_ops >= STATS_FLUSH_EVERY:
+            self._flush_stats()
+
+    def flush(self):
+        """Persist pending hit/miss counters (also run at interpreter exit)"""
+        with self._lock:
+            self._flush_stats()
+
+    def _flush_stats(self):
+        for namespace, counts in self._pending.items():
+            self._conn.execute(
+                "INSERT INTO cache_stats (namespace, hits, misses) VALUES (?, ?, ?) "
+                "ON CONFLICT(namespace) DO UPDATE SET hits = hits + excluded.hits, "
+                "misses = misses + excluded.misses",
+                (namespace, counts["hits"], counts["misses"])
+            )
+        self._pending = {}
+        self._pending_ops = 0
+
+    # ------------------------
+    # Memory Tier
+    # ------------------------
+    def _remember(self, mem_key: tuple, entry: tuple):
+        self._memory[mem_key] = entry
+        self._memory.move_to_end(mem_key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # ------------------------
+    # Public API
+    # ------------------------
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the cached value, or None when missing or expired"""
+        now = time.time()
+        mem_key = (namespace, key)
+        with self._lock:
+            entry = self._memory.get(mem_key)
+            if entry is not None and entry[1] > now:
+                self._memory.move_to_end(mem_key)
+                self._record(namespace, "hits")
+                return entry[0]
+
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self._record(namespace, "misses")
+                return None
+
+            self._conn.execute(
+                "UPDATE cache_entries SET last_access = ?, hits = hits + 1 WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+            value = loads(row[0])
+            self._remember(mem_key, (value, row[1]))
+            self._record(namespace, "hits")
+            return value
+
+    def get_stale(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, stored_at) even if the entry has expired, or None.
+
+        Expired entries are kept until LRU eviction or maintenance removes
+        them, so they can be served while the upstream API is unavailable.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        if row is None:
+            return None
+        return loads(row[0]), row[1]
+
+    def expires_in(self, namespace: str, key: str) -> Optional[float]:
+        """Seconds until the entry expires (negative once expired), or None if absent"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        return None if row is None else row[0] - time.time()
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        """Store a value for ``ttl`` seconds, evicting least recently used entries"""
+        now = time.time()
+        expires_at = now + ttl
+        payload = dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(namespace, key, value, stored_at, expires_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (namespace, key, payload, now, expires_at, now)
+            )
+            self._remember((namespace, key), (value, expires_at))
+            self._evict()
+            if self._pending:
+                self._flush_stats()
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._memory.pop((namespace, key), None)
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    # ------------------------
+    # Shared Counters
+    # ------------------------
+    def increment(self, namespace: str, key: str, amount: int = 1, limit: Optional[int] = None,
+                  ttl: float = 2 * 24 * 3600) -> bool:
+        """Add ``amount`` to a counter unless the total would exceed ``limit``.
+
+        The check and the add are one UPDATE, so processes sharing the file
+        can never overspend between them. Negative amounts give units back
+        (never below zero). Returns False when the limit refused the add.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM counters WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "INSERT OR IGNORE INTO counters (namespace, key, value, expires_at) VALUES (?, ?, 0, ?)",
+                (namespace, key, now + ttl)
+            )
+            cursor = self._conn.execute(
+                "UPDATE counters SET value = MAX(value + ?, 0) "
+                "WHERE namespace = ? AND key = ? AND (? IS NULL OR value + ? <= ?)",
+                (amount, namespace, key, limit, amount, limit)
+            )
+            return cursor.rowcount == 1
+
+    def counter(self, namespace: str, key: str) -> int:
+        """Current value of a counter (0 when it was never incremented)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM counters WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())
+            ).fetchone()
+        return row[0] if row else 0
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE rowid IN "
+                "(SELECT rowid FROM cache_entries ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._memory.clear()
+
+    # ------------------------
+    # Maintenance
+    # ------------------------
+    def evict_expired(self, grace: float = 0, namespace: Optional[str] = None) -> int:
+        """Delete entries expired more than ``grace`` seconds ago; returns the count.
+
+        Expired entries still back stale fallbacks, so a grace period keeps
+        recently expired ones around.
+        """
+        query = "DELETE FROM cache_entries WHERE expires_at < ?"
+        params: Tuple = (time.time() - grace,)
+        if namespace:
+            query += " AND namespace = ?"
+            params += (namespace,)
+        with self._lock:
+            removed = self._conn.execute(query, params).rowcount
+            self._memory.clear()
+        return removed
+
+    def size_bytes(self) -> int:
+        """On-disk size of the database including its WAL file"""
+        return sum(p.stat().st_size for p in (self.path, Path(f"{self.path}-wal")) if p.exists())
+
+    def compact(self) -> Tuple[int, int]:
+        """Checkpoint the WAL and VACUUM the database; returns (bytes before, bytes after)"""
+        before = self.size_bytes()
+        with self._lock:
+            self._flush_stats()
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return before, self.size_bytes()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-namespace entry counts and hit/miss totals (all processes)"""
+        with self._lock:
+            self._flush_stats()
+            result = {}
+            for namespace, entries, size in self._conn.execute(
+                "SELECT namespace, COUNT(*), SUM(LENGTH(value)) FROM cache_entries GROUP BY namespace"
+            ):
+                result[namespace] = {"entries": entries, "bytes": size or 0, "hits": 0, "misses": 0}
+            for namespace, hits, misses in self._conn.execute(
+                "SELECT namespace, hits, misses FROM cache_stats"
+            ):
+                counts = result.setdefault(namespace, {"entries": 0, "bytes": 0})
+                counts["hits"] = hits
+                counts["misses"] = misses
+            for counts in result.values():
+                lookups = counts["hits"] + counts["misses"]
+                counts["hit_rate"] = round(counts["hits"] / lookups * 100, 1) if lookups else 0
+            return result
+
+    def session_stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters for this process only"""
+        with self._lock:
+            return {ns: dict(counts) for ns, counts in self._counters.items()}
+
+
+# ------------------------
+# Process-wide Instance
+# ------------------------
+_cache: Optional[ApiCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_api_cache() -> ApiCache:
+    """Return the shared API cache, opening the database on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ApiCache()
+                atexit.register(_cache.flush)
+    return _cache
@@ -1,18 +1,12 @@
 import streamlit as st
-from supabase import create_client, Client
-from typing import Optional
+from utils.telemetry import track
+from utils.supabase_client import (create_supabase_client, get_user_client,  # noqa: F401 (re-export)
+                                   init_supabase, set_token_provider)
 
-# ------------------------
-# Supabase Client
-# ------------------------
-SUPABASE_URL = st.secrets["supabase"]["url"]
-SUPABASE_ANON_KEY = st.secrets["supabase"]["anon_key"]
-
-def init_supabase() -> Client:
-    """Initialize and return Supabase client."""
-    return create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-
-supabase: Client = init_supabase()
+# Streamlit session layer over utils/supabase_client.py; core modules import
+# the client from there so they don't pull in Streamlit. The signed-in user's
+# token lives in st.session_state and reaches get_user_client through the
+# provider installed below.
 
 # ------------------------
 # Authentication State
@@ -24,13 +18,8 @@ def initialize_auth_state():
     if "access_token" not in st.session_state:
         st.session_state.access_token = None
 
-def get_user_client() -> Optional[Client]:
-    """Return Supabase client authorized with current user's access token."""
-    if "access_token" not in st.session_state or st.session_state.access_token is None:
-        return None
-    client = init_supabase()
-    client.auth.session = {"access_token": st.session_state.access_token}
-    return client
+set_token_provider(lambda: st.session_state.get("access_token"))
+
 
 # ------------------------
 # Authentication Functions
@@ -38,7 +27,8 @@ def get_user_client() -> Optional[Client]:
 def login(email: str, password: str):
     """Handle user login."""
     try:
-        auth = supabase.auth.sign_in_with_password({"email": email, "password": password})
+        with track("supabase", "auth.sign_in"):
+            auth = create_supabase_client().auth.sign_in_with_password({"email": email, "password": password})
         if auth and auth.session:
             st.session_state.access_token = auth.session.access_token
             st.session_state.user = auth.user
@@ -50,7 +40,8 @@ def login(email: str, password: str):
 def signup(email: str, password: str):
     """Handle user signup."""
     try:
-        auth = supabase.auth.sign_up({"email": email, "password": password})
+        with track("supabase", "auth.sign_up"):
+            auth = create_supabase_client().auth.sign_up({"email": email, "password": password})
         if auth and auth.session:
             st.session_state.access_token = auth.session.access_token
             st.session_state.user = auth.user
@@ -0,0 +1,192 @@
+import asyncio
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+from utils.address import canonical_key
+from utils.database import QuotaReservation
+from utils.property_analysis import analyze_property
+from utils.property_record import PropertyRecord
+from utils.rentcast_api import RentCastError, RentCastNotFound, fetch_resilient, first_property, get_cached, get_not_found
+
+# ------------------------
+# Bulk Lookup Configuration
+# ------------------------
+DEFAULT_CONCURRENCY = 10
+MAX_BATCH_SIZE = 2000
+ADDRESS_COLUMNS = ("address", "full_address", "property_address", "formatted_address")
+
+
+@dataclass
+class BulkRow:
+    """Result of one address in a bulk lookup"""
+    address: str
+    status: str                      # cached | fetched | shared | stale | not_found | error | over_quota
+    property_data: Optional[PropertyRecord] = None
+    analysis: Optional[Dict] = None
+    error: str = ""
+    charged: bool = False
+
+    def to_row(self) -> Dict:
+        """Flatten into a results-table row"""
+        row = {"Address": self.address, "Status": self.status}
+        if self.analysis:
+            financial = self.analysis['financial_metrics']
+            score = self.analysis['investment_score']
+            basic = self.analysis['basic_info']
+            row.update({
+                "Grade": score['grade'],
+                "Score": score['score'],
+                "Type": basic['property_type'],
+                "Beds": basic['bedrooms'],
+                "Baths": basic['bathrooms'],
+                "Price": financial['price'],
+                "Monthly Rent": financial['monthly_rent'],
+                "Cap Rate": financial['cap_rate'],
+                "Cash Flow": financial['estimated_cash_flow'],
+            })
+        if self.error:
+            row["Error"] = self.error
+        return row
+
+    def to_dict(self) -> Dict:
+        """JSON-ready form for the HTTP API"""
+        return {
+            "address": self.address,
+            "status": self.status,
+            "charged": self.charged,
+            "error": self.error or None,
+            "property": self.property_data.to_dict() if self.property_data else None,
+            "analysis": self.analysis,
+        }
+
+
+# ------------------------
+# Input Parsing
+# ------------------------
+def dedupe_addresses(addresses: List[str]) -> List[str]:
+    """Drop blanks and spelling-variant duplicates, keeping input order"""
+    seen = set()
+    unique = []
+    for address in addresses:
+        address = address.strip()
+        if not address:
+            continue
+        key = canonical_key(address)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(address)
+    return unique
+
+
+def parse_address_text(text: str) -> List[str]:
+    """One address per line"""
+    return dedupe_addresses(text.splitlines())
+
+
+def parse_address_csv(content: str) -> List[str]:
+    """Addresses from a CSV: an address column if there is one, otherwise
+    street/city/state/zip columns joined, otherwise every cell of each row"""
+    rows = [row for row in csv.reader(io.StringIO(content)) if any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    address_column = next((header.index(c) for c in ADDRESS_COLUMNS if c in header), None)
+    if address_column is not None:
+        addresses = [row[address_column] for row in rows[1:] if len(row) > address_column]
+    elif "street" in header or "city" in header:
+        parts = [header.index(c) for c in ("street", "city", "state", "zip") if c in header]
+        addresses = [", ".join(row[i].strip() for i in parts if i < len(row) and row[i].strip()) for row in rows[1:]]
+    else:
+        # No recognizable header: each row is an address split across cells
+        addresses = [", ".join(cell.strip() for cell in row if cell.strip()) for row in rows]
+    return dedupe_addresses(addresses)
+
+
+# ------------------------
+# Async Lookup Engine
+# ------------------------
+def _analyze(address: str, payload: Dict, status: str, charged: bool = False) -> BulkRow:
+    if not first_property(payload):
+        return BulkRow(address, "not_found", charged=charged, error="No property found for this address")
+    record = PropertyRecord.from_payload(payload)
+    return BulkRow(address, status, property_data=record, charged=charged, analysis=analyze_property(record))
+
+
+def lookup_row(address: str, allow_fetch: bool = True, probe: bool = True) -> BulkRow:
+    """Blocking lookup for one address; runs on the worker pool.
+
+    ``probe=False`` skips the cache check, for callers that just made it.
+    """
+    cached = get_cached("properties", address) if probe else None
+    if cached is not None:
+        return _analyze(address, cached, "cached")
+    not_found = get_not_found("properties", address)
+    if not_found is None and not allow_fetch:
+        return BulkRow(address, "over_quota", error="Monthly query limit reached")
+    try:
+        if not_found is not None:
+            raise not_found
+        payload, chargeable, stale_since = fetch_resilient("properties", address)
+    except RentCastNotFound as e:
+        return BulkRow(address, "not_found", error=" ".join([str(e)] + e.suggestions[:1]))
+    except RentCastError as e:
+        return BulkRow(address, "error", error=str(e))
+    if stale_since is not None:
+        # RentCast is down or slow: last known data, refreshed in the background
+        return _analyze(address, payload, "stale", charged=chargeable)
+    # "shared" rows rode on another session's in-flight request for the same address
+    return _analyze(address, payload, "fetched" if chargeable else "shared", charged=chargeable)
+
+
+def lookup_with_quota(address: str, quota) -> BulkRow:
+    """lookup_row that takes a unit from ``quota`` (anything with take() and
+    give_back(), like QuotaReservation) only when the address is not cached, and
+    gives it back when the call was not charged. Blocking."""
+    # Cache probe first so free rows never consume budget
+    cached = get_cached("properties", address)
+    if cached is not None:
+        return _analyze(address, cached, "cached")
+    allow_fetch = quota.take()
+    row = lookup_row(address, allow_fetch, probe=False)
+    if allow_fetch and not row.charged:
+        quota.give_back()
+    return row
+
+
+async def iter_bulk_lookup(addresses: List[str], quota: Union[int, QuotaReservation],
+                           concurrency: int = DEFAULT_CONCURRENCY) -> AsyncIterator[BulkRow]:
+    """
+    Look up many addresses concurrently, yielding rows as they complete.
+
+    Cached addresses are free. Each uncached address takes one unit from
+    ``quota`` (a QuotaReservation, or a plain number of allowed upstream
+    calls) before it is sent upstream; once it runs out, the rest come back
+    as ``over_quota``. Calls that end up not charged give their unit back.
+    Settling a reservation is left to the caller.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    reservation = QuotaReservation.local(quota) if isinstance(quota, int) else quota
+
+    async def run_one(address: str) -> BulkRow:
+        async with semaphore:
+            return await loop.run_in_executor(executor, lookup_with_quota, address, reservation)
+
+    # The core is blocking (requests), so lookups run on worker threads
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk-lookup")
+    tasks = [asyncio.ensure_future(run_one(address)) for address in addresses[:MAX_BATCH_SIZE]]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Drop lookups that have not started, then wait for running ones off
+        # the event loop, so none is still spending quota once we return
+        executor.shutdown(wait=False, cancel_futures=True)
+        await loop.run_in_executor(None, executor.shutdown, True)
@@ -0,0 +1,112 @@
+import threading
+import time
+from typing import Dict, Optional
+
+# ------------------------
+# Circuit Breaker
+# ------------------------
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the breaker is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is temporarily unavailable (retrying in {retry_in:.0f}s)")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a latency budget.
+
+    A call that errors, or that succeeds but takes longer than
+    ``latency_budget`` seconds, counts as a failure. After
+    ``failure_threshold`` consecutive failures the breaker opens and rejects
+    calls for ``recovery_timeout`` seconds. It then half-opens and lets a
+    single trial call through: success closes it, failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 latency_budget: float = 4.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.latency_budget = latency_budget
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._stats = {"successes": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "times_opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go upstream now"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self._stats["rejected"] += 1
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(self.name, retry_in)
+
+    def cancel_call(self):
+        """The permitted call never reached upstream (e.g. it was rate limited)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self, duration: float):
+        if duration > self.latency_budget:
+            with self._lock:
+                self._stats["slow_calls"] += 1
+            self.record_failure()
+            return
+        with self._lock:
+            self._stats["successes"] += 1
+            self._failures = 0
+            self._state = CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._stats["times_opened"] += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def retry_in(self) -> Optional[float]:
+        """Seconds until the breaker half-opens, or None when it is not open"""
+        with self._lock:
+            if self._current_state() != OPEN:
+                return None
+            return max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "name": self.name,
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "latency_budget_s": self.latency_budget
+            })
+        return stats
@@ -1,22 +1,126 @@
-import streamlit as st
+import os
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+from utils.errors import ConfigError
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+# ------------------------
+# Config Sources
+# ------------------------
+# Settings come from environment variables first, then from the same
+# secrets.toml files Streamlit reads (global, then project-level), so the core
+# modules never need st.secrets and behave the same in workers and CLIs.
+SECRETS_PATHS = (
+    Path.home() / ".streamlit" / "secrets.toml",
+    Path.cwd() / ".streamlit" / "secrets.toml",
+)
+
+# field -> (environment variable, (secrets section, key), ...)
+_SOURCES = {
+    "supabase_url": ("SUPABASE_URL", ("supabase", "url")),
+    "supabase_anon_key": ("SUPABASE_ANON_KEY", ("supabase", "anon_key"), ("supabase", "key")),
+    "supabase_service_key": ("SUPABASE_SERVICE_ROLE_KEY", ("supabase", "service_role_key")),
+    "wp_url": ("WP_BASE_URL", ("wordpress", "base_url")),
+    "wp_user": ("WP_USERNAME", ("wordpress", "username")),
+    "wp_pass": ("WP_PASSWORD", ("wordpress", "password")),
+    "wc_key": ("WC_CONSUMER_KEY", ("woocommerce", "consumer_key")),
+    "wc_secret": ("WC_CONSUMER_SECRET", ("woocommerce", "consumer_secret")),
+    "rentcast_key": ("RENTCAST_API_KEY", ("rentcast", "api_key")),
+    "rentcast_url": ("RENTCAST_BASE_URL", ("rentcast", "base_url")),
+}
+
+
+def _read_secrets(paths=SECRETS_PATHS) -> Dict:
+    secrets: Dict = {}
+    for path in paths:
+        if not path.exists():
+            continue
+        if tomllib is not None:
+            with open(path, "rb") as handle:
+                data = tomllib.load(handle)
+        else:
+            import toml  # installed with Streamlit
+            data = toml.load(path)
+        for section, values in data.items():
+            if isinstance(values, dict):
+                secrets.setdefault(section, {}).update(values)
+            else:
+                secrets[section] = values
+    return secrets
+
+
+# ------------------------
+# App Config
+# ------------------------
+@dataclass(frozen=True)
+class AppConfig:
+    """Every external setting the app needs; empty strings when unset"""
+    supabase_url: str = ""
+    supabase_anon_key: str = ""
+    supabase_service_key: str = ""   # maintenance jobs only; never used by the app
+    wp_url: str = ""
+    wp_user: str = ""
+    wp_pass: str = ""
+    wc_key: str = ""
+    wc_secret: str = ""
+    rentcast_key: str = ""
+    rentcast_url: str = "https://api.rentcast.io/v1"
+
+    def require(self, *fields: str) -> "AppConfig":
+        """Raise ConfigError naming every listed field that is unset"""
+        missing = [name for name in fields if not getattr(self, name)]
+        if missing:
+            hints = ", ".join(f"{_SOURCES[name][0]} or [{_SOURCES[name][1][0]}] {_SOURCES[name][1][1]}"
+                              for name in missing)
+            raise ConfigError(f"Missing configuration: {hints}")
+        return self
+
+
+def load_config(environ: Optional[Mapping[str, str]] = None, secrets: Optional[Dict] = None) -> AppConfig:
+    """Build an AppConfig from the environment and secrets.toml"""
+    environ = os.environ if environ is None else environ
+    secrets = _read_secrets() if secrets is None else secrets
+    values = {}
+    for name, (env_name, *secret_keys) in _SOURCES.items():
+        value = environ.get(env_name)
+        for section, key in secret_keys:
+            if value:
+                break
+            value = (secrets.get(section) or {}).get(key)
+        if value:
+            values[name] = str(value)
+    return AppConfig(**values)
+
+
+_config: Optional[AppConfig] = None
+_config_lock = threading.Lock()
+
+
+def get_app_config() -> AppConfig:
+    """The process-wide config, loaded on first use"""
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = load_config()
+    return _config
+
 
 # ------------------------
 # Config Loader
 # ------------------------
-@st.cache_data(ttl=3600)  # Increased TTL to 1 hour for config stability
-def get_config():
-    """Get configuration with error handling"""
+def get_config() -> Optional[Dict]:
+    """WordPress/WooCommerce settings as a dict, or None when they are missing"""
+    config = get_app_config()
     try:
-        return {
-            "wp_url": st.secrets["wordpress"]["base_url"],
-            "wp_user": st.secrets["wordpress"]["username"],
-            "wp_pass": st.secrets["wordpress"]["password"],
-            "wc_key": st.secrets["woocommerce"]["consumer_key"],
-            "wc_secret": st.secrets["woocommerce"]["consumer_secret"],
-            "rentcast_key": st.secrets["rentcast"]["api_key"],
-            "rentcast_url": "https://api.rentcast.io/v1"
-        }
-    except Exception as e:
-        st.error(f"Configuration error: {e}")
+        config.require("wp_url", "wp_user", "wp_pass", "wc_key", "wc_secret")
+    except ConfigError:
         return None
-
+    return asdict(config)
@@ -1,26 +1,304 @@
-import streamlit as st
-from utils.auth import get_user_client
+import datetime
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
 
+from utils.supabase_client import get_user_client, is_missing_object, session_user_id
+from utils.telemetry import record_quota_refund, record_quota_spend, track
+from utils.offline import (ReplayDeferred, is_network_error, is_offline, load_snapshot, mark_offline, queue_write,
+                           register_handler, save_snapshot)
 
+# ------------------------
+# Query Quota
+# ------------------------
+# The monthly RentCast quota lives in query_quotas and is charged by the
+# consume_query_quota() database function (supabase/migrations), which checks
+# and increments in one statement: one round trip per charged call, and no
+# lost updates between tabs. Databases without that migration keep the old
+# read-modify-write on the api_usage counter row. Reservations come from a
+# separate migration, so each one is tracked under its own flag.
+_server_features = {"query_quotas": True, "quota_reservations": True}
+
+
+def _quota_rpc(client, feature: str, name: str, params: Dict):
+    """Call a quota function; None when the migration behind ``feature`` is
+    not applied. Any other error propagates."""
+    if not _server_features[feature]:
+        return None
+    try:
+        with track("supabase", f"rpc.{name}"):
+            return client.rpc(name, params).execute().data
+    except Exception as e:
+        if not is_missing_object(e):
+            raise
+        _server_features[feature] = False  # migration not applied; stop asking
+        return None
+
+
+def _charge(client, user_id, email, amount, limit) -> Tuple[bool, Optional[int]]:
+    # The database charges the signed-in user (auth.uid()); user_id is only
+    # needed by the fallback counter
+    state = _quota_rpc(client, "query_quotas", "consume_query_quota", {"p_amount": amount, "p_limit": limit, "p_email": email})
+    if state is None:
+        used = get_user_usage(user_id, email)
+        if limit is not None and used + amount > limit:
+            return False, max(0, limit - used)
+        _write_usage_counter(client, user_id, used + amount)
+        state = {"allowed": True, "remaining": None if limit is None else limit - used - amount}
+    if state["allowed"]:
+        record_quota_spend(amount, "rentcast")
+    return state["allowed"], state["remaining"]
+
+
+def consume_quota(user_id, email, amount=1, limit: Optional[int] = None) -> Tuple[bool, Optional[int], bool]:
+    """
+    Atomically charge ``amount`` queries if they fit under ``limit`` (no cap
+    when None). Returns (allowed, remaining, metered); remaining is None when
+    unknown, and metered says whether anything was actually charged, which
+    is what may later be refunded. Nothing is charged while offline or
+    signed out.
+    """
+    if is_offline():
+        return True, None, False
+    client = get_user_client()
+    if not client:
+        return True, None, False
+    try:
+        allowed, remaining = _charge(client, user_id, email, amount, limit)
+        return allowed, remaining, allowed
+    except Exception as e:
+        if not is_network_error(e):
+            raise
+        mark_offline(e)
+        return True, None, False
+
+
+def _refund(client, user_id, email, amount):
+    if _quota_rpc(client, "query_quotas", "refund_query_quota", {"p_amount": amount}) is None:
+        used = get_user_usage(user_id, email)
+        _write_usage_counter(client, user_id, max(0, used - amount))
+    record_quota_refund(amount, "rentcast")
+
+
+def refund_quota(user_id, email, amount=1):
+    """Give back units charged by consume_quota that were not spent upstream (queued while offline)."""
+    if amount <= 0:
+        return
+    if not is_offline():
+        client = get_user_client()
+        if not client:
+            return
+        try:
+            _refund(client, user_id, email, amount)
+            return
+        except Exception as e:
+            if not is_network_error(e):
+                raise
+            mark_offline(e)
+    queue_write("refund_quota", user_id=user_id, email=email, amount=amount)
+
+
+# ------------------------
+# Quota Reservations
+# ------------------------
+RESERVATION_TTL = int(os.environ.get("QUOTA_RESERVATION_TTL", "300"))  # seconds a reservation is held
+
+
+class QuotaReservation:
+    """
+    Quota units held on the server for a batch of upstream calls, so parallel
+    workers (and other tabs) cannot overspend the limit between them.
+
+        with QuotaReservation(user_id, email, MAX_QUERIES) as reservation:
+            reservation.reserve(len(addresses))
+            # per call: reservation.take() before it, reservation.give_back()
+            # if it turned out not to be charged
+        # on exit the units used are committed and the rest released
+
+    Reservations expire after ``ttl`` seconds on the server, so a session that
+    dies mid-batch cannot hold quota for long. While offline or signed out
+    nothing is reserved and every requested unit is granted locally. With
+    ``top_up`` set, a take() that finds nothing left reserves that many more
+    units first, for batches whose size is only known as they run.
+    """
+
+    def __init__(self, user_id, email, limit: Optional[int] = None, ttl: int = RESERVATION_TTL,
+                 top_up: int = 0):
+        self.user_id = user_id
+        self.email = email
+        self.limit = limit
+        self.ttl = ttl
+        self.top_up = top_up
+        self._client = None
+        self.reservation_ids: List[str] = []
+        self.granted = 0     # units held for this batch
+        self.taken = 0       # units handed to calls
+        self.returned = 0    # handed out but not charged upstream
+        self.metered = False  # True once units are held on the server
+        self.settled = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def local(cls, units: int) -> "QuotaReservation":
+        """An allowance of ``units`` that is never reserved or charged anywhere"""
+        reservation = cls(None, None)
+        reservation.granted = max(0, units)
+        reservation.settled = True
+        return reservation
+
+    def _session(self):
+        """The client of the session that opened this reservation (top-ups run
+        on worker threads, which have no session of their own); None offline"""
+        if is_offline():
+            return None
+        if self._client is None:
+            self._client = get_user_client()
+        return self._client
+
+    def reserve(self, units: int) -> int:
+        """Hold up to ``units`` more queries; returns how many were granted"""
+        if units <= 0:
+            return 0
+        client = self._session()
+        if client is None or self.limit is None:
+            granted = units
+        else:
+            try:
+                state = _quota_rpc(client, "quota_reservations", "reserve_query_quota", {
+                    "p_units": units, "p_limit": self.limit, "p_ttl_seconds": self.ttl, "p_email": self.email
+                })
+            except Exception as e:
+                if not is_network_error(e):
+                    raise
+                # Lost the connection: grant locally, as while offline
+                mark_offline(e)
+                state = {"granted": units, "reservation_id": None}
+            if state is None:
+                # No reservation support: grant what the counter says is left
+                state = {"granted": min(units, max(0, self.limit - get_user_usage(self.user_id, self.email)
+                                                   - self.granted)), "reservation_id": None}
+            granted = state["granted"]
+            if state["reservation_id"]:
+                self.reservation_ids.append(state["reservation_id"])
+                self.metered = True
+        with self._lock:
+            self.granted += granted
+        return granted
+
+    def take(self) -> bool:
+        """Claim one granted unit for an upstream call"""
+        if self._claim():
+            return True
+        if not self.top_up or self.settled or not self.reserve(self.top_up):
+            return False
+        return self._claim()
+
+    def _claim(self) -> bool:
+        with self._lock:
+            if self.used >= self.granted:
+                return False
+            self.taken += 1
+            return True
+
+    def give_back(self, units: int = 1):
+        """Return claimed units whose calls were not charged (they can be taken again)"""
+        with self._lock:
+            self.returned += units
+
+    @property
+    def used(self) -> int:
+        return self.taken - self.returned
+
+    def commit(self, used: Optional[int] = None):
+        """Charge ``used`` units (default: taken minus given back) and release the rest"""
+        if self.settled:
+            return
+        self.settled = True
+        used = self.used if used is None else used
+        if not self.metered:
+            if used:
+                increment_usage(self.user_id, self.email, used)
+            return
+
+        client = self._session()
+        for index, reservation_id in enumerate(self.reservation_ids):
+            # All usage is charged on the first reservation; the others are just released
+            charge = used if index == 0 else 0
+            if client is not None:
+                try:
+                    _commit_reservation(client, self.user_id, reservation_id, charge)
+                    continue
+                except Exception as e:
+                    if not is_network_error(e):
+                        raise
+                    mark_offline(e)
+                    client = None
+            # Unsettled reservations expire on their own; only charges must be kept
+            if charge:
+                queue_write("commit_reservation", user_id=self.user_id, reservation_id=reservation_id, used=charge)
+        record_quota_spend(used, "rentcast")
+
+    def release(self):
+        """Give every held unit back without charging anything"""
+        self.commit(0)
+
+    def __enter__(self) -> "QuotaReservation":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.commit()
+
+
+def _commit_reservation(client, user_id, reservation_id: str, used: int):
+    """Settle a reservation; raises on failure. The database settles the
+    signed-in user's reservation; user_id is only needed by the fallback counter"""
+    params = {"p_reservation_id": reservation_id, "p_used": used}
+    if _quota_rpc(client, "quota_reservations", "commit_query_quota_reservation", params) is None and used:
+        _write_usage_counter(client, user_id, get_user_usage(user_id, None) + used)
+
+
+# ------------------------
+# Usage Counter
+# ------------------------
 def initialize_user_usage(user_id, email):
     """Initialize usage tracking for a new user."""
     client = get_user_client()
     if client:
-        client.table("api_usage").insert({
-            "user_id": user_id,
-            "email": email,
-            "queries": 0
-        }).execute()
+        with track("supabase", "api_usage.insert"):
+            client.table("api_usage").insert({
+                "user_id": user_id,
+                "email": email,
+                "queries": 0
+            }).execute()
 
 
 def get_user_usage(user_id, email):
-    """Get current API usage for a user."""
+    """Get current API usage for a user (last known count while offline)."""
+    if is_offline():
+        snapshot = load_snapshot("queries", user_id)
+        return snapshot[0] if snapshot else 0
+
     client = get_user_client()
     if not client:
         return 0
 
-    response = client.table("api_usage").select("*").eq("user_id", user_id).execute()
+    if _server_features["query_quotas"]:
+        try:
+            with track("supabase", "query_quotas.select"):
+                response = client.table("query_quotas").select("used, period").eq("user_id", user_id).execute()
+            this_period = datetime.datetime.utcnow().strftime("%Y-%m-01")
+            used = response.data[0]["used"] if response.data and response.data[0]["period"] == this_period else 0
+            save_snapshot("queries", user_id, used)
+            return used
+        except Exception as e:
+            if not is_missing_object(e):
+                raise
+            _server_features["query_quotas"] = False  # migration not applied; stop asking
+
+    with track("supabase", "api_usage.select"):
+        response = client.table("api_usage").select("*").eq("user_id", user_id).execute()
     if response.data:
+        save_snapshot("queries", user_id, response.data[0]["queries"])
         return response.data[0]["queries"]
     else:
         # Create usage record if it doesn't exist
@@ -28,16 +306,55 @@ def get_user_usage(user_id, email):
         return 0
 
 
-def increment_usage(user_id, email):
-    """Increment API usage count for a user."""
+def _write_usage_counter(client, user_id, queries):
+    with track("supabase", "api_usage.update"):
+        client.table("api_usage").update({
+            "queries": queries
+        }).eq("user_id", user_id).execute()
+
+
+def increment_usage(user_id, email, amount=1):
+    """Charge API usage after the fact, without a cap (queued while offline)."""
+    if not is_offline():
+        client = get_user_client()
+        if not client:
+            return
+        try:
+            _charge(client, user_id, email, amount, None)
+            return
+        except Exception as e:
+            if not is_network_error(e):
+                raise
+            mark_offline(e)
+    queue_write("increment_usage", user_id=user_id, email=email, amount=amount)
+
+
+def _session_client(user_id):
+    """The client of ``user_id``'s own session; ReplayDeferred until there is one"""
     client = get_user_client()
-    if not client:
-        return
+    if not client or str(session_user_id()) != str(user_id):
+        raise ReplayDeferred("Waiting for this user's Supabase session")
+    return client
+
+
+def _replay_increment(user_id, email, amount=1):
+    """Outbox handler: apply a queued increment as the user who made it"""
+    _charge(_session_client(user_id), user_id, email, amount, None)
+
+
+def _replay_refund(user_id, email, amount=1):
+    """Outbox handler: apply a queued refund as the user who made it"""
+    _refund(_session_client(user_id), user_id, email, amount)
+
+
+def _replay_commit(user_id, reservation_id, used):
+    """Outbox handler: settle a queued reservation as the user who made it"""
+    _commit_reservation(_session_client(user_id), user_id, reservation_id, used)
+
 
-    current = get_user_usage(user_id, email)
-    client.table("api_usage").update({
-        "queries": current + 1
-    }).eq("user_id", user_id).execute()
+register_handler("increment_usage", _replay_increment)
+register_handler("refund_quota", _replay_refund)
+register_handler("commit_reservation", _replay_commit)
 
 
 def get_usage_history(user_id):
@@ -47,5 +364,6 @@ def get_usage_history(user_id):
         return []
 
     # For now, just return current usage
-    response = client.table("api_usage").select("*").eq("user_id", user_id).execute()
+    with track("supabase", "api_usage.select"):
+        response = client.table("api_usage").select("*").eq("user_id", user_id).execute()
     return response.data if response.data else []
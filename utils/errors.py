@@ -0,0 +1,61 @@
+from dataclasses import dataclass, field
+from typing import Generic, List, Optional, Tuple, TypeVar
+
+# ------------------------
+# Typed Errors
+# ------------------------
+# Core modules raise or return these instead of calling st.error, so they can
+# run in worker threads, CLIs and services. utils/ui.py renders them in pages.
+
+
+class AppError(Exception):
+    """Base class for errors the app reports to the user"""
+
+
+class ConfigError(AppError):
+    """A required setting is missing from the environment and secrets"""
+
+
+class ServiceError(AppError):
+    """A remote service call failed or returned an unexpected answer"""
+
+    def __init__(self, message: str, service: str = "", status_code: Optional[int] = None):
+        super().__init__(message)
+        self.service = service
+        self.status_code = status_code
+
+
+class QuotaExceededError(AppError):
+    """The user has used up their monthly API queries"""
+
+
+# ------------------------
+# Result Type
+# ------------------------
+T = TypeVar("T")
+
+
+@dataclass
+class Result(Generic[T]):
+    """Outcome of a core operation: a value (or fallback value), an optional
+    error and user-facing notices as (level, message) pairs, where level is
+    one of "success", "info", "warning" or "error"."""
+    value: Optional[T] = None
+    error: Optional[Exception] = None
+    notices: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @classmethod
+    def success(cls, value: T = None, *notices: Tuple[str, str]) -> "Result[T]":
+        return cls(value=value, notices=list(notices))
+
+    @classmethod
+    def failure(cls, error: Exception, value: T = None) -> "Result[T]":
+        return cls(value=value, error=error)
+
+    def notify(self, level: str, message: str) -> "Result[T]":
+        self.notices.append((level, message))
+        return self
@@ -0,0 +1,172 @@
+import random
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.telemetry import record_request
+
+# ------------------------
+# Pooled HTTP Client
+# ------------------------
+DEFAULT_TIMEOUT = (3.05, 15)  # (connect, read) seconds
+DEFAULT_POOL_SIZE = 20
+DEFAULT_MAX_RETRIES = 3
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+
+class PooledClient:
+    """Keep-alive HTTP client shared by every session in the process.
+
+    All threads share one bounded connection pool; each thread gets its own
+    ``requests.Session`` mounted on that pool, so TCP/TLS handshakes are paid
+    once per connection instead of once per call.
+    """
+
+    def __init__(self, name: str, pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 retry_statuses: Iterable[int] = RETRY_STATUSES,
+                 limiter=None):
+        self.name = name
+        self.limiter = limiter
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_statuses = frozenset(retry_statuses)
+        # pool_block makes callers wait for a free connection instead of
+        # opening (and discarding) connections beyond the pool size.
+        self._adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=pool_size,
+            max_retries=0,
+            pool_block=True
+        )
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {
+            "requests": 0,
+            "retries": 0,
+            "errors": 0,
+            "total_seconds": 0.0
+        }
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            self._local.session = session
+        return session
+
+    def _count(self, key: str, amount=1):
+        with self._lock:
+            self._counters[key] += amount
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when sent."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), BACKOFF_CAP)
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request with timeouts and retries on 429/5xx and network errors"""
+        kwargs.setdefault("timeout", self.timeout)
+        session = self._session()
+        endpoint = urlsplit(url).path
+
+        for attempt in range(self.max_retries + 1):
+            # Every attempt, retries included, spends a rate-limit token
+            if self.limiter is not None:
+                self.limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._count("errors")
+                record_request(self.name, endpoint, type(e).__name__, time.perf_counter() - started)
+                if attempt >= self.max_retries:
+                    raise
+                self._count("retries")
+                time.sleep(self._backoff(attempt))
+                continue
+            finally:
+                self._count("requests")
+                self._count("total_seconds", time.perf_counter() - started)
+            # Reading the body here is free: callers consume the whole payload anyway
+            record_request(self.name, endpoint, response.status_code, time.perf_counter() - started,
+                           len(response.content))
+
+            if response.status_code in self.retry_statuses and attempt < self.max_retries:
+                self._count("retries")
+                delay = self._backoff(attempt, response)
+                response.close()
+                time.sleep(delay)
+                continue
+            return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def stats(self) -> Dict:
+        """Pool statistics: connections opened vs requests served over them"""
+        connections = 0
+        pooled_requests = 0
+        idle = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            pooled_requests += pool.num_requests
+            if pool.pool is not None:
+                # The queue is pre-filled with None placeholders for unopened slots
+                idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+
+        with self._lock:
+            counters = dict(self._counters)
+
+        requests_sent = counters["requests"]
+        return {
+            "name": self.name,
+            "requests": requests_sent,
+            "retries": counters["retries"],
+            "errors": counters["errors"],
+            "avg_latency_ms": round(counters["total_seconds"] / requests_sent * 1000, 1) if requests_sent else 0,
+            "connections_opened": connections,
+            "connection_reuse_pct": round((1 - connections / pooled_requests) * 100, 1) if pooled_requests else 0,
+            "idle_connections": idle,
+            "pool_size": self._adapter._pool_maxsize
+        }
+
+
+# ------------------------
+# Process-wide Registry
+# ------------------------
+_clients: Dict[str, PooledClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name: str, **options) -> PooledClient:
+    """Return the process-wide client for ``name``, creating it on first use"""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = PooledClient(name, **options)
+                _clients[name] = client
+    return client
+
+
+def get_pool_stats() -> Dict[str, Dict]:
+    """Statistics for every pooled client created in this process"""
+    return {name: client.stats() for name, client in list(_clients.items())}
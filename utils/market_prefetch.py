@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from utils.api_cache import get_api_cache
+from utils.telemetry import track
+from utils.offline import is_offline
+from utils.rentcast_api import RentCastError, fetch_coalesced, get_breaker_stats, get_not_found
+
+# ------------------------
+# Prefetch Configuration
+# ------------------------
+# Local hours during which the prefetcher may call RentCast, "start-end" (end exclusive)
+PREFETCH_HOURS = os.environ.get("MARKET_PREFETCH_HOURS", "1-6")
+# Upstream calls the prefetcher may make per day, shared by every process on the host
+PREFETCH_DAILY_BUDGET = int(os.environ.get("MARKET_PREFETCH_DAILY_BUDGET", "200"))
+PREFETCH_INTERVAL = float(os.environ.get("MARKET_PREFETCH_INTERVAL", "900"))  # seconds between passes
+# Refresh entries that would expire before the next off-peak window
+PREFETCH_MIN_REMAINING = float(os.environ.get("MARKET_PREFETCH_MIN_REMAINING", str(20 * 3600)))
+PREFETCH_ENABLED = os.environ.get("MARKET_PREFETCH_ENABLED", "1") not in ("0", "false", "no")
+
+_BUDGET_NAMESPACE = "prefetch_budget"
+
+
+def _parse_hours(spec: str) -> range:
+    start, _, end = spec.partition("-")
+    start, end = int(start), int(end or int(start) + 1)
+    # "22-4" wraps past midnight
+    return range(start, end) if start < end else range(start, end + 24)
+
+
+def in_off_peak(now: Optional[datetime] = None, spec: str = PREFETCH_HOURS) -> bool:
+    """True when ``now`` falls inside the configured off-peak window"""
+    hour = (now or datetime.now()).hour
+    hours = _parse_hours(spec)
+    return hour in hours or hour + 24 in hours
+
+
+# ------------------------
+# ZIP Discovery
+# ------------------------
+def collect_portfolio_zips() -> Set[str]:
+    """Distinct ZIP codes across every saved property, from Supabase.
+
+    Only the ZIP field is selected, so the payload stays small no matter how
+    large the stored property records are.
+    """
+    from utils.supabase_client import init_supabase
+
+    supabase = init_supabase()
+    with track("supabase", "properties.select"):
+        result = supabase.table("properties").select("zip:data->>zipCode").execute()
+    return {row["zip"][:5] for row in result.data or [] if row.get("zip")}
+
+
+# ------------------------
+# Daily Budget
+# ------------------------
+def budget_used(day: Optional[date] = None) -> int:
+    """Prefetch calls already spent today (all processes sharing the cache)"""
+    return get_api_cache().counter(_BUDGET_NAMESPACE, (day or date.today()).isoformat())
+
+
+def _spend_budget(day: date, daily_budget: int) -> bool:
+    """Take one call from the day's budget; False once it is spent"""
+    return get_api_cache().increment(_BUDGET_NAMESPACE, day.isoformat(), 1, limit=daily_budget)
+
+
+# ------------------------
+# Prefetcher
+# ------------------------
+class MarketPrefetcher:
+    """
+    Background worker that keeps per-ZIP market data warm.
+
+    Every PREFETCH_INTERVAL seconds during off-peak hours it gathers the ZIP
+    codes of saved properties (plus any registered by pages), skips ZIPs whose
+    cache entry will outlive the day, and fetches the rest until the daily
+    budget is spent. Prefetch calls are never charged to a user's quota.
+    """
+
+    def __init__(self, daily_budget: int = PREFETCH_DAILY_BUDGET, interval: float = PREFETCH_INTERVAL,
+                 hours: str = PREFETCH_HOURS, min_remaining: float = PREFETCH_MIN_REMAINING):
+        self.daily_budget = daily_budget
+        self.interval = interval
+        self.hours = hours
+        self.min_remaining = min_remaining
+        self._lock = threading.Lock()
+        self._requested: Set[str] = set()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stats = {"passes": 0, "fetched": 0, "skipped_warm": 0, "errors": 0,
+                       "last_pass": None, "last_error": ""}
+
+    def request(self, zip_codes: Iterable[str]):
+        """Queue ZIP codes seen by a page so the next pass warms them first"""
+        with self._lock:
+            self._requested.update(z[:5] for z in zip_codes if z)
+
+    def needs_refresh(self, zip_code: str) -> bool:
+        remaining = get_api_cache().expires_in("markets_zip", zip_code)
+        return remaining is None or remaining < self.min_remaining
+
+    def run_once(self, zip_codes: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """One prefetch pass; ignores the off-peak window but honours the budget"""
+        with self._lock:
+            requested = list(self._requested)
+            self._requested.clear()
+        if zip_codes is None:
+            try:
+                zip_codes = collect_portfolio_zips()
+            except Exception as e:
+                zip_codes = set()
+                self._stats["last_error"] = f"ZIP discovery failed: {e}"
+
+        # Page-requested ZIPs first, then the rest in a stable order
+        ordered: List[str] = list(dict.fromkeys(requested + sorted(zip_codes)))
+        today = date.today()
+        fetched = skipped = errors = 0
+        for zip_code in ordered:
+            if not self.needs_refresh(zip_code) or get_not_found("markets", zip_code) is not None:
+                skipped += 1
+                continue
+            if (is_offline() or get_breaker_stats()["state"] != "closed"
+                    or not _spend_budget(today, self.daily_budget)):
+                # Offline, RentCast is struggling or the budget is spent: leave the rest for a later pass
+                with self._lock:
+                    self._requested.update(ordered[ordered.index(zip_code):])
+                break
+            try:
+                # A bare ZIP resolves to the shared per-ZIP market lookup
+                fetch_coalesced("markets", zip_code)
+                fetched += 1
+            except RentCastError as e:
+                errors += 1
+                self._stats["last_error"] = f"{zip_code}: {e}"
+
+        self._stats["passes"] += 1
+        self._stats["fetched"] += fetched
+        self._stats["skipped_warm"] += skipped
+        self._stats["errors"] += errors
+        self._stats["last_pass"] = time.time()
+        return {"zips": len(ordered), "fetched": fetched, "skipped_warm": skipped, "errors": errors}
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            if in_off_peak(spec=self.hours):
+                self.run_once()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="market-prefetch", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            queued = len(self._requested)
+        stats = dict(self._stats)
+        stats.update({
+            "running": self._thread is not None and self._thread.is_alive(),
+            "queued": queued,
+            "budget_used_today": budget_used(),
+            "daily_budget": self.daily_budget,
+            "off_peak_hours": self.hours
+        })
+        return stats
+
+
+# ------------------------
+# Process-wide Instance
+# ------------------------
+_prefetcher: Optional[MarketPrefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_market_prefetcher() -> MarketPrefetcher:
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = MarketPrefetcher()
+    return _prefetcher
+
+
+def start_market_prefetcher() -> Optional[MarketPrefetcher]:
+    """Start the background prefetcher once per process (safe to call on every rerun)"""
+    if not PREFETCH_ENABLED:
+        return None
+    prefetcher = get_market_prefetcher()
+    prefetcher.start()
+    return prefetcher
+
+
+def get_warm_market(zip_code: str) -> Optional[Dict]:
+    """Cached market data for a ZIP, or None. Never calls the API."""
+    return get_api_cache().get("markets_zip", zip_code[:5]) if zip_code else None
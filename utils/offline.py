@@ -0,0 +1,242 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import requests
+
+from utils.api_cache import CACHE_PATH, get_api_cache
+from utils.serialization import dumps, loads
+
+# ------------------------
+# Offline Configuration
+# ------------------------
+# APP_OFFLINE=1 pins the app offline; otherwise it goes offline when a remote
+# call fails to connect and retries the network after OFFLINE_RETRY_AFTER.
+OFFLINE_FORCED = os.environ.get("APP_OFFLINE", "0") not in ("0", "false", "no", "")
+OFFLINE_RETRY_AFTER = float(os.environ.get("OFFLINE_RETRY_AFTER", "30"))   # seconds
+SNAPSHOT_TTL = 30 * 24 * 3600       # local copies of remote data, read at any age
+OUTBOX_PATH = CACHE_PATH.parent / "outbox.sqlite3"
+OUTBOX_MAX_ATTEMPTS = 5             # non-network failures before an op is parked
+
+# The offline state is process-wide: it is shared by every Streamlit session
+# and API request in the process. Only failures to reach the app's own
+# backends (Supabase, WooCommerce) set it. A RentCast outage is handled by the
+# RentCast circuit breaker instead, so one slow upstream call does not queue
+# every session's saves and stop quota charging.
+_state = {"manual": False, "detected_at": 0.0, "reason": ""}
+_state_lock = threading.Lock()
+
+
+# ------------------------
+# Connectivity State
+# ------------------------
+def is_offline() -> bool:
+    """True when the app should not make remote calls"""
+    with _state_lock:
+        if OFFLINE_FORCED or _state["manual"]:
+            return True
+        return time.time() - _state["detected_at"] < OFFLINE_RETRY_AFTER
+
+
+def set_offline(enabled: bool):
+    """Turn manual offline mode on or off"""
+    with _state_lock:
+        _state["manual"] = enabled
+        if not enabled:
+            _state["detected_at"] = 0.0
+
+
+def offline_reason() -> str:
+    with _state_lock:
+        if OFFLINE_FORCED:
+            return "APP_OFFLINE is set"
+        if _state["manual"]:
+            return "Offline mode is on"
+        return _state["reason"]
+
+
+def is_network_error(error: BaseException) -> bool:
+    """Connection-level failures (no route, DNS, refused, timeouts), from requests or httpx"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)):
+        return True
+    names = {cls.__name__ for cls in type(error).__mro__}
+    return bool(names & {"ConnectError", "TransportError", "NetworkError", "TimeoutException"})
+
+
+def mark_offline(error: BaseException):
+    """Record a failed connection; remote calls are skipped for a while"""
+    with _state_lock:
+        _state["detected_at"] = time.time()
+        _state["reason"] = f"Network unavailable: {type(error).__name__}"
+
+
+def mark_online():
+    with _state_lock:
+        _state["detected_at"] = 0.0
+        _state["reason"] = ""
+
+
+# ------------------------
+# Local Snapshots
+# ------------------------
+def save_snapshot(kind: str, user_id, value: Any):
+    """Keep a local copy of remote data (portfolio, orders, usage) for offline use"""
+    get_api_cache().set(f"offline_{kind}", str(user_id), value, SNAPSHOT_TTL)
+
+
+def load_snapshot(kind: str, user_id) -> Optional[Tuple[Any, float]]:
+    """Return (value, stored_at) of the last local copy, or None"""
+    return get_api_cache().get_stale(f"offline_{kind}", str(user_id))
+
+
+def snapshot_note(kind: str, user_id) -> Optional[str]:
+    """Caption for pages rendered from a local copy, or None when online"""
+    if not is_offline():
+        return None
+    snapshot = load_snapshot(kind, user_id)
+    if snapshot is None:
+        return "📴 Offline — nothing saved on this device yet"
+    return f"📴 Offline — showing data saved {time.strftime('%Y-%m-%d %H:%M', time.localtime(snapshot[1]))}"
+
+
+# ------------------------
+# Durable Outbox
+# ------------------------
+class ReplayDeferred(Exception):
+    """Raised by an outbox handler that cannot run in this session yet (e.g.
+    it needs its user's Supabase session); the entry is kept for a later sync."""
+
+
+def _owner(entry: Dict) -> str:
+    return str(entry["payload"].get("user_id"))
+
+
+class Outbox:
+    """SQLite queue of writes made while offline, replayed in order when the
+    network is back. Each entry names a registered handler and its kwargs;
+    the ``user_id`` kwarg says whose write it is, and only a session signed
+    in as that user replays it."""
+
+    def __init__(self, path: Path = OUTBOX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT NOT NULL, payload TEXT NOT NULL, "
+            "created_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT)"
+        )
+
+    def enqueue(self, op: str, **payload) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (op, payload, created_at) VALUES (?, ?, ?)",
+                (op, dumps(payload), time.time())
+            )
+            return cursor.lastrowid
+
+    def discard(self, entry_id: int):
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+
+    def pending(self, *user_ids) -> int:
+        """Entries still to replay, only those of ``user_ids`` when given"""
+        entries = [entry for entry in self.entries() if entry["attempts"] < OUTBOX_MAX_ATTEMPTS]
+        if user_ids:
+            owners = {str(user_id) for user_id in user_ids}
+            entries = [entry for entry in entries if _owner(entry) in owners]
+        return len(entries)
+
+    def entries(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, op, payload, created_at, attempts, last_error FROM outbox ORDER BY id"
+            ).fetchall()
+        return [{"id": r[0], "op": r[1], "payload": loads(r[2]), "created_at": r[3],
+                 "attempts": r[4], "last_error": r[5]} for r in rows]
+
+    def replay(self, *user_ids) -> Dict[str, int]:
+        """Run the queued writes of ``user_ids`` in order; stops at the first
+        network failure. Other users' entries wait for their own session."""
+        result = {"replayed": 0, "failed": 0, "deferred": 0, "remaining": 0}
+        if not self._replay_lock.acquire(blocking=False):
+            # Another session is already replaying; don't send anything twice
+            result["remaining"] = self.pending(*user_ids)
+            return result
+        try:
+            self._replay(result, {str(user_id) for user_id in user_ids})
+        finally:
+            self._replay_lock.release()
+        result["remaining"] = self.pending(*user_ids)
+        return result
+
+    def _replay(self, result: Dict[str, int], owners: Set[str]):
+        for entry in self.entries():
+            if entry["attempts"] >= OUTBOX_MAX_ATTEMPTS or _owner(entry) not in owners:
+                continue
+            handler = _handlers.get(entry["op"])
+            try:
+                if handler is None:
+                    raise LookupError(f"No outbox handler for {entry['op']}")
+                handler(**entry["payload"])
+            except ReplayDeferred:
+                result["deferred"] += 1
+                continue
+            except Exception as e:
+                if is_network_error(e):
+                    mark_offline(e)
+                    break
+                result["failed"] += 1
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+                        (str(e)[:500], entry["id"])
+                    )
+                continue
+            self.discard(entry["id"])
+            result["replayed"] += 1
+
+
+_handlers: Dict[str, Callable[..., Any]] = {}
+_outbox: Optional[Outbox] = None
+_outbox_lock = threading.Lock()
+
+
+def register_handler(op: str, handler: Callable[..., Any]):
+    """Register the function that performs ``op`` against the remote service.
+    Handlers must raise on failure and must not render Streamlit elements;
+    they run at the start of a page run, so session state is available.
+    A handler that cannot act for its entry's user raises ReplayDeferred
+    rather than returning, so the write is not dropped."""
+    _handlers[op] = handler
+
+
+def get_outbox() -> Outbox:
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = Outbox()
+    return _outbox
+
+
+def queue_write(op: str, **payload) -> int:
+    """Queue a remote write for later replay; returns the outbox entry id"""
+    return get_outbox().enqueue(op, **payload)
+
+
+def sync_outbox(*user_ids) -> Optional[Dict[str, int]]:
+    """Replay the signed-in user's queued writes if online and any are pending"""
+    if is_offline() or not user_ids:
+        return None
+    outbox = get_outbox()
+    if not outbox.pending(*user_ids):
+        return None
+    return outbox.replay(*user_ids)
+
@@ -1,51 +1,50 @@
-import streamlit as st
 from datetime import datetime, timezone
-from typing import Dict
-import plotly.express as px
-import plotly.graph_objects as go
+from typing import Dict, Iterable, List, Union
 import datetime
+from utils.property_record import PropertyRecord
 
 # ------------------------
 # Property Analysis & Visualization
 # ------------------------
-def analyze_property(property_data: Dict) -> Dict:
+def analyze_property(property_data: Union[PropertyRecord, Dict]) -> Dict:
     """Comprehensive property analysis"""
+    record = PropertyRecord.from_payload(property_data)
     analysis = {
-        'basic_info': extract_basic_info(property_data),
-        'financial_metrics': calculate_financial_metrics(property_data),
-        'market_analysis': perform_market_analysis(property_data),
-        'investment_score': calculate_investment_score(property_data)
+        'basic_info': extract_basic_info(record),
+        'financial_metrics': calculate_financial_metrics(record),
+        'market_analysis': perform_market_analysis(record),
+        'investment_score': calculate_investment_score(record)
     }
     return analysis
 
-def extract_basic_info(data: Dict) -> Dict:
+def extract_basic_info(record: PropertyRecord) -> Dict:
     """Extract basic property information"""
     return {
-        'address': data.get('address', 'N/A'),
-        'city': data.get('city', 'N/A'),
-        'state': data.get('state', 'N/A'),
-        'zip_code': data.get('zipCode', 'N/A'),
-        'property_type': data.get('propertyType', 'N/A'),
-        'bedrooms': data.get('bedrooms', 0),
-        'bathrooms': data.get('bathrooms', 0),
-        'square_feet': data.get('squareFootage', 0),
-        'lot_size': data.get('lotSize', 0),
-        'year_built': data.get('yearBuilt', 'N/A')
+        'address': record.address or 'N/A',
+        'city': record.city or 'N/A',
+        'state': record.state or 'N/A',
+        'zip_code': record.zip_code or 'N/A',
+        'property_type': record.property_type or 'N/A',
+        'bedrooms': record.bedrooms,
+        'bathrooms': record.bathrooms,
+        'square_feet': record.square_feet,
+        'lot_size': record.lot_size,
+        'year_built': record.year_built or 'N/A'
     }
 
-def calculate_financial_metrics(data: Dict) -> Dict:
+def calculate_financial_metrics(record: PropertyRecord) -> Dict:
     """Calculate financial metrics and investment potential"""
-    price = data.get('price', 0) or data.get('lastSalePrice', 0)
-    rent_estimate = data.get('rentEstimate', {}).get('rent', 0) if isinstance(data.get('rentEstimate'), dict) else 0
+    price = record.price
+    rent_estimate = record.rent
     
     if price and rent_estimate:
         monthly_rent = rent_estimate
         annual_rent = monthly_rent * 12
         
         # Calculate key metrics
-        cap_rate = (annual_rent / price) * 100 if price > 0 else 0
+        cap_rate = record.cap_rate
         price_to_rent = price / annual_rent if annual_rent > 0 else 0
-        cash_flow = monthly_rent - (price * 0.004)  # Rough estimate with 4% monthly expenses
+        cash_flow = record.cash_flow  # Rough estimate with 4% monthly expenses
         
         return {
             'price': price,
@@ -67,22 +66,22 @@ def calculate_financial_metrics(data: Dict) -> Dict:
         'roi_estimate': 0
     }
 
-def perform_market_analysis(data: Dict) -> Dict:
+def perform_market_analysis(record: PropertyRecord) -> Dict:
     """Analyze market conditions and comparables"""
     # This would typically involve additional API calls to get comparable properties
     # For now, we'll use available data to provide basic market insights
     
     return {
-        'neighborhood': data.get('neighborhood', 'N/A'),
-        'price_per_sqft': round(data.get('price', 0) / data.get('squareFootage', 1), 2) if data.get('squareFootage') else 0,
-        'market_status': determine_market_status(data),
-        'appreciation_potential': analyze_appreciation_potential(data)
+        'neighborhood': record.neighborhood or 'N/A',
+        'price_per_sqft': record.price_per_sqft,
+        'market_status': determine_market_status(record),
+        'appreciation_potential': analyze_appreciation_potential(record)
     }
 
-def determine_market_status(data: Dict) -> str:
+def determine_market_status(record: PropertyRecord) -> str:
     """Determine market status based on available data"""
     # This is a simplified analysis - in reality, you'd want more market data
-    price_per_sqft = data.get('price', 0) / data.get('squareFootage', 1) if data.get('squareFootage') else 0
+    price_per_sqft = record.price_per_sqft
     
     if price_per_sqft > 200:
         return "Hot Market"
@@ -91,23 +90,25 @@ def determine_market_status(data: Dict) -> str:
     else:
         return "Buyer's Market"
 
-def analyze_appreciation_potential(data: Dict) -> str:
+def property_age(record: PropertyRecord) -> int:
+    """Age in years, assuming 20 when the build year is unknown"""
+    return datetime.datetime.now().year - record.year_built if record.year_built else 20
+
+def analyze_appreciation_potential(record: PropertyRecord) -> str:
     """Analyze appreciation potential"""
-    year_built = data.get('yearBuilt', 2000)
-    current_year = datetime.datetime.now().year
-    property_age = current_year - year_built if isinstance(year_built, int) else 20
+    age = property_age(record)
     
-    if property_age < 10:
+    if age < 10:
         return "High"
-    elif property_age < 30:
+    elif age < 30:
         return "Moderate"
     else:
         return "Low"
 
-def calculate_investment_score(data: Dict) -> Dict:
+def calculate_investment_score(record: PropertyRecord) -> Dict:
     """Calculate overall investment score"""
-    metrics = calculate_financial_metrics(data)
-    market = perform_market_analysis(data)
+    metrics = calculate_financial_metrics(record)
+    market = perform_market_analysis(record)
     
     # Simple scoring algorithm
     score = 0
@@ -154,11 +155,11 @@ def calculate_investment_score(data: Dict) -> Dict:
         factors.append("Moderate appreciation potential")
     
     # Property condition (age-based)
-    property_age = datetime.datetime.now().year - data.get('yearBuilt', 2000) if isinstance(data.get('yearBuilt'), int) else 20
-    if property_age < 10:
+    age = property_age(record)
+    if age < 10:
         score += 15
         factors.append("New property")
-    elif property_age < 30:
+    elif age < 30:
         score += 10
         factors.append("Well-maintained age")
     
@@ -189,120 +190,73 @@ def calculate_investment_score(data: Dict) -> Dict:
         'positive_factors': factors
     }
 
-def display_property_analysis(analysis: Dict, property_data: Dict):
-    """Display comprehensive property analysis"""
-    
-    # Header
-    basic = analysis['basic_info']
-    st.markdown(f"""
-    <div class="property-card">
-        <h3>🏠 {basic['address']}</h3>
-        <p><strong>{basic['city']}, {basic['state']} {basic['zip_code']}</strong></p>
-        <p>{basic['bedrooms']} bed • {basic['bathrooms']} bath • {basic['square_feet']} sq ft • Built {basic['year_built']}</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Investment Score
-    score_data = analysis['investment_score']
-    col1, col2, col3 = st.columns([1, 2, 1])
-    
-    with col2:
-        st.markdown(f"""
-        <div style="text-align: center; padding: 2rem; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                    border-radius: 15px; color: white; margin: 1rem 0;">
-            <h2 style="margin: 0; font-size: 3rem;">{score_data['grade']}</h2>
-            <p style="margin: 0.5rem 0; font-size: 1.2rem;">Investment Score: {score_data['score']}/100</p>
-            <p style="margin: 0; opacity: 0.9;">{score_data['recommendation']}</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    # Financial Metrics
-    st.subheader("💰 Financial Analysis")
-    financial = analysis['financial_metrics']
-    
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("Property Price", f"${financial['price']:,.0f}")
-    with col2:
-        st.metric("Monthly Rent", f"${financial['monthly_rent']:,.0f}")
-    with col3:
-        st.metric("Cap Rate", f"{financial['cap_rate']}%")
-    with col4:
-        st.metric("Cash Flow", f"${financial['estimated_cash_flow']:,.0f}")
-    
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("Annual Rent", f"${financial['annual_rent']:,.0f}")
-    with col2:
-        st.metric("Price/Rent Ratio", f"{financial['price_to_rent_ratio']:.1f}")
-    with col3:
-        st.metric("ROI Estimate", f"{financial['roi_estimate']}%")
-    with col4:
-        st.metric("Price/Sq Ft", f"${analysis['market_analysis']['price_per_sqft']:.0f}")
-    
-    # Market Analysis
-    st.subheader("📊 Market Analysis")
-    market = analysis['market_analysis']
+def summarize_listings(records: Iterable[PropertyRecord]) -> Dict:
+    """Area statistics over a stream of listing records, in one pass.
     
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.info(f"**Neighborhood:** {market['neighborhood']}")
-    with col2:
-        status_color = {"Hot Market": "🔥", "Balanced Market": "⚖️", "Buyer's Market": "💰"}
-        st.info(f"**Market Status:** {status_color.get(market['market_status'], '📈')} {market['market_status']}")
-    with col3:
-        potential_color = {"High": "🚀", "Moderate": "📈", "Low": "📉"}
-        st.info(f"**Appreciation:** {potential_color.get(market['appreciation_potential'], '📊')} {market['appreciation_potential']}")
+    Only running totals are kept, so a ListingStream of any size can be
+    summarized without holding its records.
+    """
+    count = priced = rented = sized = 0
+    price_total = rent_total = ppsf_total = 0.0
+    min_price = max_price = None
+    by_type: Dict[str, int] = {}
     
-    # Positive Factors
-    if score_data['positive_factors']:
-        st.subheader("✅ Positive Investment Factors")
-        factors_text = " • ".join(score_data['positive_factors'])
-        st.success(factors_text)
+    for record in records:
+        count += 1
+        by_type[record.property_type or "Unknown"] = by_type.get(record.property_type or "Unknown", 0) + 1
+        if record.price:
+            priced += 1
+            price_total += record.price
+            min_price = record.price if min_price is None else min(min_price, record.price)
+            max_price = record.price if max_price is None else max(max_price, record.price)
+            if record.square_feet:
+                sized += 1
+                ppsf_total += record.price_per_sqft
+        if record.rent:
+            rented += 1
+            rent_total += record.rent
     
-    # Visualizations
-    create_property_charts(financial, property_data)
+    return {
+        'count': count,
+        'avg_price': price_total / priced if priced else 0,
+        'min_price': min_price or 0,
+        'max_price': max_price or 0,
+        'avg_price_per_sqft': ppsf_total / sized if sized else 0,
+        'avg_rent': rent_total / rented if rented else 0,
+        'by_type': by_type
+    }
 
-def create_property_charts(financial_data: Dict, property_data: Dict):
-    """Create visualizations for property analysis"""
+def calculate_portfolio_metrics(properties: List[Dict]) -> Dict:
+    """Calculate comprehensive portfolio metrics.
     
-    col1, col2 = st.columns(2)
+    Each property dict carries its projected PropertyRecord under 'record'.
+    """
+    total_value = 0
+    total_rent = 0
+    total_cash_flow = 0
+    cap_rates = []
     
-    with col1:
-        # Cash Flow Breakdown
-        if financial_data['monthly_rent'] > 0:
-            estimated_expenses = financial_data['price'] * 0.004 if financial_data['price'] else 0
+    for prop in properties:
+        record = prop['record']
+        
+        if record.price:
+            total_value += record.price
+            total_rent += record.rent
+            
+            # Estimate cash flow (simplified, 0.4% monthly expense ratio)
+            total_cash_flow += record.cash_flow
             
-            fig = go.Figure(data=[
-                go.Bar(
-                    x=['Monthly Income', 'Estimated Expenses', 'Net Cash Flow'],
-                    y=[financial_data['monthly_rent'], estimated_expenses, financial_data['estimated_cash_flow']],
-                    marker_color=['green', 'red', 'blue']
-                )
-            ])
-            fig.update_layout(title="💰 Monthly Cash Flow Breakdown", yaxis_title="Amount ($)")
-            st.plotly_chart(fig, use_container_width=True)
+            # Cap rate
+            if record.rent > 0:
+                cap_rates.append(record.cap_rate)
     
-    with col2:
-        # Investment Metrics Radar
-        metrics = [
-            financial_data['cap_rate'] * 10,  # Scale up for visibility
-            min(financial_data['roi_estimate'], 100),
-            max(0, min(100, (financial_data['estimated_cash_flow'] + 500) / 10)),  # Scale cash flow
-            max(0, min(100, 100 - financial_data['price_to_rent_ratio'] * 2))  # Inverse price/rent ratio
-        ]
-        
-        fig = go.Figure()
-        fig.add_trace(go.Scatterpolar(
-            r=metrics,
-            theta=['Cap Rate', 'ROI', 'Cash Flow', 'Affordability'],
-            fill='toself',
-            name='Property Metrics'
-        ))
-        fig.update_layout(
-            polar=dict(radialaxis=dict(visible=True, range=[0, 100])),
-            title="📊 Investment Metrics Overview",
-            showlegend=False
-        )
-        st.plotly_chart(fig, use_container_width=True)
-
+    return {
+        'total_properties': len(properties),
+        'total_value': total_value,
+        'total_monthly_rent': total_rent,
+        'total_annual_rent': total_rent * 12,
+        'total_cash_flow': total_cash_flow,
+        'avg_cap_rate': sum(cap_rates) / len(cap_rates) if cap_rates else 0,
+        'avg_property_value': total_value / len(properties) if properties else 0,
+        'portfolio_yield': (total_rent * 12 / total_value * 100) if total_value > 0 else 0
+    }
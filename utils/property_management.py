@@ -1,84 +1,182 @@
-import streamlit as st
 from datetime import datetime, timezone
-from typing import Dict, List
+from typing import Dict, List, Union
 import hashlib
-from utils.auth import init_supabase
+from utils.errors import Result, ServiceError
+from utils.supabase_client import init_supabase
+from utils.ttl_cache import ttl_cache
+from utils.address import property_key
+from utils.property_record import PropertyRecord
+from utils.telemetry import track
+from utils.offline import (get_outbox, is_network_error, is_offline, load_snapshot, mark_offline,
+                           queue_write, register_handler, save_snapshot)
 import datetime
 
 # ------------------------
-# Property Management
+# Remote Operations
 # ------------------------
-def save_property(user_id: int, data: Dict, search_params: Dict = None):
-    """Enhanced property saving with search context"""
+# These raise on failure and render nothing, so the offline outbox can replay
+# them when the network is back.
+def _property_hash(data: Dict) -> str:
+    """Deduplication hash from the canonical address of a payload or saved row"""
+    return hashlib.md5(property_key(PropertyRecord.from_payload(data).to_dict()).encode()).hexdigest()
+
+def _legacy_property_hash(data: Dict) -> str:
+    """The hash rows were saved under before hashes used the canonical address"""
+    return hashlib.md5(f"{data.get('address', '')}{data.get('city', '')}{data.get('state', '')}".encode()).hexdigest()
+
+def _upsert_property(user_id: int, property_data: Dict, legacy_hashes: List[str] = None) -> bool:
+    """Insert or update a saved property row. Returns True if it already existed.
+
+    Rows saved under an old-style hash are matched too, when their stored
+    data has the same canonical address, and are re-keyed by the update.
+    """
     supabase = init_supabase()
-    if not supabase:
-        return False
-        
+    property_hash = property_data["property_hash"]
+    hashes = list(dict.fromkeys([property_hash] + list(legacy_hashes or [])))
+    
+    # Check if property already exists
+    with track("supabase", "properties.select"):
+        existing = supabase.table("properties").select("id, property_hash, data").eq(
+            "user_id", user_id
+        ).in_("property_hash", hashes).execute()
+    # Old hashes were built from raw fields and can collide across addresses
+    matches = sorted((row for row in existing.data or []
+                      if row["property_hash"] == property_hash or _property_hash(row.get("data") or {}) == property_hash),
+                     key=lambda row: row["property_hash"] != property_hash)
+    
+    if matches:
+        # Update existing
+        with track("supabase", "properties.update"):
+            supabase.table("properties").update(property_data).eq(
+                "id", matches[0]["id"]
+            ).execute()
+        return True
+    
+    # Insert new
+    with track("supabase", "properties.insert"):
+        supabase.table("properties").insert(property_data).execute()
+    return False
+
+def _delete_property(user_id: int, property_id: int):
+    supabase = init_supabase()
+    with track("supabase", "properties.delete"):
+        supabase.table("properties").delete().eq("id", property_id).eq("user_id", user_id).execute()
+
+register_handler("save_property", _upsert_property)
+register_handler("delete_property", _delete_property)
+
+# ------------------------
+# Local Portfolio Snapshot
+# ------------------------
+def _update_snapshot(user_id: int, update):
+    snapshot = load_snapshot("portfolio", user_id)
+    save_snapshot("portfolio", user_id, update(snapshot[0] if snapshot else []))
+
+def _snapshot_save(user_id: int, property_data: Dict, local_id: str):
+    row = {
+        "id": local_id,
+        "property_hash": property_data["property_hash"],
+        "data": property_data["data"],
+        "created_at": property_data["created_at"],
+        "updated_at": property_data["updated_at"]
+    }
+    _update_snapshot(user_id, lambda rows: [row] + [
+        r for r in rows if r.get("property_hash") != row["property_hash"]
+    ])
+
+def _snapshot_delete(user_id: int, property_id):
+    _update_snapshot(user_id, lambda rows: [r for r in rows if r.get("id") != property_id])
+
+# ------------------------
+# Property Management
+# ------------------------
+def save_property(user_id: int, data: Union[PropertyRecord, Dict], search_params: Dict = None,
+                  keep_raw: bool = False) -> Result[bool]:
+    """Enhanced property saving with search context.
+    
+    Only the projected record is stored; pass ``keep_raw`` to also keep the
+    full RentCast payload, zlib-compressed. While offline the save is queued
+    and applied to the local portfolio copy.
+    """
     try:
-        # Generate a unique hash for deduplication
-        property_hash = hashlib.md5(
-            f"{data.get('address', '')}{data.get('city', '')}{data.get('state', '')}".encode()
-        ).hexdigest()
+        record = data if isinstance(data, PropertyRecord) else PropertyRecord.from_payload(data, keep_raw=keep_raw)
+        stored = record.to_dict(include_raw=keep_raw)
+        
+        # Generate a unique hash for deduplication from the canonical address,
+        # so spelling variants of the same property collapse to one row
+        property_hash = _property_hash(stored)
+        legacy_hashes = list({_legacy_property_hash(stored)} |
+                             ({_legacy_property_hash(data)} if isinstance(data, dict) else set()))
         
         property_data = {
             "user_id": user_id,
             "property_hash": property_hash,
-            "data": data,
+            "data": stored,
             "search_params": search_params or {},
             "created_at": datetime.datetime.utcnow().isoformat(),
             "updated_at": datetime.datetime.utcnow().isoformat()
         }
         
-        # Check if property already exists
-        existing = supabase.table("properties").select("id").eq(
-            "user_id", user_id
-        ).eq("property_hash", property_hash).execute()
-        
-        if existing.data:
-            # Update existing
-            supabase.table("properties").update(property_data).eq(
-                "id", existing.data[0]["id"]
-            ).execute()
-            st.success("🔄 Property updated successfully!")
-        else:
-            # Insert new
-            supabase.table("properties").insert(property_data).execute()
-            st.success("💾 Property saved successfully!")
+        if not is_offline():
+            try:
+                updated = _upsert_property(user_id, property_data, legacy_hashes)
+                _fetch_user_properties.clear(user_id)
+                return Result.success(True, ("success", "🔄 Property updated successfully!" if updated
+                                             else "💾 Property saved successfully!"))
+            except Exception as e:
+                if not is_network_error(e):
+                    raise
+                mark_offline(e)
         
-        return True
+        entry_id = queue_write("save_property", user_id=user_id, property_data=property_data,
+                               legacy_hashes=legacy_hashes)
+        _snapshot_save(user_id, property_data, f"local-{entry_id}")
+        return Result.success(True, ("info", "📴 Saved offline — it will sync when you're back online."))
         
     except Exception as e:
-        st.error(f"Failed to save property: {e}")
-        return False
+        return Result.failure(ServiceError(f"Failed to save property: {e}", "supabase"), False)
 
-@st.cache_data(ttl=300, show_spinner=False)  # Increased cache time to 5 minutes for better performance
-def get_user_properties(user_id: int) -> List[Dict]:
-    """Get user properties with caching"""
+@ttl_cache(ttl=300)  # Increased cache time to 5 minutes for better performance
+def _fetch_user_properties(user_id: int) -> List[Dict]:
     supabase = init_supabase()
-    if not supabase:
-        return []
-        
-    try:
-        result = supabase.table("properties").select("*").eq(
+    with track("supabase", "properties.select"):
+        result = supabase.table("properties").select("id, property_hash, data, created_at, updated_at").eq(
             "user_id", user_id
         ).order("updated_at", desc=True).execute()
-        return result.data
-    except Exception as e:
-        st.error(f"Failed to fetch properties: {e}")
-        return []
+    save_snapshot("portfolio", user_id, result.data)
+    return result.data
 
-def delete_property(user_id: int, property_id: int):
-    """Delete a saved property"""
-    supabase = init_supabase()
-    if not supabase:
-        return False
-        
+def get_user_properties(user_id: int) -> Result[List[Dict]]:
+    """Get user properties with caching; served from the local copy when offline"""
+    if not is_offline():
+        try:
+            # Rows are shared with the cache, so hand out copies for callers to annotate
+            return Result.success([dict(row) for row in _fetch_user_properties(user_id)])
+        except Exception as e:
+            if not is_network_error(e):
+                return Result.failure(ServiceError(f"Failed to fetch properties: {e}", "supabase"), [])
+            mark_offline(e)
+    snapshot = load_snapshot("portfolio", user_id)
+    return Result.success(snapshot[0] if snapshot else [])
+
+def delete_property(user_id: int, property_id: int) -> Result[bool]:
+    """Delete a saved property (queued while offline)"""
     try:
-        supabase.table("properties").delete().eq("id", property_id).eq("user_id", user_id).execute()
-        st.success("🗑️ Property deleted successfully!")
-        st.cache_data.clear()  # Clear cache
-        return True
+        if str(property_id).startswith("local-"):
+            # Saved offline and never synced: just drop the queued save
+            get_outbox().discard(int(str(property_id).split("-", 1)[1]))
+        elif is_offline():
+            queue_write("delete_property", user_id=user_id, property_id=property_id)
+        else:
+            try:
+                _delete_property(user_id, property_id)
+            except Exception as e:
+                if not is_network_error(e):
+                    raise
+                mark_offline(e)
+                queue_write("delete_property", user_id=user_id, property_id=property_id)
+        _snapshot_delete(user_id, property_id)
+        _fetch_user_properties.clear(user_id)  # Clear cache
+        return Result.success(True, ("success", "🗑️ Property deleted successfully!"))
     except Exception as e:
-        st.error(f"Failed to delete property: {e}")
-        return False
-
+        return Result.failure(ServiceError(f"Failed to delete property: {e}", "supabase"), False)
@@ -0,0 +1,138 @@
+import base64
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from utils.serialization import dumps_bytes, loads
+
+# ------------------------
+# Compact Property Record
+# ------------------------
+# Stored/serialized field name for each attribute. The names follow RentCast's
+# so saved rows written before records existed parse the same way.
+FIELD_KEYS = {
+    "address": "address",
+    "city": "city",
+    "state": "state",
+    "zip_code": "zipCode",
+    "property_type": "propertyType",
+    "bedrooms": "bedrooms",
+    "bathrooms": "bathrooms",
+    "square_feet": "squareFootage",
+    "lot_size": "lotSize",
+    "year_built": "yearBuilt",
+    "price": "price",
+    "rent": "rent",
+    "value_estimate": "valueEstimate",
+    "neighborhood": "neighborhood",
+    "last_sale_date": "lastSaleDate",
+}
+RAW_KEY = "rawPayload"
+
+
+def _first(payload: Any) -> Dict:
+    """Unwrap a /properties response (list or {"properties": [...]}) to one record"""
+    if isinstance(payload, list):
+        payload = payload[0] if payload else {}
+    if isinstance(payload, dict) and isinstance(payload.get("properties"), list):
+        payload = payload["properties"][0] if payload["properties"] else {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, dict):
+        value = value.get("rent") or value.get("value") or value.get("price")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(value) if value is not None else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+@dataclass(slots=True)
+class PropertyRecord:
+    """The fields the analysis and portfolio code read, projected from a
+    RentCast property payload. Optionally keeps the full payload zlib-compressed."""
+    address: str = ""
+    city: str = ""
+    state: str = ""
+    zip_code: str = ""
+    property_type: str = ""
+    bedrooms: float = 0
+    bathrooms: float = 0
+    square_feet: float = 0
+    lot_size: float = 0
+    year_built: Optional[int] = None
+    price: float = 0
+    rent: float = 0
+    value_estimate: float = 0
+    neighborhood: str = ""
+    last_sale_date: str = ""
+    raw: Optional[bytes] = None
+
+    @classmethod
+    def from_payload(cls, payload: Any, keep_raw: bool = False) -> "PropertyRecord":
+        """Build a record from a RentCast response, a single property, or a saved row's data"""
+        if isinstance(payload, PropertyRecord):
+            return payload
+        prop = _first(payload)
+        nested = prop.get("address") if isinstance(prop.get("address"), dict) else {}
+
+        address = prop.get("formattedAddress") or prop.get("addressLine1") or ""
+        if address and prop.get("addressLine2") and not prop.get("formattedAddress"):
+            address = f"{address} {prop['addressLine2']}"
+        if not address:
+            address = (" ".join(filter(None, [nested.get("line1"), nested.get("line2")])) if nested
+                       else prop.get("address") or "")
+
+        year_built = prop.get("yearBuilt")
+        raw = prop.get(RAW_KEY)
+        if raw:
+            raw = base64.b64decode(raw)
+        elif keep_raw:
+            raw = zlib.compress(dumps_bytes(payload))
+
+        return cls(
+            address=address,
+            city=prop.get("city") or nested.get("city") or "",
+            state=prop.get("state") or nested.get("state") or "",
+            zip_code=str(prop.get("zipCode") or nested.get("zipCode") or ""),
+            property_type=prop.get("propertyType") or "",
+            bedrooms=_number(prop.get("bedrooms")),
+            bathrooms=_number(prop.get("bathrooms")),
+            square_feet=_number(prop.get("squareFootage")),
+            lot_size=_number(prop.get("lotSize")),
+            year_built=year_built if isinstance(year_built, int) else None,
+            price=_number(prop.get("price")) or _number(prop.get("lastSalePrice")),
+            rent=_number(prop.get("rent")) or _number(prop.get("rentEstimate")),
+            value_estimate=_number(prop.get("valueEstimate")),
+            neighborhood=prop.get("neighborhood") or "",
+            last_sale_date=prop.get("lastSaleDate") or "",
+            raw=raw or None,
+        )
+
+    def to_dict(self, include_raw: bool = False) -> Dict:
+        """Compact dict for storage; empty fields are left out"""
+        data = {key: getattr(self, attr) for attr, key in FIELD_KEYS.items()
+                if getattr(self, attr) not in (None, "", 0)}
+        if include_raw and self.raw:
+            data[RAW_KEY] = base64.b64encode(self.raw).decode()
+        return data
+
+    def raw_payload(self) -> Optional[Any]:
+        """The original RentCast payload, if it was kept"""
+        return loads(zlib.decompress(self.raw)) if self.raw else None
+
+    @property
+    def price_per_sqft(self) -> float:
+        return round(self.price / self.square_feet, 2) if self.square_feet else 0
+
+    @property
+    def cap_rate(self) -> float:
+        return (self.rent * 12 / self.price) * 100 if self.price else 0
+
+    @property
+    def cash_flow(self) -> float:
+        """Monthly cash flow with the simplified 0.4%-of-price monthly expense"""
+        return self.rent - self.price * 0.004 if self.price else 0
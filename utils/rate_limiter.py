@@ -0,0 +1,184 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+# ------------------------
+# Token-bucket Rate Limiting
+# ------------------------
+WAIT_BUCKETS_MS = (0, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller would have to queue longer than its max wait."""
+
+    def __init__(self, name: str, wait: float):
+        super().__init__(f"Rate limit for {name} would require waiting {wait:.1f}s")
+        self.wait = wait
+
+
+class _WaitStats:
+    """Wait-time counters and a coarse histogram, shared by both backends"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.queued = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.histogram = {bound: 0 for bound in WAIT_BUCKETS_MS}
+        self.histogram["+Inf"] = 0
+
+    def record(self, wait: float):
+        wait_ms = wait * 1000
+        with self._lock:
+            self.acquired += 1
+            if wait > 0:
+                self.queued += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            bucket = next((bound for bound in WAIT_BUCKETS_MS if wait_ms <= bound), "+Inf")
+            self.histogram[bucket] += 1
+
+    def timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "acquired": self.acquired,
+                "queued": self.queued,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 1) if self.acquired else 0,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+                "wait_histogram_ms": dict(self.histogram)
+            }
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every session in the process.
+
+    Callers reserve a token and sleep until it is due, so requests queue in
+    arrival order instead of failing. A caller that would wait longer than
+    ``max_wait`` gets RateLimitTimeout and nothing is reserved.
+    """
+
+    backend = "memory"
+
+    def __init__(self, name: str, rate: float, capacity: float, max_wait: float = 5.0):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.max_wait = max_wait
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = _WaitStats()
+
+    def _reserve(self, tokens: float, max_wait: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (tokens - self._tokens) / self.rate)
+            if wait > max_wait:
+                return -wait
+            # Going negative reserves the future token for this caller
+            self._tokens -= tokens
+            return wait
+
+    def acquire(self, tokens: float = 1, max_wait: Optional[float] = None) -> float:
+        """Take ``tokens``, sleeping until they are available. Returns seconds waited."""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        wait = self._reserve(tokens, max_wait)
+        if wait < 0:
+            self._stats.timeout()
+            raise RateLimitTimeout(self.name, -wait)
+        if wait:
+            time.sleep(wait)
+        self._stats.record(wait)
+        return wait
+
+    def stats(self) -> Dict:
+        stats = self._stats.snapshot()
+        stats.update({"name": self.name, "backend": self.backend, "rate": self.rate, "capacity": self.capacity})
+        return stats
+
+
+class SqliteTokenBucket(TokenBucket):
+    """Token bucket whose state lives in a SQLite file, so several app
+    processes on one host share a single budget."""
+
+    backend = "sqlite"
+
+    def __init__(self, name: str, rate: float, capacity: float, max_wait: float = 5.0,
+                 path: Optional[Path] = None):
+        super().__init__(name, rate, capacity, max_wait)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets "
+            "(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+            (name, capacity, time.time())
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _reserve(self, tokens: float, max_wait: float) -> float:
+        conn = self._connection()
+        # BEGIN IMMEDIATE takes the write lock up front, serializing processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current, updated = conn.execute(
+                "SELECT tokens, updated FROM token_buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            now = time.time()
+            current = min(self.capacity, current + max(0.0, now - updated) * self.rate)
+            wait = max(0.0, (tokens - current) / self.rate)
+            if wait > max_wait:
+                conn.execute("COMMIT")
+                return -wait
+            conn.execute("UPDATE token_buckets SET tokens = ?, updated = ? WHERE name = ?",
+                         (current - tokens, now, self.name))
+            conn.execute("COMMIT")
+            return wait
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+# ------------------------
+# Process-wide Registry
+# ------------------------
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str, rate: float, capacity: float, max_wait: float = 5.0,
+                backend: str = "memory", path: Optional[Path] = None) -> TokenBucket:
+    """Return the shared limiter for ``name``, creating it on first use"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                if backend == "sqlite":
+                    limiter = SqliteTokenBucket(name, rate, capacity, max_wait, path=path)
+                else:
+                    limiter = TokenBucket(name, rate, capacity, max_wait)
+                _limiters[name] = limiter
+    return limiter
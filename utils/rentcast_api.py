@@ -2,76 +2,487 @@
 # utils/rentcast_api.py
 # =====================================================
 
-import streamlit as st
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 import requests
-from utils.database import get_user_usage, increment_usage
+from utils.http_client import get_client
+from utils.api_cache import CACHE_PATH, get_api_cache
+from utils.address import canonical_key, get_address_index, normalize_address, suggest_address_fixes
+from utils.singleflight import SingleFlight
+from utils.rate_limiter import RateLimitTimeout, get_limiter
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.serialization import PayloadError, decode_response
+from utils.telemetry import get_registry
+from utils.offline import is_offline
+from utils.config import get_app_config
+from utils.errors import ConfigError, QuotaExceededError, Result, ServiceError
 
-# RentCast API configuration
-RENTCAST_API_KEY = st.secrets["rentcast"]["api_key"]
-RENTCAST_BASE_URL = "https://api.rentcast.io/v1"
+# RentCast API configuration. Nothing here touches Streamlit, so the lookup
+# helpers also run in workers and headless tools (see cache_cli.py); the key
+# is read from the app config (RENTCAST_API_KEY or secrets.toml) on first use.
+# Point at tools/rentcast_stub.py (e.g. http://127.0.0.1:8787/v1) to load-test offline
+RENTCAST_BASE_URL = os.environ.get("RENTCAST_BASE_URL", "https://api.rentcast.io/v1")
 MAX_QUERIES = 30
 
+# Connection pool shared by every Streamlit session in this process
+RENTCAST_POOL_SIZE = 20
+RENTCAST_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+RENTCAST_MAX_RETRIES = 2
+
+# Outbound rate limit shared by all sessions. Use the sqlite backend when
+# several app processes run on one host so they draw from one budget.
+RENTCAST_RATE_LIMIT = float(os.environ.get("RENTCAST_RATE_LIMIT", "5"))     # requests/second
+RENTCAST_RATE_BURST = float(os.environ.get("RENTCAST_RATE_BURST", "10"))
+RENTCAST_RATE_MAX_WAIT = float(os.environ.get("RENTCAST_RATE_MAX_WAIT", "5"))  # seconds to queue
+RENTCAST_RATE_BACKEND = os.environ.get("RENTCAST_RATE_LIMIT_BACKEND", "memory")
+
+# Circuit breaker: open after N consecutive failures or calls slower than the
+# latency budget; while open, searches are served from the stale cache.
+RENTCAST_BREAKER_FAILURES = int(os.environ.get("RENTCAST_BREAKER_FAILURES", "5"))
+RENTCAST_BREAKER_RECOVERY = float(os.environ.get("RENTCAST_BREAKER_RECOVERY", "30"))  # seconds open
+RENTCAST_LATENCY_BUDGET = float(os.environ.get("RENTCAST_LATENCY_BUDGET", "4"))       # seconds
+
+# How concurrent identical requests that share one upstream call are charged:
+#   "leader" - only the caller whose request actually went upstream
+#   "each"   - every caller, as if each had made the call itself
+COALESCED_CHARGE_POLICY = os.environ.get("RENTCAST_COALESCED_CHARGE", "leader")
+
+# Addresses RentCast cannot resolve (empty /properties results or these
+# statuses) are remembered briefly so retries are answered without a call
+NEGATIVE_CACHE_TTL = float(os.environ.get("RENTCAST_NEGATIVE_TTL", "3600"))  # seconds
+NEGATIVE_STATUSES = {400, 404}
+
+# Response cache TTLs per endpoint (seconds)
+CACHE_TTLS = {
+    "properties": 7 * 24 * 3600,  # property records change rarely
+    "markets": 24 * 3600,         # market statistics refresh daily
+    "markets_zip": 24 * 3600      # shared per-ZIP market statistics
+}
+
+
+def get_rentcast_limiter():
+    """Return the token bucket shared by all outbound RentCast traffic."""
+    return get_limiter(
+        "rentcast",
+        rate=RENTCAST_RATE_LIMIT,
+        capacity=RENTCAST_RATE_BURST,
+        max_wait=RENTCAST_RATE_MAX_WAIT,
+        backend=RENTCAST_RATE_BACKEND,
+        path=CACHE_PATH.parent / "rate_limit.sqlite3"
+    )
+
+
+def get_rentcast_client():
+    """Return the process-wide pooled HTTP client for RentCast."""
+    return get_client(
+        "rentcast",
+        pool_size=RENTCAST_POOL_SIZE,
+        timeout=RENTCAST_TIMEOUT,
+        max_retries=RENTCAST_MAX_RETRIES,
+        limiter=get_rentcast_limiter()
+    )
+
+
+def get_rentcast_api_key():
+    """RentCast API key from the app config."""
+    try:
+        return get_app_config().require("rentcast_key").rentcast_key
+    except ConfigError as e:
+        raise RentCastError(f"RentCast API key is not configured. {e}") from e
+
+
+def _rentcast_get(path, params):
+    """Issue a GET against the RentCast API through the pooled client."""
+    headers = {
+        "accept": "application/json",
+        "X-Api-Key": get_rentcast_api_key()
+    }
+    return get_rentcast_client().get(f"{RENTCAST_BASE_URL}{path}", headers=headers, params=params)
+
+
+def get_rentcast_pool_stats():
+    """Connection pool statistics for the RentCast client."""
+    return get_rentcast_client().stats()
+
+
+def get_rate_limit_stats():
+    """Queueing and wait-time statistics for the RentCast rate limiter."""
+    return get_rentcast_limiter().stats()
+
 
 def check_query_limit(user_id, email):
     """
     Check if user has exceeded query limit.
     Returns True if under limit, False if limit reached.
     """
+    from utils.database import get_user_usage
+
     usage = get_user_usage(user_id, email)
     return usage < MAX_QUERIES
 
 
-def fetch_property_details(address, user_id, email):
+def cache_key(address):
+    """Canonical address key used by the response cache, so spelling variants
+    of the same address share one entry."""
+    return canonical_key(address)
+
+
+def get_cache_stats():
+    """Hit/miss counters and sizes of the RentCast response cache."""
+    return get_api_cache().stats()
+
+
+class RentCastError(ServiceError):
+    """Raised when a RentCast request fails or returns a non-200 status."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message, "rentcast", status_code)
+
+
+class RentCastNotFound(RentCastError):
+    """RentCast has no data for the address; ``suggestions`` hold fixes to try."""
+
+    def __init__(self, endpoint, address, status_code=None, cached=False):
+        message = ("No property found for this address." if endpoint == "properties"
+                   else "No market data found for this location.")
+        super().__init__(message, status_code)
+        self.suggestions = suggest_address_fixes(address)
+        self.cached = cached
+
+
+def _negative_key(namespace, key):
+    return f"{namespace}|{key}"
+
+
+def _remember_not_found(namespace, key, status_code):
+    get_api_cache().set("negative", _negative_key(namespace, key),
+                        {"status_code": status_code}, NEGATIVE_CACHE_TTL)
+
+
+def get_not_found(endpoint, address):
     """
-    Fetch property details from RentCast API.
-    Returns JSON data if successful, None if error or limit reached.
+    RentCastNotFound for an address that recently came back empty or with a
+    client error, or None. Never calls the API.
     """
-    if not check_query_limit(user_id, email):
-        st.error("You have reached your 30 API query limit.")
+    namespace, key, _, _ = _lookup_spec(endpoint, address)
+    entry = get_api_cache().get("negative", _negative_key(namespace, key))
+    if entry is None:
         return None
+    return RentCastNotFound(endpoint, address, entry.get("status_code"), cached=True)
 
-    headers = {
-        "accept": "application/json",
-        "X-Api-Key": RENTCAST_API_KEY
-    }
-    params = {"address": address}
 
+def _property_zip(payload):
+    prop = first_property(payload) or {}
+    address = prop.get("address") if isinstance(prop.get("address"), dict) else {}
+    return prop.get("zipCode") or address.get("zipCode")
+
+
+def resolve_zip(address):
+    """
+    ZIP code for an address without calling the API: from the address
+    itself, the address index, or a cached /properties response.
+    """
+    normalized = normalize_address(address)
+    if normalized.zip_code:
+        return normalized.zip_code
+    cached = get_api_cache().get_stale("properties", normalized.key)
+    zip_code = _property_zip(cached[0]) if cached else None
+    if zip_code:
+        get_address_index().remember_zip(normalized.key, zip_code)
+    return zip_code
+
+
+def _lookup_spec(endpoint, address):
+    """
+    Cache namespace, cache key, API path and query params for a lookup.
+    Market statistics are per ZIP code, so market lookups whose ZIP is known
+    are cached once per ZIP and shared by every address and user in it.
+    """
+    if endpoint == "markets":
+        zip_code = resolve_zip(address)
+        if zip_code:
+            return "markets_zip", zip_code, "/markets", {"zipCode": zip_code}
+    return endpoint, cache_key(address), f"/{endpoint}", {"address": address}
+
+
+def get_cached(endpoint, address):
+    """Return the cached response for an address, or None. Never calls the API."""
+    namespace, key, _, _ = _lookup_spec(endpoint, address)
+    return get_api_cache().get(namespace, key)
+
+
+def rentcast_request(path, params):
+    """
+    GET a RentCast path through the breaker, rate limiter and pooled client.
+    Returns the response whatever its status; raises RentCastError when the
+    call could not be made. Safe to run in worker threads.
+    """
+    try:
+        _breaker.before_call()
+    except CircuitOpenError as e:
+        raise RentCastError(str(e)) from e
+
+    started = time.monotonic()
     try:
-        response = requests.get(f"{RENTCAST_BASE_URL}/properties", headers=headers, params=params)
-        if response.status_code == 200:
-            increment_usage(user_id, email)
-            return response.json()
-        else:
-            st.error(f"Error fetching data from RentCast API. Status code: {response.status_code}")
-            return None
+        response = _rentcast_get(path, params)
+    except RateLimitTimeout as e:
+        _breaker.cancel_call()
+        raise RentCastError("RentCast is busy right now. Please try again in a few seconds.") from e
     except requests.RequestException as e:
-        st.error(f"Network error: {e}")
-        return None
+        # A RentCast outage is the breaker's business; only Supabase and
+        # WooCommerce failures take the whole process offline
+        _breaker.record_failure()
+        raise RentCastError(f"Network error: {e}") from e
+    except Exception:
+        # Whatever else went wrong, a half-open trial must not stay claimed
+        _breaker.record_failure()
+        raise
 
+    # 4xx answers mean RentCast is up; only throttling and server errors trip the breaker
+    if response.status_code == 429 or response.status_code >= 500:
+        _breaker.record_failure()
+    else:
+        _breaker.record_success(time.monotonic() - started)
+    return response
 
-def get_market_data(address, user_id, email):
+
+def fetch_upstream(endpoint, address):
     """
-    Fetch market data from RentCast API.
-    Returns JSON data if successful, None if error or limit reached.
+    Call a RentCast endpoint and store the response in the cache.
+    Does not touch Streamlit or the user's quota, so it is safe to run in
+    worker threads. Raises RentCastError on failure.
     """
-    if not check_query_limit(user_id, email):
-        st.error("You have reached your 30 API query limit.")
-        return None
+    namespace, key, path, params = _lookup_spec(endpoint, address)
+    response = rentcast_request(path, params)
 
-    headers = {
-        "accept": "application/json",
-        "X-Api-Key": RENTCAST_API_KEY
-    }
-    params = {"address": address}
+    if response.status_code in NEGATIVE_STATUSES:
+        _remember_not_found(namespace, key, response.status_code)
+        raise RentCastNotFound(endpoint, address, response.status_code)
+    if response.status_code != 200:
+        raise RentCastError(f"Status code: {response.status_code}", response.status_code)
 
     try:
-        response = requests.get(f"{RENTCAST_BASE_URL}/markets", headers=headers, params=params)
-        if response.status_code == 200:
-            increment_usage(user_id, email)
-            return response.json()
-        else:
-            st.error(f"Error fetching market data. Status code: {response.status_code}")
-            return None
-    except requests.RequestException as e:
-        st.error(f"Network error: {e}")
-        return None
+        data = decode_response(response, expect=(list, dict))
+    except PayloadError as e:
+        raise RentCastError(f"Invalid response from RentCast: {e}") from e
+    if endpoint == "properties" and first_property(data) is None:
+        _remember_not_found(namespace, key, None)
+        raise RentCastNotFound(endpoint, address)
+    get_api_cache().set(namespace, key, data, CACHE_TTLS[namespace])
+    if endpoint == "properties":
+        # Learn the ZIP so later market lookups for this address hit the ZIP cache
+        get_address_index().remember_zip(key, _property_zip(data))
+    return data
+
+
+_inflight = SingleFlight()
+_breaker = CircuitBreaker(
+    "RentCast",
+    failure_threshold=RENTCAST_BREAKER_FAILURES,
+    recovery_timeout=RENTCAST_BREAKER_RECOVERY,
+    latency_budget=RENTCAST_LATENCY_BUDGET
+)
+
+
+def fetch_coalesced(endpoint, address, check_negative=True):
+    """
+    fetch_upstream with single-flight coalescing: concurrent requests for the
+    same endpoint and canonical address share one upstream call.
+    Returns (data, chargeable) where chargeable follows COALESCED_CHARGE_POLICY.
+    Raises RentCastError on failure.
+    """
+    not_found = get_not_found(endpoint, address) if check_negative else None
+    if not_found is not None:
+        raise not_found
+    namespace, key, _, _ = _lookup_spec(endpoint, address)
+    data, shared = _inflight.do(
+        (namespace, key),
+        lambda: fetch_upstream(endpoint, address)
+    )
+    return data, (not shared) or COALESCED_CHARGE_POLICY == "each"
+
+
+def get_coalescing_stats():
+    """How many RentCast requests were served by another caller's in-flight call."""
+    return _inflight.stats()
+
+
+# ------------------------
+# Stale-while-revalidate
+# ------------------------
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rentcast-refresh")
+_refresh_pending = set()
+_refresh_lock = threading.Lock()
+_refresher = None
+_refresh_errors = {"count": 0, "last_error": ""}
+
+
+def _refresh_loop():
+    """Re-fetch addresses that were served stale once the breaker lets calls through."""
+    while True:
+        time.sleep(1)
+        if _breaker.retry_in() is not None:
+            continue
+        with _refresh_lock:
+            if not _refresh_pending:
+                continue
+            endpoint, address = _refresh_pending.pop()
+        try:
+            fetch_coalesced(endpoint, address)
+        except RentCastNotFound:
+            continue
+        except RentCastError as e:
+            # Retry outages later; a 4xx means the request itself is bad
+            if e.status_code is None or e.status_code == 429 or e.status_code >= 500:
+                with _refresh_lock:
+                    _refresh_pending.add((endpoint, address))
+        except Exception as e:
+            # Anything else drops this entry but must not end the refresher
+            with _refresh_lock:
+                _refresh_errors["count"] += 1
+                _refresh_errors["last_error"] = f"{type(e).__name__}: {e}"
+
+
+def schedule_refresh(endpoint, address):
+    """Queue a background refresh of a stale cache entry."""
+    global _refresher
+    with _refresh_lock:
+        _refresh_pending.add((endpoint, address))
+        # Started on first use, and again if the previous thread died
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=_refresh_loop, name="rentcast-stale-refresh", daemon=True)
+            _refresher.start()
+
+
+def fetch_resilient(endpoint, address):
+    """
+    fetch_coalesced that falls back to the last cached response when RentCast
+    is failing, slow or the circuit breaker is open.
+
+    If an expired entry exists, the fresh call gets at most
+    RENTCAST_LATENCY_BUDGET seconds; after that the stale entry is returned
+    and the call finishes in the background to refresh the cache. That call
+    is still billed by RentCast, so it is chargeable.
+    Returns (data, chargeable, stale_since) where stale_since is the epoch
+    time the stale data was stored, or None for fresh data.
+    Raises RentCastError when there is nothing cached to fall back on, and
+    RentCastNotFound straight away for addresses known to be unresolvable.
+    """
+    not_found = get_not_found(endpoint, address)
+    if not_found is not None:
+        raise not_found
+    namespace, key, _, _ = _lookup_spec(endpoint, address)
+    stale = get_api_cache().get_stale(namespace, key)
+    if is_offline():
+        # Offline mode answers from whatever this device has, at any age
+        if stale is None:
+            raise RentCastError("You're offline and this address hasn't been looked up on this device yet.")
+        return stale[0], False, stale[1]
+    if stale is None:
+        data, chargeable = fetch_coalesced(endpoint, address, check_negative=False)
+        return data, chargeable, None
+
+    future = _refresh_executor.submit(fetch_coalesced, endpoint, address, False)
+    try:
+        data, chargeable = future.result(timeout=RENTCAST_LATENCY_BUDGET)
+        return data, chargeable, None
+    except FutureTimeout:
+        # The in-flight call keeps running and refreshes the cache when it lands
+        return stale[0], True, stale[1]
+    except RentCastError:
+        schedule_refresh(endpoint, address)
+        return stale[0], False, stale[1]
+
+
+def get_breaker_stats():
+    """Circuit breaker state and counters for the RentCast API."""
+    stats = _breaker.stats()
+    with _refresh_lock:
+        stats["pending_refreshes"] = len(_refresh_pending)
+        stats["refresh_errors"] = _refresh_errors["count"]
+        stats["last_refresh_error"] = _refresh_errors["last_error"]
+    return stats
+
+
+def _collect_metrics():
+    """Gauges from the RentCast component stats, evaluated at scrape time."""
+    breaker = get_breaker_stats()
+    yield "rentcast_breaker_open", "1 while the RentCast circuit breaker is open", {}, breaker["state"] == "open"
+    yield "rentcast_breaker_rejected", "Calls short-circuited by the breaker", {}, breaker["rejected"]
+    yield "rentcast_pending_refreshes", "Stale entries waiting for a refresh", {}, breaker["pending_refreshes"]
+
+    pool = get_rentcast_pool_stats()
+    yield "http_pool_connections_opened", "Connections opened by a pooled client", {"client": "rentcast"}, pool["connections_opened"]
+    yield "http_pool_idle_connections", "Idle keep-alive connections", {"client": "rentcast"}, pool["idle_connections"]
+
+    limiter = get_rate_limit_stats()
+    yield "rate_limit_queued", "Calls that waited for a rate-limit token", {"limiter": "rentcast"}, limiter["queued"]
+    yield "rate_limit_timeouts", "Calls rejected after exceeding the max wait", {"limiter": "rentcast"}, limiter["timeouts"]
+
+    yield "rentcast_coalesced_requests", "Requests served by another caller's in-flight call", {}, \
+        get_coalescing_stats()["coalesced"]
+
+    for namespace, counts in get_cache_stats().items():
+        yield "cache_entries", "Entries in the response cache", {"namespace": namespace}, counts["entries"]
+        yield "cache_bytes", "Bytes stored in the response cache", {"namespace": namespace}, counts["bytes"]
+
+
+get_registry().register_collector(_collect_metrics)
+
+
+def first_property(payload):
+    """Return the first property record from a /properties response, or None."""
+    if isinstance(payload, list):
+        return payload[0] if payload else None
+    if isinstance(payload, dict):
+        properties = payload.get("properties")
+        if isinstance(properties, list):
+            return properties[0] if properties else None
+        return payload or None
+    return None
+
+
+def lookup(endpoint, address, user_id, email, error_message="RentCast request failed."):
+    """
+    Serve a RentCast endpoint from the response cache, falling back to the API.
+    Cache hits do not count against the user's query limit. Upstream calls
+    charge one query atomically before the call and give it back if the call
+    fails or is answered without a chargeable request. Returns a Result whose
+    error is a RentCastError (RentCastNotFound for unresolvable addresses) or
+    QuotaExceededError.
+    """
+    from utils.database import consume_quota, refund_quota
+
+    cached = get_cached(endpoint, address)
+    if cached is not None:
+        return Result.success(cached)
+
+    chargeable = False
+    charged = False
+    try:
+        # Known-bad addresses are answered before the quota check, for free
+        not_found = get_not_found(endpoint, address)
+        if not_found is not None:
+            raise not_found
+        if not is_offline():
+            # Only a call that was actually metered may be refunded below
+            allowed, _, charged = consume_quota(user_id, email, 1, MAX_QUERIES)
+            if not allowed:
+                return Result.failure(QuotaExceededError(f"You have reached your {MAX_QUERIES} API query limit."))
+        data, chargeable, stale_since = fetch_resilient(endpoint, address)
+    except RentCastError as e:
+        if isinstance(e, RentCastNotFound) or e.status_code is None:
+            return Result.failure(e)
+        return Result.failure(RentCastError(f"{error_message} Status code: {e.status_code}", e.status_code))
+    finally:
+        if charged and not chargeable:
+            refund_quota(user_id, email)
+
+    result = Result.success(data)
+    if stale_since is not None:
+        result.notify("warning", f"{'You are offline' if is_offline() else 'RentCast is unavailable'}. "
+                                 f"Showing cached data from "
+                                 f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(stale_since))}.")
+    return result
@@ -0,0 +1,199 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from utils.api_cache import get_api_cache
+from utils.database import QuotaReservation
+from utils.offline import is_offline
+from utils.property_record import PropertyRecord
+from utils.rentcast_api import MAX_QUERIES, RentCastError, rentcast_request
+from utils.serialization import PayloadError, decode_response, dumps
+
+# ------------------------
+# Listings Configuration
+# ------------------------
+LISTING_PATHS = {
+    "sale": "/listings/sale",
+    "rental": "/listings/rental/long-term",
+}
+LISTINGS_PAGE_SIZE = int(os.environ.get("RENTCAST_LISTINGS_PAGE_SIZE", "500"))  # RentCast's maximum
+LISTINGS_PREFETCH = int(os.environ.get("RENTCAST_LISTINGS_PREFETCH", "2"))      # pages fetched ahead
+LISTINGS_CACHE_TTL = 6 * 3600  # listings turn over daily; pages are reused within a session
+
+
+@dataclass(frozen=True)
+class ListingQuery:
+    """An area search over RentCast sale or rental listings.
+
+    Search by ``city``/``state``, ``zip_code``, or a ``radius`` in miles around
+    ``address`` or ``latitude``/``longitude``.
+    """
+    kind: str = "sale"
+    city: Optional[str] = None
+    state: Optional[str] = None
+    zip_code: Optional[str] = None
+    address: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    radius: Optional[float] = None
+    property_type: Optional[str] = None
+    bedrooms: Optional[int] = None
+    status: str = "Active"
+
+    def params(self) -> Dict[str, object]:
+        if self.kind not in LISTING_PATHS:
+            raise ValueError(f"Unknown listing kind: {self.kind}")
+        names = {"zip_code": "zipCode", "property_type": "propertyType"}
+        return {names.get(k, k): v for k, v in asdict(self).items()
+                if k != "kind" and v not in (None, "")}
+
+
+# ------------------------
+# Page Fetching
+# ------------------------
+def _page_key(query: ListingQuery, offset: int, limit: int) -> str:
+    return dumps([query.kind, sorted(query.params().items()), offset, limit])
+
+
+def fetch_listings_page(query: ListingQuery, offset: int, limit: int, count_total: bool = False,
+                        quota: Optional[QuotaReservation] = None) -> Tuple[List[Dict], Optional[int], bool]:
+    """One page of listings as (items, total, from_cache).
+
+    ``total`` is the result count RentCast reports when ``count_total`` is
+    set (None otherwise or when unknown). Pages are cached, so walking the
+    same search again is free. An uncached page takes one unit from
+    ``quota`` first. Raises RentCastError on failure or once ``quota`` runs out.
+    """
+    key = _page_key(query, offset, limit)
+    cached = get_api_cache().get("listings", key)
+    if cached is not None:
+        return cached["items"], cached.get("total"), True
+    if is_offline():
+        raise RentCastError("You're offline and this search hasn't been run on this device yet.")
+    if quota is not None and not quota.take():
+        raise RentCastError(f"You have reached your {MAX_QUERIES} API query limit.")
+
+    params = dict(query.params(), limit=limit, offset=offset)
+    if count_total:
+        params["includeTotalCount"] = "true"
+    try:
+        response = rentcast_request(LISTING_PATHS[query.kind], params)
+        if response.status_code != 200:
+            raise RentCastError(f"Status code: {response.status_code}", response.status_code)
+    except RentCastError:
+        if quota is not None:
+            quota.give_back()
+        raise
+    try:
+        items = decode_response(response, expect=list)
+    except PayloadError as e:
+        raise RentCastError(f"Invalid response from RentCast: {e}") from e
+
+    total = response.headers.get("X-Total-Count")
+    total = int(total) if total and total.isdigit() else None
+    get_api_cache().set("listings", key, {"items": items, "total": total}, LISTINGS_CACHE_TTL)
+    return items, total, False
+
+
+def listing_record(listing: Dict, kind: str) -> PropertyRecord:
+    """Project a listing; a rental listing's asking price is its monthly rent"""
+    record = PropertyRecord.from_payload(listing)
+    if kind == "rental":
+        record.rent, record.price = record.price, 0
+    return record
+
+
+# ------------------------
+# Streaming Iteration
+# ------------------------
+class ListingStream:
+    """Lazily walks every page of a listing search and yields PropertyRecords.
+
+    Up to ``prefetch`` pages are requested ahead of the consumer, and a new
+    page is only requested when the consumer takes one, so at most
+    ``prefetch + 1`` pages are held at a time however large the search is.
+    The first page asks RentCast for the total count, so no page past the
+    end is requested. Each upstream page takes a unit from ``quota`` when
+    one is given. After iterating, ``fetched`` is the number of upstream
+    calls made (to charge against quota) and ``cached`` the pages reused.
+    """
+
+    def __init__(self, query: ListingQuery, page_size: int = LISTINGS_PAGE_SIZE,
+                 prefetch: int = LISTINGS_PREFETCH, max_results: Optional[int] = None,
+                 quota: Optional[QuotaReservation] = None):
+        self.query = query
+        self.quota = quota
+        self.page_size = max(1, min(page_size, 500))
+        self.prefetch = max(1, prefetch)
+        self.max_results = max_results
+        self.total: Optional[int] = None
+        self.pages = 0
+        self.fetched = 0
+        self.cached = 0
+        self.yielded = 0
+        self._lock = threading.Lock()
+
+    def _page(self, offset: int, count_total: bool = False) -> List[Dict]:
+        items, total, from_cache = fetch_listings_page(self.query, offset, self.page_size, count_total,
+                                                       self.quota)
+        with self._lock:
+            if count_total:
+                self.total = total
+            self.pages += 1
+            if from_cache:
+                self.cached += 1
+            else:
+                self.fetched += 1
+        return items
+
+    def _limit(self) -> Optional[int]:
+        limits = [n for n in (self.total, self.max_results) if n is not None]
+        return min(limits) if limits else None
+
+    def __iter__(self) -> Iterator[PropertyRecord]:
+        executor = ThreadPoolExecutor(max_workers=self.prefetch, thread_name_prefix="rentcast-listings")
+        window: Deque = deque()
+        next_offset = self.page_size
+        exhausted = False
+
+        def schedule() -> bool:
+            nonlocal next_offset
+            limit = self._limit()
+            if exhausted or (limit is not None and next_offset >= limit):
+                return False
+            window.append(executor.submit(self._page, next_offset))
+            next_offset += self.page_size
+            return True
+
+        try:
+            # The first page alone, to learn the total before prefetching
+            page = self._page(0, count_total=True)
+            while True:
+                exhausted = exhausted or len(page) < self.page_size
+                while len(window) < self.prefetch and schedule():
+                    pass
+                for listing in page:
+                    if self.max_results is not None and self.yielded >= self.max_results:
+                        return
+                    self.yielded += 1
+                    yield listing_record(listing, self.query.kind)
+                if not window:
+                    return
+                page = window.popleft().result()
+        finally:
+            for future in window:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def pages_needed(max_results: int, page_size: int = LISTINGS_PAGE_SIZE) -> int:
+    """Upper bound on the pages a stream capped at ``max_results`` requests"""
+    return max(1, -(-max_results // max(1, min(page_size, 500))))
+
+
+def iter_listings(query: ListingQuery, **options) -> ListingStream:
+    """Stream the listings matching ``query``; see ListingStream for options"""
+    return ListingStream(query, **options)
@@ -0,0 +1,139 @@
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+from utils.property_record import PropertyRecord
+from utils.rentcast_api import (MAX_QUERIES, RentCastError, RentCastNotFound, fetch_resilient, get_cached,
+                                get_not_found, resolve_zip)
+
+# ------------------------
+# Search Pipeline
+# ------------------------
+SEARCH_WORKERS = 16
+
+# Shared by all sessions; lookups are I/O bound so threads are enough
+_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="rentcast-search")
+
+
+@dataclass
+class LookupOutcome:
+    """Result of one endpoint in a property search"""
+    endpoint: str
+    data: Optional[Dict] = None
+    source: str = ""        # cache | api | stale
+    error: str = ""
+    status_code: Optional[int] = None
+    charged: bool = False
+    stale_since: Optional[float] = None
+    suggestions: List[str] = field(default_factory=list)  # address fixes when nothing was found
+    record: Optional[PropertyRecord] = None                # projected /properties result
+
+    def __post_init__(self):
+        if self.endpoint == "properties" and self.data and self.record is None:
+            self.record = PropertyRecord.from_payload(self.data)
+
+
+def _fetch(endpoint: str, address: str) -> LookupOutcome:
+    try:
+        data, chargeable, stale_since = fetch_resilient(endpoint, address)
+        if stale_since is not None:
+            return LookupOutcome(endpoint, data, "stale", charged=chargeable, stale_since=stale_since)
+        return LookupOutcome(endpoint, data, "api", charged=chargeable)
+    except RentCastNotFound as e:
+        return _not_found(endpoint, e)
+    except RentCastError as e:
+        return LookupOutcome(endpoint, error=str(e), status_code=e.status_code)
+
+
+def _not_found(endpoint: str, error: RentCastNotFound) -> LookupOutcome:
+    return LookupOutcome(endpoint, source="cache" if error.cached else "api", error=str(error),
+                         status_code=error.status_code, suggestions=error.suggestions)
+
+
+def _done(outcome: LookupOutcome) -> Future:
+    future = Future()
+    future.set_result(outcome)
+    return future
+
+
+class PropertySearch:
+    """
+    One search across several RentCast endpoints.
+
+    Uncached endpoints are charged in one go through ``consume(n)``, which
+    holds up to ``n`` queries (e.g. QuotaReservation.reserve) and returns how
+    many it got; then they are all requested in parallel. End-to-end latency
+    is the slowest single call instead of the sum of all of them. Once the
+    search is done, ``charged`` is what should be committed and ``unused``
+    what should be given back.
+    """
+
+    def __init__(self, address: str, endpoints: List[str], consume: Callable[[int], int],
+                 max_queries: int = MAX_QUERIES):
+        self.address = address
+        self.futures: Dict[str, Future] = {}
+
+        uncached = []
+        for endpoint in endpoints:
+            cached = get_cached(endpoint, address)
+            not_found = get_not_found(endpoint, address) if cached is None else None
+            if cached is not None:
+                self.futures[endpoint] = _done(LookupOutcome(endpoint, cached, "cache"))
+            elif not_found is not None:
+                # Recently unresolvable: answer instantly without spending quota
+                self.futures[endpoint] = _done(_not_found(endpoint, not_found))
+            else:
+                uncached.append(endpoint)
+
+        self.consumed = consume(len(uncached)) if uncached else 0
+        for index, endpoint in enumerate(uncached):
+            if index < self.consumed:
+                if endpoint == "markets" and "properties" in self.futures and resolve_zip(address) is None:
+                    # Market data is cached per ZIP; wait for the property lookup to learn it
+                    self.futures[endpoint] = self._after(self.futures["properties"], endpoint)
+                else:
+                    self.futures[endpoint] = _executor.submit(_fetch, endpoint, address)
+            else:
+                self.futures[endpoint] = _done(LookupOutcome(
+                    endpoint, error=f"You have reached your {max_queries} API query limit."
+                ))
+
+    def _after(self, dependency: Future, endpoint: str) -> Future:
+        """Run a lookup once ``dependency`` finishes, without tying up a worker"""
+        chained = Future()
+
+        def run():
+            try:
+                if dependency.result().suggestions:
+                    # The address itself did not resolve; don't spend a call on its market
+                    chained.set_result(LookupOutcome(endpoint, error=dependency.result().error))
+                    return
+                cached = get_cached(endpoint, self.address)
+                if cached is not None:
+                    chained.set_result(LookupOutcome(endpoint, cached, "cache"))
+                else:
+                    chained.set_result(_fetch(endpoint, self.address))
+            except Exception as e:
+                # Otherwise the chained future never completes and as_completed() waits forever
+                chained.set_exception(e)
+
+        dependency.add_done_callback(lambda _: _executor.submit(run))
+        return chained
+
+    def as_completed(self, timeout: Optional[float] = None) -> Iterator[LookupOutcome]:
+        """Yield endpoint outcomes in the order they finish"""
+        for future in as_completed(list(self.futures.values()), timeout=timeout):
+            yield future.result()
+
+    @property
+    def unused(self) -> int:
+        """Queries charged up front that no upstream call used"""
+        return self.consumed - self.charged
+
+    @property
+    def charged(self) -> int:
+        """Number of upstream calls that should count against the quota"""
+        return sum(
+            1 for future in self.futures.values()
+            if future.done() and future.exception() is None and future.result().charged
+        )
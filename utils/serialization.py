@@ -0,0 +1,54 @@
+import json
+from typing import Any, Optional, Tuple, Type, Union
+
+# ------------------------
+# JSON Backend
+# ------------------------
+# orjson decodes API payloads several times faster than the standard library;
+# everything still works with plain json when it isn't installed.
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+class PayloadError(ValueError):
+    """Raised when a payload is not valid JSON or has the wrong top-level shape."""
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Decode JSON from bytes or str"""
+    try:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+    except ValueError as e:
+        raise PayloadError(f"Invalid JSON: {e}") from e
+
+
+def dumps(value: Any) -> str:
+    """Encode to compact JSON text"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def dumps_bytes(value: Any) -> bytes:
+    """Encode to compact JSON bytes (for compression or the wire)"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return dumps(value).encode()
+
+
+def decode_response(response, expect: Optional[Union[Type, Tuple[Type, ...]]] = None) -> Any:
+    """
+    Decode an HTTP response body, bypassing ``response.json()``.
+    ``expect`` checks the top-level shape (e.g. ``list`` or ``(list, dict)``)
+    so a truncated or HTML error page fails here instead of deep in the UI.
+    """
+    payload = loads(response.content)
+    if expect is not None and not isinstance(payload, expect):
+        raise PayloadError(f"Unexpected payload type {type(payload).__name__}")
+    return payload
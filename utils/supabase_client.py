@@ -0,0 +1,89 @@
+import base64
+import json
+import threading
+from typing import Callable, Optional
+
+from supabase import Client, ClientOptions, create_client
+
+from utils.config import get_app_config
+
+# ------------------------
+# Supabase Client
+# ------------------------
+_client: Optional[Client] = None
+_client_lock = threading.Lock()
+
+
+def create_supabase_client(access_token: Optional[str] = None) -> Client:
+    """A new anon-key Supabase client, acting as the user whose access token
+    is given (for per-user sessions)"""
+    config = get_app_config().require("supabase_url", "supabase_anon_key")
+    if not access_token:
+        return create_client(config.supabase_url, config.supabase_anon_key)
+    # Sent with every request, so auth.uid() is this user in the database
+    options = ClientOptions(headers={"Authorization": f"Bearer {access_token}"})
+    return create_client(config.supabase_url, config.supabase_anon_key, options=options)
+
+
+def create_service_client() -> Client:
+    """A service-role client for maintenance jobs (bypasses row-level security)"""
+    config = get_app_config().require("supabase_url", "supabase_service_key")
+    return create_client(config.supabase_url, config.supabase_service_key)
+
+
+def init_supabase() -> Client:
+    """The shared anon-key Supabase client, created on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_supabase_client()
+    return _client
+
+
+# ------------------------
+# Per-user Client
+# ------------------------
+# Where the current user's access token comes from. The Streamlit session
+# layer (utils/auth.py) installs a provider reading st.session_state; outside
+# a session there is no user, so per-user calls are skipped.
+_token_provider: Callable[[], Optional[str]] = lambda: None
+
+
+def set_token_provider(provider: Callable[[], Optional[str]]):
+    """Install the function that returns the current user's access token"""
+    global _token_provider
+    _token_provider = provider
+
+
+def get_user_client() -> Optional[Client]:
+    """A client authorized with the current user's access token, or None"""
+    access_token = _token_provider()
+    if not access_token:
+        return None
+    return create_supabase_client(access_token)
+
+
+def session_user_id() -> Optional[str]:
+    """The current user's id (the ``sub`` claim of their access token), or None"""
+    access_token = _token_provider()
+    if not access_token:
+        return None
+    try:
+        claims = access_token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(claims + "=" * (-len(claims) % 4)))["sub"]
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+# ------------------------
+# Error Classification
+# ------------------------
+# PostgREST and Postgres codes for a function or table that does not exist,
+# which is how a database without a given migration answers
+_MISSING_OBJECT_CODES = {"PGRST202", "PGRST205", "42883", "42P01"}
+
+
+def is_missing_object(error: Exception) -> bool:
+    """True when a call failed because its function or table does not exist"""
+    return getattr(error, "code", None) in _MISSING_OBJECT_CODES
@@ -0,0 +1,304 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# ------------------------
+# Telemetry Configuration
+# ------------------------
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)          # bytes
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))  # 0 disables the /metrics server
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+# ------------------------
+# Metric Types
+# ------------------------
+class Counter:
+    """Monotonic counter with labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(key)} {value:g}" for key, value in sorted(self.snapshot().items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, List[float]] = {}  # per-bucket counts + [sum, count]
+
+    def observe(self, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self) -> Dict[LabelKey, Dict]:
+        """Per label set: count, sum, mean and approximate p50/p95 (bucket upper bounds)"""
+        with self._lock:
+            values = {key: list(series) for key, series in self._values.items()}
+        result = {}
+        for key, series in values.items():
+            count = series[-1]
+            result[key] = {
+                "count": count,
+                "sum": series[-2],
+                "mean": series[-2] / count if count else 0,
+                "p50": self._quantile(series, 0.5),
+                "p95": self._quantile(series, 0.95),
+            }
+        return result
+
+    def _quantile(self, series: List[float], q: float) -> float:
+        target = series[-1] * q
+        seen = 0
+        for i, bound in enumerate(self.buckets):
+            seen += series[i]
+            if seen >= target and seen:
+                return bound
+        return float("inf")
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = {key: list(series) for key, series in self._values.items()}
+        lines = []
+        for key, series in sorted(values.items()):
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += series[i]
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative:g}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {series[-1]:g}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]:g}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]:g}")
+        return lines
+
+
+# ------------------------
+# Registry
+# ------------------------
+class Registry:
+    """In-process metric registry; collectors add gauges computed at scrape time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, Dict, float]]]] = []
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        with self._lock:
+            return self._metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, Dict, float]]]):
+        """``collector()`` yields (name, help, labels, value) gauge samples"""
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def metrics(self) -> Dict[str, object]:
+        with self._lock:
+            return dict(self._metrics)
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, metric in sorted(self.metrics().items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+
+        gauges: Dict[str, Tuple[str, List[str]]] = {}
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                for name, help_text, labels, value in collector():
+                    gauges.setdefault(name, (help_text, []))[1].append(
+                        f"{name}{_format_labels(_labels(labels))} {float(value):g}"
+                    )
+            except Exception:
+                # A failing collector must not break the whole scrape
+                continue
+        for name, (help_text, samples) in sorted(gauges.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+_registry = Registry()
+
+
+def get_registry() -> Registry:
+    return _registry
+
+
+REQUEST_SECONDS = _registry.histogram(
+    "outbound_request_duration_seconds", "Latency of outbound API calls")
+RESPONSE_BYTES = _registry.histogram(
+    "outbound_response_size_bytes", "Size of outbound API response bodies", SIZE_BUCKETS)
+REQUESTS_TOTAL = _registry.counter(
+    "outbound_requests_total", "Outbound API calls by service, endpoint and status")
+CACHE_LOOKUPS = _registry.counter(
+    "cache_lookups_total", "Response cache lookups by namespace and result")
+QUOTA_SPENT = _registry.counter(
+    "quota_units_spent_total", "User API quota units charged, by source")
+QUOTA_REFUNDED = _registry.counter(
+    "quota_units_refunded_total", "Quota units charged up front and given back unused, by source")
+
+
+# ------------------------
+# Recording Helpers
+# ------------------------
+def record_request(service: str, endpoint: str, status, seconds: float, size: Optional[int] = None):
+    """Record one outbound call; ``status`` is the HTTP status or an error name"""
+    REQUEST_SECONDS.observe(seconds, service=service, endpoint=endpoint)
+    REQUESTS_TOTAL.inc(service=service, endpoint=endpoint, status=status)
+    if size is not None:
+        RESPONSE_BYTES.observe(size, service=service, endpoint=endpoint)
+
+
+@contextmanager
+def track(service: str, endpoint: str):
+    """Time a non-HTTP client call (e.g. a Supabase query); exceptions count as ``error``"""
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException as e:
+        status = type(e).__name__
+        raise
+    finally:
+        record_request(service, endpoint, status, time.perf_counter() - started)
+
+
+def record_cache(namespace: str, hit: bool):
+    CACHE_LOOKUPS.inc(namespace=namespace, result="hit" if hit else "miss")
+
+
+def record_quota_spend(amount: int, source: str):
+    if amount:
+        QUOTA_SPENT.inc(amount, source=source)
+
+
+def record_quota_refund(amount: int, source: str):
+    if amount:
+        QUOTA_REFUNDED.inc(amount, source=source)
+
+
+def _is_error(status: str) -> bool:
+    return status != "ok" and not (status.isdigit() and int(status) < 400)
+
+
+def latency_summary() -> List[Dict]:
+    """Per service/endpoint latency rows for the Settings page"""
+    errors: Dict[Tuple[str, str], float] = {}
+    for key, value in REQUESTS_TOTAL.snapshot().items():
+        labels = dict(key)
+        if _is_error(labels["status"]):
+            series = (labels["service"], labels["endpoint"])
+            errors[series] = errors.get(series, 0) + value
+
+    rows = []
+    for key, stats in sorted(REQUEST_SECONDS.snapshot().items()):
+        labels = dict(key)
+        rows.append({
+            "service": labels["service"],
+            "endpoint": labels["endpoint"],
+            "calls": stats["count"],
+            "errors": int(errors.get((labels["service"], labels["endpoint"]), 0)),
+            "mean_ms": round(stats["mean"] * 1000, 1),
+            "p50_ms": stats["p50"] * 1000,
+            "p95_ms": stats["p95"] * 1000,
+        })
+    return rows
+
+
+# ------------------------
+# Metrics Endpoint
+# ------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = _registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics on ``port`` once per process; no-op when the port is 0"""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                # Another app process on this host already serves the port
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
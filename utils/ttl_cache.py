@@ -0,0 +1,67 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List
+
+# ------------------------
+# In-process TTL Cache
+# ------------------------
+# A Streamlit-free replacement for st.cache_data on core functions: results
+# are memoized per argument tuple for ``ttl`` seconds. Exceptions are not
+# cached. Values are returned as-is, so callers must not mutate them.
+
+_registry: List["TTLCache"] = []
+_registry_lock = threading.Lock()
+
+
+class TTLCache:
+    def __init__(self, fn: Callable, ttl: float, maxsize: int):
+        self.fn = fn
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        functools.update_wrapper(self, fn)
+
+    def __call__(self, *args, **kwargs):
+        key = args + tuple(sorted(kwargs.items()))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                return entry[0]
+        value = self.fn(*args, **kwargs)
+        with self._lock:
+            self._entries[key] = (value, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self, *args, **kwargs):
+        """Forget one argument tuple, or everything when called without arguments"""
+        with self._lock:
+            if args or kwargs:
+                self._entries.pop(args + tuple(sorted(kwargs.items())), None)
+            else:
+                self._entries.clear()
+
+
+def ttl_cache(ttl: float, maxsize: int = 256) -> Callable[[Callable], TTLCache]:
+    """Decorator: memoize a function's results for ``ttl`` seconds"""
+    def decorate(fn: Callable) -> TTLCache:
+        cache = TTLCache(fn, ttl, maxsize)
+        with _registry_lock:
+            _registry.append(cache)
+        return cache
+    return decorate
+
+
+def clear_all():
+    """Empty every ttl_cache in the process"""
+    with _registry_lock:
+        caches = list(_registry)
+    for cache in caches:
+        cache.clear()
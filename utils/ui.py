@@ -0,0 +1,240 @@
+import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+from utils.errors import Result
+from utils.rentcast_api import RentCastNotFound, lookup
+from utils.ttl_cache import clear_all
+
+# ------------------------
+# Streamlit Adapter
+# ------------------------
+# The only place core results and errors meet Streamlit. Core modules return
+# Result objects or raise utils.errors types; pages render them through here.
+def render(result: Result, default: Any = None) -> Any:
+    """Show a Result's notices and error, and return its value (or ``default``)"""
+    for level, message in result.notices:
+        getattr(st, level, st.info)(message)
+    if isinstance(result.error, RentCastNotFound):
+        show_not_found(result.error)
+    elif result.error is not None:
+        st.error(str(result.error))
+    return default if result.value is None else result.value
+
+
+def show_error(error: Exception, prefix: str = ""):
+    st.error(f"{prefix}{error}")
+
+
+def clear_caches():
+    """Drop Streamlit's data cache and the core TTL caches"""
+    st.cache_data.clear()
+    clear_all()
+
+
+# ------------------------
+# RentCast Lookups
+# ------------------------
+def show_not_found(error: RentCastNotFound):
+    """Render a not-found answer with suggested address fixes."""
+    st.warning(f"🔍 {error}")
+    if error.suggestions:
+        st.info("**Try these fixes:**\n" + "\n".join(f"- {hint}" for hint in error.suggestions))
+    if error.cached:
+        st.caption("⚡ Answered from recent lookups — no API query used")
+
+
+def fetch_property_details(address: str, user_id, email: str) -> Optional[Any]:
+    """
+    Fetch property details from RentCast API.
+    Returns JSON data if successful, None if error or limit reached.
+    """
+    return render(lookup("properties", address, user_id, email, "Error fetching data from RentCast API."))
+
+
+def get_market_data(address: str, user_id, email: str) -> Optional[Any]:
+    """
+    Fetch market data from RentCast API.
+    Returns JSON data if successful, None if error or limit reached.
+    """
+    return render(lookup("markets", address, user_id, email, "Error fetching market data."))
+
+
+# ------------------------
+# Property Analysis Views
+# ------------------------
+def display_property_analysis(analysis: Dict, property_data: Dict):
+    """Display comprehensive property analysis"""
+    
+    # Header
+    basic = analysis['basic_info']
+    st.markdown(f"""
+    <div class="property-card">
+        <h3>🏠 {basic['address']}</h3>
+        <p><strong>{basic['city']}, {basic['state']} {basic['zip_code']}</strong></p>
+        <p>{basic['bedrooms']} bed • {basic['bathrooms']} bath • {basic['square_feet']} sq ft • Built {basic['year_built']}</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Investment Score
+    score_data = analysis['investment_score']
+    col1, col2, col3 = st.columns([1, 2, 1])
+    
+    with col2:
+        st.markdown(f"""
+        <div style="text-align: center; padding: 2rem; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                    border-radius: 15px; color: white; margin: 1rem 0;">
+            <h2 style="margin: 0; font-size: 3rem;">{score_data['grade']}</h2>
+            <p style="margin: 0.5rem 0; font-size: 1.2rem;">Investment Score: {score_data['score']}/100</p>
+            <p style="margin: 0; opacity: 0.9;">{score_data['recommendation']}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Financial Metrics
+    st.subheader("💰 Financial Analysis")
+    financial = analysis['financial_metrics']
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Property Price", f"${financial['price']:,.0f}")
+    with col2:
+        st.metric("Monthly Rent", f"${financial['monthly_rent']:,.0f}")
+    with col3:
+        st.metric("Cap Rate", f"{financial['cap_rate']}%")
+    with col4:
+        st.metric("Cash Flow", f"${financial['estimated_cash_flow']:,.0f}")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Annual Rent", f"${financial['annual_rent']:,.0f}")
+    with col2:
+        st.metric("Price/Rent Ratio", f"{financial['price_to_rent_ratio']:.1f}")
+    with col3:
+        st.metric("ROI Estimate", f"{financial['roi_estimate']}%")
+    with col4:
+        st.metric("Price/Sq Ft", f"${analysis['market_analysis']['price_per_sqft']:.0f}")
+    
+    # Market Analysis
+    st.subheader("📊 Market Analysis")
+    market = analysis['market_analysis']
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.info(f"**Neighborhood:** {market['neighborhood']}")
+    with col2:
+        status_color = {"Hot Market": "🔥", "Balanced Market": "⚖️", "Buyer's Market": "💰"}
+        st.info(f"**Market Status:** {status_color.get(market['market_status'], '📈')} {market['market_status']}")
+    with col3:
+        potential_color = {"High": "🚀", "Moderate": "📈", "Low": "📉"}
+        st.info(f"**Appreciation:** {potential_color.get(market['appreciation_potential'], '📊')} {market['appreciation_potential']}")
+    
+    # Positive Factors
+    if score_data['positive_factors']:
+        st.subheader("✅ Positive Investment Factors")
+        factors_text = " • ".join(score_data['positive_factors'])
+        st.success(factors_text)
+    
+    # Visualizations
+    create_property_charts(financial, property_data)
+
+def create_property_charts(financial_data: Dict, property_data: Dict):
+    """Create visualizations for property analysis"""
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Cash Flow Breakdown
+        if financial_data['monthly_rent'] > 0:
+            estimated_expenses = financial_data['price'] * 0.004 if financial_data['price'] else 0
+            
+            fig = go.Figure(data=[
+                go.Bar(
+                    x=['Monthly Income', 'Estimated Expenses', 'Net Cash Flow'],
+                    y=[financial_data['monthly_rent'], estimated_expenses, financial_data['estimated_cash_flow']],
+                    marker_color=['green', 'red', 'blue']
+                )
+            ])
+            fig.update_layout(title="💰 Monthly Cash Flow Breakdown", yaxis_title="Amount ($)")
+            st.plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        # Investment Metrics Radar
+        metrics = [
+            financial_data['cap_rate'] * 10,  # Scale up for visibility
+            min(financial_data['roi_estimate'], 100),
+            max(0, min(100, (financial_data['estimated_cash_flow'] + 500) / 10)),  # Scale cash flow
+            max(0, min(100, 100 - financial_data['price_to_rent_ratio'] * 2))  # Inverse price/rent ratio
+        ]
+        
+        fig = go.Figure()
+        fig.add_trace(go.Scatterpolar(
+            r=metrics,
+            theta=['Cap Rate', 'ROI', 'Cash Flow', 'Affordability'],
+            fill='toself',
+            name='Property Metrics'
+        ))
+        fig.update_layout(
+            polar=dict(radialaxis=dict(visible=True, range=[0, 100])),
+            title="📊 Investment Metrics Overview",
+            showlegend=False
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+
+# ------------------------
+# Order Analytics Views
+# ------------------------
+def display_orders_analytics(orders: List[Dict]):
+    """Display comprehensive order analytics"""
+    if not orders:
+        st.info("📦 No orders found")
+        return
+        
+    # Convert to DataFrame for analysis
+    df = pd.DataFrame(orders)
+    df['month'] = pd.to_datetime(df['date_created']).dt.to_period('M')
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric(
+            "Total Orders", 
+            len(orders),
+            delta=f"+{len([o for o in orders if o['status'] == 'completed'])} completed"
+        )
+    
+    with col2:
+        total_value = sum(o['total_float'] for o in orders)
+        st.metric("Total Value", f"${total_value:,.2f}")
+    
+    with col3:
+        avg_order = total_value / len(orders) if orders else 0
+        st.metric("Average Order", f"${avg_order:,.2f}")
+    
+    with col4:
+        recent_orders = len([o for o in orders if 
+            datetime.datetime.fromisoformat(o['date_created'].replace('T', ' ').replace('Z', '')) 
+            > datetime.datetime.now() - datetime.timedelta(days=30)
+        ])
+        st.metric("Recent Orders (30d)", recent_orders)
+    
+    # Order trend chart
+    if len(orders) > 1:
+        monthly_data = df.groupby('month').agg({
+            'id': 'count',
+            'total_float': 'sum'
+        }).reset_index()
+        monthly_data['month_str'] = monthly_data['month'].astype(str)
+        
+        fig = px.line(
+            monthly_data, 
+            x='month_str', 
+            y=['id', 'total_float'],
+            title="📈 Order Trends Over Time",
+            labels={'value': 'Count/Amount', 'month_str': 'Month'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
@@ -1,71 +1,201 @@
-import streamlit as st
+import threading
 from datetime import datetime, timezone
-from typing import Dict, List
-from utils.auth import init_supabase
+from typing import Dict, List, Optional
+from utils.errors import Result, ServiceError
+from utils.supabase_client import get_user_client, is_missing_object, session_user_id
+from utils.telemetry import track
+from utils.usage_counter import UsageCounter
+from utils.offline import (ReplayDeferred, is_network_error, is_offline, load_snapshot, mark_offline,
+                           queue_write, register_handler, save_snapshot)
 import datetime
 
 # ------------------------
 # API Usage Management
 # ------------------------
-def get_user_usage(user_id: int) -> Dict:
-    """Enhanced usage tracking with detailed metrics"""
-    supabase = init_supabase()
-    if not supabase:
-        return {"current_month": 0, "total": 0, "limit": 30}
+# Usage figures are read from api_usage_rollups, which an insert trigger keeps
+# current (supabase/migrations): a rerun reads a handful of pre-aggregated rows
+# whatever the length of the user's history. On databases without those
+# migrations they are counted over the raw events instead: a head-only exact
+# count for the total, and the usage_breakdown RPC (or just the two grouped
+# columns) for the split. Reads and inserts use the signed-in user's client:
+# the rollups and both functions only ever return the caller's own usage.
+# WordPress sign-ins have no Supabase session, so they have no usage figures.
+_server_features = {"usage_rollups": True, "usage_breakdown": True}
+
+def _count_usage(supabase, user_id: int, since: str = None) -> int:
+    """Exact number of api_usage rows, without downloading them"""
+    query = supabase.table("api_usage").select("id", count="exact", head=True).eq("user_id", user_id)
+    if since:
+        query = query.gte("created_at", since)
+    with track("supabase", "api_usage.count"):
+        return query.execute().count or 0
+
+def _usage_breakdown(supabase, user_id: int, since: str) -> List[Dict]:
+    """(query_type, day, count) rows for the user's usage since ``since``"""
+    if _server_features["usage_breakdown"]:
+        try:
+            with track("supabase", "rpc.usage_breakdown"):
+                return supabase.rpc("usage_breakdown", {"p_since": since}).execute().data or []
+        except Exception as e:
+            if not is_missing_object(e):
+                raise
+            _server_features["usage_breakdown"] = False  # migration not applied; stop asking
+    
+    with track("supabase", "api_usage.select"):
+        rows = supabase.table("api_usage").select("query_type, created_at").eq(
+            "user_id", user_id
+        ).gte("created_at", since).execute().data or []
+    grouped = {}
+    for row in rows:
+        key = (row.get('query_type') or 'property_search', row['created_at'][:10])
+        grouped[key] = grouped.get(key, 0) + 1
+    return [{"query_type": t, "day": day, "count": count} for (t, day), count in grouped.items()]
+
+def _usage_counts(supabase, user_id: int, start_month: str):
+    """This month's (query_type, day, count) rows and the lifetime total"""
+    if _server_features["usage_rollups"]:
+        try:
+            with track("supabase", "api_usage_rollups.select"):
+                rows = supabase.table("api_usage_rollups").select("query_type, day, count").eq(
+                    "user_id", user_id
+                ).eq("month", start_month[:10]).execute().data or []
+            with track("supabase", "rpc.usage_total"):
+                total = supabase.rpc("usage_total", {}).execute().data
+            return rows, int(total or 0)
+        except Exception as e:
+            if not is_missing_object(e):
+                raise
+            _server_features["usage_rollups"] = False  # migration not applied; stop asking
+    
+    return _usage_breakdown(supabase, user_id, start_month), _count_usage(supabase, user_id)
+
+def _read_usage(user_id: int) -> Result[Dict]:
+    """Usage figures as stored in Supabase (last known figures while offline;
+    a failure without a value when there is no Supabase session)"""
+    empty = {"current_month": 0, "total": 0, "limit": 30}
+    if is_offline():
+        snapshot = load_snapshot("usage", user_id)
+        return Result.success(snapshot[0] if snapshot else empty)
+
+    supabase = get_user_client()
+    if supabase is None:
+        # Not "nothing used": the figures exist, but only the user's own
+        # Supabase session may read them
+        return Result.failure(ServiceError("Usage figures need a Supabase sign-in", "supabase"))
         
     try:
         now = datetime.datetime.utcnow()
-        start_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        start_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat()
         
-        # Current month usage
-        current_month_res = supabase.table("api_usage").select("*").eq(
-            "user_id", user_id
-        ).gte("created_at", start_month.isoformat()).execute()
-        
-        # Total usage
-        total_res = supabase.table("api_usage").select("*").eq("user_id", user_id).execute()
-        
-        # Usage by endpoint
+        # Current month, by endpoint and by day
+        rows, total = _usage_counts(supabase, user_id, start_month)
         usage_by_type = {}
-        for record in current_month_res.data:
-            query_type = record.get('query_type', 'property_search')
-            usage_by_type[query_type] = usage_by_type.get(query_type, 0) + 1
+        daily_usage = {}
+        for row in rows:
+            usage_by_type[row['query_type']] = usage_by_type.get(row['query_type'], 0) + row['count']
+            day = str(row['day'])[:10]
+            daily_usage[day] = daily_usage.get(day, 0) + row['count']
             
-        return {
-            "current_month": len(current_month_res.data),
-            "total": len(total_res.data),
+        usage = {
+            "current_month": sum(usage_by_type.values()),
+            "total": total,
             "limit": 30,
             "by_type": usage_by_type,
-            "daily_usage": calculate_daily_usage(current_month_res.data)
+            "daily_usage": daily_usage
         }
+        save_snapshot("usage", user_id, usage)
+        return Result.success(usage)
         
     except Exception as e:
-        st.error(f"Failed to fetch usage data: {e}")
-        return {"current_month": 0, "total": 0, "limit": 30}
-
-def calculate_daily_usage(usage_data: List[Dict]) -> Dict:
-    """Calculate daily usage pattern"""
-    daily_counts = {}
-    for record in usage_data:
-        date_str = record['created_at'][:10]  # Extract date part
-        daily_counts[date_str] = daily_counts.get(date_str, 0) + 1
-    return daily_counts
-
-def log_usage(user_id: int, query: str, query_type: str = "property_search", metadata: Dict = None):
-    """Enhanced usage logging with metadata"""
-    supabase = init_supabase()
-    if not supabase:
+        if is_network_error(e):
+            mark_offline(e)
+            snapshot = load_snapshot("usage", user_id)
+            return Result.success(snapshot[0] if snapshot else empty)
+        return Result.failure(ServiceError(f"Failed to fetch usage data: {e}", "supabase"), empty)
+
+def _insert_usage(user_id: int, rows, client=None):
+    """Insert ``user_id``'s api_usage rows as that user (the database trigger
+    bumps the rollups), with ``client`` or the current session's; raises on
+    failure (also the outbox handler)"""
+    supabase = client
+    if supabase is None:
+        supabase = get_user_client()
+        if not supabase or str(session_user_id()) != str(user_id):
+            raise ReplayDeferred("Waiting for this user's Supabase session")
+    with track("supabase", "api_usage.insert"):
+        supabase.table("api_usage").insert(rows).execute()
+
+register_handler("log_usage", _insert_usage)
+
+# The writer thread has no Streamlit session of its own, so each user's rows
+# are inserted with the client of the last page run that logged for them
+_session_clients: Dict[str, object] = {}
+
+def _remember_session(user_id: int):
+    if str(session_user_id()) == str(user_id):
+        _session_clients[str(user_id)] = get_user_client()
+
+def _write_usage(user_id: int, rows):
+    client = _session_clients.get(str(user_id))
+    if is_offline() or client is None:
+        queue_write("log_usage", user_id=user_id, rows=rows)  # written at their next sign-in
         return
-        
     try:
-        log_data = {
-            "user_id": user_id,
-            "query": query,
-            "query_type": query_type,
-            "created_at": datetime.datetime.utcnow().isoformat(),
-            "metadata": metadata or {}
-        }
-        supabase.table("api_usage").insert(log_data).execute()
+        _insert_usage(user_id, rows, client)
     except Exception as e:
-        st.warning(f"Failed to log usage: {e}")
+        if not is_network_error(e):
+            raise
+        mark_offline(e)
+        queue_write("log_usage", user_id=user_id, rows=rows)
+
+# ------------------------
+# Process-wide Counter
+# ------------------------
+# Usage is served from an in-process counter seeded from _read_usage() and
+# bumped locally on every logged call; the rows themselves are written behind
+# in batches (utils/usage_counter.py), so neither the sidebar nor a finished
+# search waits on Supabase.
+_counter: Optional[UsageCounter] = None
+_counter_lock = threading.Lock()
 
+def get_usage_counter() -> UsageCounter:
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                _counter = UsageCounter(seed=_read_usage, write=_write_usage)
+    return _counter
+
+def get_user_usage(user_id: int) -> Result[Dict]:
+    """Enhanced usage tracking with detailed metrics (served from memory once
+    read; a failure without a value when there is no Supabase session)"""
+    return get_usage_counter().get(user_id)
+
+def _usage_row(user_id: int, query: str, query_type: str, created_at: str, metadata: Dict = None) -> Dict:
+    return {
+        "user_id": user_id,
+        "query": query,
+        "query_type": query_type,
+        "created_at": created_at,
+        "metadata": metadata or {}
+    }
+
+def log_usage(user_id: int, query: str, query_type: str = "property_search", metadata: Dict = None) -> Result:
+    """Enhanced usage logging with metadata (counted now, written in the background)"""
+    _remember_session(user_id)
+    created_at = datetime.datetime.utcnow().isoformat()
+    get_usage_counter().record(user_id, [_usage_row(user_id, query, query_type, created_at, metadata)])
+    return Result.success()
+
+
+def log_usage_batch(user_id: int, queries: List[str], query_type: str = "bulk_lookup",
+                    metadata: Dict = None) -> Result:
+    """Log several API calls; they are written with the next batch insert"""
+    if not queries:
+        return Result.success()
+        
+    _remember_session(user_id)
+    created_at = datetime.datetime.utcnow().isoformat()
+    rows = [_usage_row(user_id, query, query_type, created_at, metadata) for query in queries]
+    get_usage_counter().record(user_id, rows)
+    return Result.success()
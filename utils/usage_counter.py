@@ -0,0 +1,211 @@
+import atexit
+import datetime
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from utils.errors import Result
+from utils.offline import is_offline, queue_write
+
+# ------------------------
+# Counter Configuration
+# ------------------------
+USAGE_FLUSH_INTERVAL = float(os.environ.get("USAGE_FLUSH_INTERVAL", "5"))            # seconds between flushes
+USAGE_FLUSH_BATCH = int(os.environ.get("USAGE_FLUSH_BATCH", "100"))                  # flush early at this many rows
+USAGE_RECONCILE_INTERVAL = float(os.environ.get("USAGE_RECONCILE_INTERVAL", "300"))  # re-read the server this often
+
+
+def _this_month() -> str:
+    return datetime.datetime.utcnow().strftime("%Y-%m")
+
+
+def _copy_usage(usage: Dict) -> Dict:
+    return {**usage, "by_type": dict(usage.get("by_type") or {}),
+            "daily_usage": dict(usage.get("daily_usage") or {})}
+
+
+def apply_rows(usage: Dict, rows: List[Dict], month: str):
+    """Add logged api_usage rows to a usage summary, in place"""
+    for row in rows:
+        usage["total"] = usage.get("total", 0) + 1
+        day = row["created_at"][:10]
+        if day[:7] != month:
+            continue
+        query_type = row.get("query_type") or "property_search"
+        usage["current_month"] = usage.get("current_month", 0) + 1
+        usage["by_type"][query_type] = usage["by_type"].get(query_type, 0) + 1
+        usage["daily_usage"][day] = usage["daily_usage"].get(day, 0) + 1
+
+
+# ------------------------
+# Usage Counter
+# ------------------------
+class UsageCounter:
+    """
+    Per-user usage figures kept in memory, with write-behind event logging.
+
+    A user's summary is read from the server once (``seed``) and then updated
+    locally for every logged call, so reruns and searches never wait on
+    Supabase. Logged rows are buffered and written in batches (``write``) by a
+    background thread every ``flush_interval`` seconds, or sooner once
+    ``flush_batch`` rows are waiting; whatever is buffered is flushed at exit.
+    Rows are handed to ``write`` one user at a time, and a user's rows that
+    cannot be written go to the offline outbox. Rows still buffered in memory
+    are lost if the process dies without running its exit handlers (killed,
+    out of memory, power loss): at most ``flush_interval`` seconds, or
+    ``flush_batch`` rows, of usage.
+    Summaries older than ``reconcile_interval`` seconds are dropped, so the
+    next read re-seeds them and picks up usage logged by other processes.
+    Seeding happens on the reading thread, which has the user's session;
+    the background thread never reads the server.
+    """
+
+    def __init__(self, seed: Callable[[int], Result], write: Callable[[int, List[Dict]], None],
+                 flush_interval: float = USAGE_FLUSH_INTERVAL, flush_batch: int = USAGE_FLUSH_BATCH,
+                 reconcile_interval: float = USAGE_RECONCILE_INTERVAL):
+        self.seed = seed
+        self.write = write
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._entries: Dict[int, Dict] = {}
+        self._pending: List[Dict] = []    # logged, not yet handed to ``write``
+        self._flushing: List[Dict] = []   # being written right now
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._exit_registered = False
+        self._stats = {"flushes": 0, "rows_flushed": 0, "rows_to_outbox": 0, "seeds": 0,
+                       "reconciles": 0, "last_flush": None, "last_error": ""}
+
+    def get(self, user_id: int) -> Result[Dict]:
+        """The user's usage summary, from memory once seeded"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry["month"] == _this_month():
+                return Result.success(_copy_usage(entry["usage"]))
+        return self._seed(user_id)
+
+    def _seed(self, user_id: int) -> Result[Dict]:
+        # Read between flushes: while a batch is being written the server may
+        # or may not include it yet, and either guess would count it wrong
+        with self._flush_lock:
+            result = self.seed(user_id)
+            self._stats["seeds"] += 1
+            if not result.ok:
+                return result
+            usage = _copy_usage(result.value)
+            month = _this_month()
+            now = time.monotonic()
+            with self._lock:
+                # The server has not seen rows that are still buffered here
+                apply_rows(usage, [row for row in self._pending if row["user_id"] == user_id], month)
+                self._entries[user_id] = {"usage": usage, "month": month, "seeded_at": now}
+                served = _copy_usage(usage)
+        self.start()  # reconciles from here on
+        result.value = served
+        return result
+
+    def record(self, user_id: int, rows: List[Dict]):
+        """Count logged rows now and buffer them for the next flush"""
+        if not rows:
+            return
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry:
+                apply_rows(entry["usage"], rows, entry["month"])
+            self._pending.extend(rows)
+            full = len(self._pending) >= self.flush_batch
+        self.start()
+        if full:
+            self._wake.set()
+
+    def forget(self, user_id: int):
+        """Drop a user's summary so the next read re-seeds it"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    # ------------------------
+    # Write-behind
+    # ------------------------
+    def flush(self) -> int:
+        """Write every buffered row now; returns how many were handed off"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._flushing = batch
+            if not batch:
+                return 0
+            by_user: Dict[int, List[Dict]] = {}
+            for row in batch:
+                by_user.setdefault(row["user_id"], []).append(row)
+            try:
+                for user_id, rows in by_user.items():
+                    try:
+                        # Queues to the outbox itself while offline
+                        self.write(user_id, rows)
+                        self._stats["rows_flushed"] += len(rows)
+                    except Exception as e:
+                        self._stats["last_error"] = str(e)
+                        queue_write("log_usage", user_id=user_id, rows=rows)
+                        self._stats["rows_to_outbox"] += len(rows)
+            finally:
+                with self._lock:
+                    self._flushing = []
+            self._stats["flushes"] += 1
+            self._stats["last_flush"] = time.time()
+            return len(batch)
+
+    def reconcile(self):
+        """Drop summaries seeded too long ago (the next read re-seeds them,
+        correcting drift from other processes)"""
+        if is_offline():
+            return  # the server copy is no better than ours until replay
+        now = time.monotonic()
+        with self._lock:
+            stale = [u for u, e in self._entries.items() if now - e["seeded_at"] > self.reconcile_interval]
+            for user_id in stale:
+                del self._entries[user_id]
+        self._stats["reconciles"] += len(stale)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                self.reconcile()
+            except Exception as e:
+                self._stats["last_error"] = str(e)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="usage-writer", daemon=True)
+                self._thread.start()
+            if not self._exit_registered:
+                atexit.register(self.close)
+                self._exit_registered = True
+
+    def close(self):
+        """Stop the writer and flush what is left (registered with atexit)"""
+        self._stop.set()
+        self._wake.set()
+        self.flush()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending = len(self._pending) + len(self._flushing)
+            users = len(self._entries)
+        stats = dict(self._stats)
+        stats.update({
+            "running": self._thread is not None and self._thread.is_alive(),
+            "pending": pending,
+            "users": users,
+            "flush_interval": self.flush_interval
+        })
+        return stats
@@ -1,21 +1,23 @@
-import streamlit as st
 import requests
 from datetime import datetime, timezone
 from typing import Dict, List
-import pandas as pd
-import plotly.express as px
 from utils.config import get_config
+from utils.errors import ConfigError, Result, ServiceError
+from utils.serialization import PayloadError, decode_response
+from utils.http_client import get_client
+from utils.offline import is_network_error, is_offline, load_snapshot, mark_offline, save_snapshot
+from utils.ttl_cache import ttl_cache
 import datetime
 
 # ------------------------
 # WooCommerce Integration
 # ------------------------
-@st.cache_data(ttl=600, show_spinner=False)  # Increased cache time to 10 minutes and disabled spinner
-def get_wc_orders(user_id: int) -> List[Dict]:
-    """Get WooCommerce orders for a customer"""
+@ttl_cache(ttl=600)  # Increased cache time to 10 minutes
+def _fetch_wc_orders(user_id: int) -> List[Dict]:
+    """Raw WooCommerce orders for a customer; raises ServiceError, network errors propagate"""
     config = get_config()
     if not config:
-        return []
+        raise ConfigError("WordPress/WooCommerce settings are missing")
 
     url = f"{config['wp_url']}/wp-json/wc/v3/orders"
     params = {
@@ -25,79 +27,44 @@ def get_wc_orders(user_id: int) -> List[Dict]:
         "order": "desc"
     }
 
-    try:
-        resp = requests.get(
-            url,
-            auth=(config['wc_key'], config['wc_secret']),
-            params=params,
-            timeout=15
-        )
+    resp = get_client("woocommerce", pool_size=5, timeout=(3.05, 15), max_retries=2).get(
+        url,
+        auth=(config['wc_key'], config['wc_secret']),
+        params=params
+    )
 
-        if resp.status_code == 200:
-            orders = resp.json()
-            # Enrich order data
-            for order in orders:
-                order['total_float'] = float(order['total'])
-                order['date_created_parsed'] = datetime.datetime.fromisoformat(
-                    order['date_created'].replace('T', ' ').replace('Z', '')
-                )
-            return orders
-        else:
-            st.error(f"🛒 WooCommerce API error: {resp.text}")
-            return []
+    if resp.status_code != 200:
+        raise ServiceError(f"🛒 WooCommerce API error: {resp.text}", "woocommerce", resp.status_code)
+    try:
+        orders = decode_response(resp, expect=list)
+    except PayloadError as e:
+        raise ServiceError(f"🛒 Unexpected WooCommerce response: {e}", "woocommerce") from e
+    save_snapshot("orders", user_id, orders)
+    return orders
 
-    except requests.exceptions.RequestException as e:
-        st.error(f"🌐 Failed to fetch orders: {e}")
-        return []
+def get_wc_orders(user_id: int) -> Result[List[Dict]]:
+    """Get WooCommerce orders for a customer (last synced copy while offline)"""
+    orders = None
+    if not is_offline():
+        try:
+            orders = _fetch_wc_orders(user_id)
+        except (ConfigError, ServiceError) as e:
+            return Result.failure(e, [])
+        except requests.exceptions.RequestException as e:
+            if not is_network_error(e):
+                return Result.failure(ServiceError(f"🌐 Failed to fetch orders: {e}", "woocommerce"), [])
+            mark_offline(e)
+    if orders is None:
+        snapshot = load_snapshot("orders", user_id)
+        orders = snapshot[0] if snapshot else []
 
-def display_orders_analytics(orders: List[Dict]):
-    """Display comprehensive order analytics"""
-    if not orders:
-        st.info("📦 No orders found")
-        return
-        
-    # Convert to DataFrame for analysis
-    df = pd.DataFrame(orders)
-    df['month'] = pd.to_datetime(df['date_created']).dt.to_period('M')
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric(
-            "Total Orders", 
-            len(orders),
-            delta=f"+{len([o for o in orders if o['status'] == 'completed'])} completed"
+    # Enrich order data
+    enriched = []
+    for order in orders:
+        order = dict(order)
+        order['total_float'] = float(order['total'])
+        order['date_created_parsed'] = datetime.datetime.fromisoformat(
+            order['date_created'].replace('T', ' ').replace('Z', '')
         )
-    
-    with col2:
-        total_value = sum(o['total_float'] for o in orders)
-        st.metric("Total Value", f"${total_value:,.2f}")
-    
-    with col3:
-        avg_order = total_value / len(orders) if orders else 0
-        st.metric("Average Order", f"${avg_order:,.2f}")
-    
-    with col4:
-        recent_orders = len([o for o in orders if 
-            datetime.datetime.fromisoformat(o['date_created'].replace('T', ' ').replace('Z', '')) 
-            > datetime.datetime.now() - datetime.timedelta(days=30)
-        ])
-        st.metric("Recent Orders (30d)", recent_orders)
-    
-    # Order trend chart
-    if len(orders) > 1:
-        monthly_data = df.groupby('month').agg({
-            'id': 'count',
-            'total_float': 'sum'
-        }).reset_index()
-        monthly_data['month_str'] = monthly_data['month'].astype(str)
-        
-        fig = px.line(
-            monthly_data, 
-            x='month_str', 
-            y=['id', 'total_float'],
-            title="📈 Order Trends Over Time",
-            labels={'value': 'Count/Amount', 'month_str': 'Month'}
-        )
-        st.plotly_chart(fig, use_container_width=True)
-
+        enriched.append(order)
+    return Result.success(enriched)